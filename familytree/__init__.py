@@ -0,0 +1,64 @@
+"""TU SANG Family Tree application package."""
+import os
+
+from flask import Flask
+
+from .config import Config
+from .extensions import db, login_manager, init_migrate, init_sqlite_wal
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def create_app(config=None):
+    """Build the Flask app.
+
+    config may be a config object/class (loaded with from_object) or a
+    mapping of overrides applied on top of Config.
+    """
+    app = Flask(__name__,
+                instance_path=os.path.join(PROJECT_ROOT, 'instance'),
+                template_folder=os.path.join(PROJECT_ROOT, 'templates'),
+                static_folder=os.path.join(PROJECT_ROOT, 'static'))
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+    for folder in ('UPLOAD_FOLDER', 'BACKUP_FOLDER'):
+        if not os.path.isabs(app.config[folder]):
+            app.config[folder] = os.path.join(PROJECT_ROOT, app.config[folder])
+
+    db.init_app(app)
+    if app.config['SQLITE_WAL']:
+        init_sqlite_wal(app)
+    login_manager.init_app(app)
+    from .trees import init_trees
+    init_trees(app)
+    if app.config['COMPRESS_RESPONSES']:
+        from .compress import init_compression
+        init_compression(app)
+    enable_migrations = app.config['ENABLE_MIGRATIONS']
+    if enable_migrations is None:
+        # The flask command sets this before loading the app
+        enable_migrations = os.environ.get('FLASK_RUN_FROM_CLI') == 'true'
+    if enable_migrations:
+        init_migrate(app)
+
+    # Importing these registers the models and the session event hooks
+    from . import models, trees, auth, versioning, integrity, generations, families, autocomplete, dates, places  # noqa: F401
+    from .blueprints import pages, members, relationships, export, places as place_routes, trees as tree_routes
+    app.register_blueprint(pages.bp)
+    app.register_blueprint(members.bp)
+    app.register_blueprint(relationships.bp)
+    app.register_blueprint(export.bp)
+    app.register_blueprint(place_routes.bp)
+    app.register_blueprint(tree_routes.bp)
+
+    from .commands import register_commands
+    register_commands(app)
+
+    if app.config['BACKUP_INTERVAL_HOURS'] and not app.testing:
+        # Started from the first request so only serving workers (after any
+        # pre-fork) run it, never one-off flask commands
+        from .backups import start_backup_scheduler
+        app.before_request(lambda: start_backup_scheduler(app))
+    return app
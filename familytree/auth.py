@@ -0,0 +1,165 @@
+"""Login: throttled, bounded password checks and a cached user loader.
+
+Werkzeug's password hashes are deliberately slow. Checks run on a small
+per-process thread pool with a bounded backlog, so a burst of logins
+queues (or is turned away) instead of occupying every request thread,
+and throttled attempts are refused before any hashing happens.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from flask_login import UserMixin
+from werkzeug.security import check_password_hash
+
+from .extensions import db, login_manager
+from .models import User, TreeMembership
+
+class LoginRefused(Exception):
+    """A login attempt that was not checked; retry_after is in seconds."""
+    def __init__(self, message, retry_after, status=429):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status = status
+
+# Password checks
+_hash_lock = threading.Lock()
+_hash_executor = None
+_hash_slots = None
+
+def _submit_hash_check(password_hash, password):
+    """Queue a password check; raises LoginRefused when the backlog is full."""
+    global _hash_executor, _hash_slots
+    with _hash_lock:
+        if _hash_executor is None:
+            # Created on first use so each pre-forked worker gets its own threads
+            workers = current_app.config['PASSWORD_HASH_WORKERS']
+            _hash_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _hash_slots = threading.BoundedSemaphore(workers + current_app.config['PASSWORD_HASH_BACKLOG'])
+    if not _hash_slots.acquire(blocking=False):
+        raise LoginRefused('The server is busy processing logins, please try again shortly', 5, status=503)
+    future = _hash_executor.submit(check_password_hash, password_hash, password)
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
+
+# Attempt throttling: recent attempt times per client address and failures per username
+_attempts_lock = threading.Lock()
+_attempts = {}
+
+def _recent_attempts(key, now, window):
+    times = _attempts.get(key)
+    if times is None:
+        times = _attempts[key] = deque()
+    while times and times[0] <= now - window:
+        times.popleft()
+    return times
+
+def _prune_attempts(now, window):
+    for key in [key for key, times in _attempts.items() if not times or times[-1] <= now - window]:
+        del _attempts[key]
+
+def _check_throttle(remote_addr, username, now):
+    config = current_app.config
+    window = config['LOGIN_ATTEMPT_WINDOW']
+    with _attempts_lock:
+        if len(_attempts) > 10000:
+            _prune_attempts(now, window)
+        ip_attempts = _recent_attempts(('ip', remote_addr), now, window)
+        user_failures = _recent_attempts(('user', username), now, window)
+        if len(ip_attempts) >= config['LOGIN_MAX_ATTEMPTS_PER_IP']:
+            raise LoginRefused('Too many login attempts, please try again later',
+                               int(ip_attempts[0] + window - now) + 1)
+        if len(user_failures) >= config['LOGIN_MAX_FAILURES_PER_USERNAME']:
+            raise LoginRefused('Too many failed logins for this user, please try again later',
+                               int(user_failures[0] + window - now) + 1)
+        ip_attempts.append(now)
+
+def _record_result(username, success, now):
+    with _attempts_lock:
+        if success:
+            _attempts.pop(('user', username), None)
+        else:
+            _recent_attempts(('user', username), now, current_app.config['LOGIN_ATTEMPT_WINDOW']).append(now)
+
+def authenticate(username, password, remote_addr):
+    """Return the User for valid credentials, or None; raises LoginRefused when throttled or busy."""
+    username_key = (username or '').strip().lower()
+    _check_throttle(remote_addr, username_key, time.monotonic())
+    user = User.query.filter_by(username=username).first()
+    valid = False
+    if user is not None:
+        valid = _submit_hash_check(user.password_hash, password).result()
+    _record_result(username_key, valid, time.monotonic())
+    return user if valid else None
+
+# User loader cache
+class CachedUser(UserMixin):
+    """Read-only snapshot of a User row, safe to share between requests."""
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.is_admin = bool(user.is_admin)
+        self.tree_roles = user.tree_roles
+
+_user_cache_lock = threading.Lock()
+_user_cache = {}
+
+def invalidate_cached_users(user_ids=None):
+    """Drop the given users (or everyone) from this process's loader cache."""
+    with _user_cache_lock:
+        if user_ids is None:
+            _user_cache.clear()
+        else:
+            for user_id in user_ids:
+                _user_cache.pop(user_id, None)
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    now = time.monotonic()
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    snapshot = CachedUser(user)
+    with _user_cache_lock:
+        if len(_user_cache) >= current_app.config['USER_CACHE_SIZE']:
+            _user_cache.clear()
+        _user_cache[user_id] = (now + current_app.config['USER_CACHE_TTL'], snapshot)
+    return snapshot
+
+@db.event.listens_for(db.session, 'after_flush')
+def _track_user_changes(session, flush_context):
+    changed = [obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, User)]
+    # A role change alters the cached user's tree_roles
+    changed += [obj.user_id for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+                if isinstance(obj, TreeMembership)]
+    if changed:
+        session.info.setdefault('changed_user_ids', set()).update(changed)
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def _track_bulk_user_changes(orm_execute_state):
+    if (orm_execute_state.is_delete or orm_execute_state.is_update) and orm_execute_state.bind_mapper is not None:
+        if issubclass(orm_execute_state.bind_mapper.class_, (User, TreeMembership)):
+            orm_execute_state.session.info['all_users_changed'] = True
+
+@db.event.listens_for(db.session, 'after_commit')
+def _invalidate_changed_users(session):
+    if session.info.pop('all_users_changed', False):
+        session.info.pop('changed_user_ids', None)
+        invalidate_cached_users()
+        return
+    changed = session.info.pop('changed_user_ids', None)
+    if changed:
+        invalidate_cached_users(changed)
+
+@db.event.listens_for(db.session, 'after_soft_rollback')
+def _discard_user_changes(session, previous_transaction):
+    session.info.pop('all_users_changed', None)
+    session.info.pop('changed_user_ids', None)
@@ -0,0 +1,199 @@
+"""In-memory prefix index for name autocomplete.
+
+Every word of a member's full_name, nickname and chinese_name starts a key
+in a sorted list (normalized: accents stripped, case and punctuation
+folded), so a lookup is a bisect plus a scan of at most `limit` members
+per match tier. There is one index per family tree. Writes made by this
+process are applied member by member on the next lookup; a data version
+committed by another worker makes the index rebuild from the database.
+"""
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+from .extensions import db
+from .models import FamilyMember
+from .trees import current_tree_id
+from .versioning import current_data_version, committed_here
+
+NAME_FIELDS = ('full_name', 'nickname', 'chinese_name')
+# Match tiers, searched in order: start of the full name, start of another name, a later word
+TIERS = 3
+# Beyond this many changed members a rebuild is cheaper than re-inserting each
+MAX_INCREMENTAL = 500
+
+_ASCII_FOLD = str.maketrans({chr(code): ' ' for code in range(128) if not chr(code).isalnum()})
+
+def normalize_name(text):
+    """'José  DE la-Cruz' -> 'jose de la cruz'."""
+    text = text or ''
+    if text.isascii():
+        folded = text.translate(_ASCII_FOLD)
+    else:
+        decomposed = unicodedata.normalize('NFKD', text)
+        folded = ''.join(ch if ch.isalnum() else ' ' for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(folded.casefold().split())
+
+def _is_ideograph(ch):
+    # Chinese names are written without spaces, so every character starts a word
+    return ch >= '\u2e80' and unicodedata.category(ch) == 'Lo'
+
+def _name_keys(names):
+    """The (tier, key) pairs under which a member with these names is found."""
+    keys = set()
+    for field, name in zip(NAME_FIELDS, names):
+        text = normalize_name(name)
+        if not text:
+            continue
+        keys.add((0 if field == 'full_name' else 1, text))
+        ideographs = not text.isascii()
+        for position in range(1, len(text)):
+            ch = text[position]
+            if ch != ' ' and (text[position - 1] == ' ' or (ideographs and _is_ideograph(ch))):
+                keys.add((2, text[position:]))
+    return keys
+
+def _member_summary(row):
+    return {
+        'id': row.id,
+        'full_name': row.full_name,
+        'chinese_name': row.chinese_name,
+        'nickname': row.nickname,
+        'gender': row.gender,
+        'birth_year': row.birth_date.year if row.birth_date else None,
+        'is_alive': row.is_alive
+    }
+
+def _member_rows(tree_id, member_ids=None):
+    query = db.session.query(FamilyMember.id, FamilyMember.full_name, FamilyMember.nickname,
+                             FamilyMember.chinese_name, FamilyMember.gender, FamilyMember.birth_date,
+                             FamilyMember.is_alive).filter(FamilyMember.tree_id == tree_id)
+    if member_ids is not None:
+        query = query.filter(FamilyMember.id.in_(member_ids))
+    return query
+
+class NameIndex:
+    def __init__(self, tree_id):
+        self.tree_id = tree_id
+        self.lock = threading.Lock()
+        self.version = None
+        # One sorted list of (key, member_id) per tier
+        self.tiers = [[] for _ in range(TIERS)]
+        self.keys_by_member = {}
+        self.summaries = {}
+        # Changes committed by this process and not yet applied
+        self.pending_ids = set()
+        self.stale = False
+
+    def rebuild(self):
+        tiers = [[] for _ in range(TIERS)]
+        self.keys_by_member = {}
+        self.summaries = {}
+        for row in _member_rows(self.tree_id):
+            keys = _name_keys((row.full_name, row.nickname, row.chinese_name))
+            for tier, key in keys:
+                tiers[tier].append((key, row.id))
+            self.keys_by_member[row.id] = keys
+            self.summaries[row.id] = _member_summary(row)
+        for entries in tiers:
+            entries.sort()
+        self.tiers = tiers
+
+    def _remove(self, member_id):
+        for tier, key in self.keys_by_member.pop(member_id, ()):
+            entries = self.tiers[tier]
+            position = bisect_left(entries, (key, member_id))
+            if position < len(entries) and entries[position] == (key, member_id):
+                del entries[position]
+        self.summaries.pop(member_id, None)
+
+    def apply(self, member_ids):
+        """Re-read the given members; ids no longer in the database (or this tree) are dropped."""
+        for member_id in member_ids:
+            self._remove(member_id)
+        for row in _member_rows(self.tree_id, member_ids):
+            keys = _name_keys((row.full_name, row.nickname, row.chinese_name))
+            for tier, key in keys:
+                insort(self.tiers[tier], (key, row.id))
+            self.keys_by_member[row.id] = keys
+            self.summaries[row.id] = _member_summary(row)
+
+    def refresh(self):
+        version = current_data_version(self.tree_id)
+        with self.lock:
+            pending, self.pending_ids = self.pending_ids, set()
+            stale, self.stale = self.stale, False
+            if (self.version is None or stale or len(pending) > MAX_INCREMENTAL
+                    or (version != self.version and not committed_here(self.version, version, self.tree_id))):
+                self.rebuild()
+            elif pending:
+                self.apply(pending)
+            self.version = version
+
+    def search(self, query, limit=10):
+        """Members with a name word starting with query, best tier first, then alphabetically."""
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        self.refresh()
+        found = []
+        seen = set()
+        with self.lock:
+            for entries in self.tiers:
+                position = bisect_left(entries, (prefix,))
+                while position < len(entries) and len(found) < limit:
+                    key, member_id = entries[position]
+                    if not key.startswith(prefix):
+                        break
+                    if member_id not in seen:
+                        seen.add(member_id)
+                        found.append(self.summaries[member_id])
+                    position += 1
+        return found
+
+_name_indexes_lock = threading.Lock()
+_name_indexes = {}
+
+def name_index(tree_id=None):
+    """The name index of the tree (default: the current one)."""
+    tree_id = current_tree_id() if tree_id is None else tree_id
+    with _name_indexes_lock:
+        index = _name_indexes.get(tree_id)
+        if index is None:
+            index = _name_indexes[tree_id] = NameIndex(tree_id)
+        return index
+
+@db.event.listens_for(db.session, 'after_flush')
+def _track_name_changes(session, flush_context):
+    changed = list(session.new) + list(session.deleted)
+    changed += [obj for obj in session.dirty if session.is_modified(obj)]
+    for obj in changed:
+        if isinstance(obj, FamilyMember):
+            session.info.setdefault('name_index_ids', {}).setdefault(obj.tree_id, set()).add(obj.id)
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def _track_bulk_name_changes(orm_execute_state):
+    if (orm_execute_state.is_delete or orm_execute_state.is_update) and orm_execute_state.bind_mapper is not None:
+        if issubclass(orm_execute_state.bind_mapper.class_, FamilyMember):
+            # None (no tree selected) marks every tree's index stale
+            orm_execute_state.session.info.setdefault('name_index_stale', set()).add(current_tree_id())
+
+@db.event.listens_for(db.session, 'after_commit')
+def _queue_name_changes(session):
+    stale = session.info.pop('name_index_stale', set())
+    member_ids = session.info.pop('name_index_ids', {})
+    if not stale and not member_ids:
+        return
+    with _name_indexes_lock:
+        indexes = dict(_name_indexes)
+    # Only indexes already built need telling; a new one reads the tree from scratch
+    for tree_id, index in indexes.items():
+        if None in stale or tree_id in stale or tree_id in member_ids:
+            with index.lock:
+                index.stale = index.stale or None in stale or tree_id in stale
+                index.pending_ids.update(member_ids.get(tree_id, ()))
+
+@db.event.listens_for(db.session, 'after_soft_rollback')
+def _discard_name_changes(session, previous_transaction):
+    session.info.pop('name_index_stale', None)
+    session.info.pop('name_index_ids', None)
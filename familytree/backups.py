@@ -0,0 +1,233 @@
+"""Online SQLite snapshots: copied a few pages at a time, checksummed and rotated.
+
+sqlite3's backup API copies the live database in small steps. With the
+database in WAL mode (SQLITE_WAL), the copy holds one read transaction for
+its whole run: it sees a single consistent state while requests keep
+committing to the write-ahead log, so a snapshot never pauses the site.
+Without WAL the read lock is released between steps instead, and SQLite
+restarts the copy whenever another connection writes.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from .extensions import db
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, fine for a single dev server
+    fcntl = None
+
+SNAPSHOT_PATTERN = re.compile(r'^family_tree_\d{8}T\d{6}Z(?:_[a-z-]+)?\.db$')
+
+class BackupError(Exception):
+    pass
+
+def database_path():
+    """Path of the live SQLite database file; raises BackupError for other databases."""
+    url = db.engine.url
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        raise BackupError('Snapshots need a file-based SQLite database')
+    return url.database
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _write_file(path, data):
+    # Write then rename, so a crash never leaves a half-written file under the final name
+    partial = path + '.partial'
+    with open(partial, 'w') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial, path)
+
+def list_backups(folder=None):
+    """Snapshot paths in the backup folder, newest first."""
+    folder = folder or current_app.config['BACKUP_FOLDER']
+    if not os.path.isdir(folder):
+        return []
+    names = sorted((name for name in os.listdir(folder) if SNAPSHOT_PATTERN.match(name)), reverse=True)
+    return [os.path.join(folder, name) for name in names]
+
+def rotate_backups(folder=None, keep=None):
+    """Delete all but the newest `keep` snapshots and their checksum files; returns the deleted paths."""
+    keep = current_app.config['BACKUP_KEEP'] if keep is None else keep
+    deleted = list_backups(folder)[keep:]
+    for path in deleted:
+        for stale in (path, path + '.sha256'):
+            if os.path.exists(stale):
+                os.remove(stale)
+    return deleted
+
+def create_backup(folder=None, label=None):
+    """Snapshot the live database into the backup folder and rotate old snapshots.
+
+    Returns a dict with the snapshot path, its sha256, size, copy steps and
+    seconds taken.
+    """
+    config = current_app.config
+    folder = folder or config['BACKUP_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    source_path = database_path()
+    name = f"family_tree_{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}{'_' + label if label else ''}.db"
+    path = os.path.join(folder, name)
+    partial = path + '.partial'
+
+    started = time.perf_counter()
+    steps = 0
+
+    def progress(status, remaining, total):
+        nonlocal steps
+        steps += 1
+        # The backup API only sleeps when a step finds the database busy; pause
+        # after every step too so a large copy never monopolises the disk
+        if remaining:
+            time.sleep(config['BACKUP_STEP_SLEEP'])
+
+    source = sqlite3.connect(source_path, isolation_level=None)
+    target = sqlite3.connect(partial)
+    try:
+        if source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+            # Pin one snapshot of the database for the whole copy
+            source.execute('BEGIN')
+            source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        source.backup(target, pages=config['BACKUP_PAGES_PER_STEP'], progress=progress)
+    except Exception:
+        target.close()
+        os.remove(partial)
+        raise
+    finally:
+        source.close()
+    # A snapshot is a single self-contained file, not a WAL database
+    target.execute('PRAGMA journal_mode=DELETE')
+    target.close()
+    with open(partial, 'rb+') as f:
+        os.fsync(f.fileno())
+    os.replace(partial, path)
+
+    checksum = _sha256(path)
+    # sha256sum format, so 'sha256sum -c' works on it too
+    _write_file(path + '.sha256', f'{checksum}  {name}\n')
+    rotate_backups(folder)
+    return {'path': path, 'sha256': checksum, 'size': os.path.getsize(path), 'steps': steps,
+            'seconds': time.perf_counter() - started}
+
+def verify_backup(path):
+    """Return (ok, message) after checking the snapshot's checksum and running SQLite's integrity check."""
+    if not os.path.isfile(path):
+        return False, 'file not found'
+    try:
+        with open(path + '.sha256') as f:
+            expected = f.read().split()[0]
+    except (OSError, IndexError):
+        return False, 'checksum file missing'
+    if _sha256(path) != expected:
+        return False, 'checksum mismatch'
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        result = connection.execute('PRAGMA integrity_check').fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        return False, str(e)
+    finally:
+        connection.close()
+    if result != 'ok':
+        return False, f'integrity check failed: {result}'
+    return True, 'ok'
+
+def restore_backup(path):
+    """Replace the live database with a verified snapshot; returns the safety snapshot of the old data.
+
+    The copy runs as one write on the live database, so other workers see
+    either the old or the restored data. The data version is moved past its
+    old value so every worker's per-version caches notice the change.
+    """
+    ok, message = verify_backup(path)
+    if not ok:
+        raise BackupError(f'{os.path.basename(path)}: {message}')
+    safety = create_backup(label='pre-restore')
+    live_path = database_path()
+    old_version = db.session.execute(db.text('SELECT MAX(version) FROM data_version')).scalar() or 0
+    db.session.remove()
+    db.engine.dispose()
+
+    source = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    target = sqlite3.connect(live_path)
+    try:
+        source.backup(target)
+        if target.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'data_version'").fetchone():
+            target.execute('UPDATE data_version SET version = MAX(version, ?) + 1', (old_version,))
+            target.commit()
+    finally:
+        source.close()
+        target.close()
+    return safety
+
+# Scheduled snapshots: each worker runs a small thread, and a lock file in the
+# backup folder makes sure only one of them takes each due snapshot
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+def _latest_backup_age(folder):
+    backups = list_backups(folder)
+    return time.time() - os.path.getmtime(backups[0]) if backups else None
+
+def _backup_if_due(app):
+    """Take a snapshot if the newest is older than the interval; returns seconds until the next is due."""
+    interval = app.config['BACKUP_INTERVAL_HOURS'] * 3600
+    folder = app.config['BACKUP_FOLDER']
+    age = _latest_backup_age(folder)
+    if age is not None and age < interval:
+        return interval - age
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, '.backup.lock'), 'w') as lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return 60  # another worker is taking it
+        # Another worker may have finished one while we waited for the lock
+        age = _latest_backup_age(folder)
+        if age is not None and age < interval:
+            return interval - age
+        with app.app_context():
+            result = create_backup(folder)
+        app.logger.info('Database snapshot %s (%d bytes, %d steps, %.1fs)', os.path.basename(result['path']),
+                        result['size'], result['steps'], result['seconds'])
+    return interval
+
+def _run_scheduler(app):
+    while True:
+        try:
+            wait = _backup_if_due(app)
+        except Exception as e:
+            app.logger.warning('Scheduled database snapshot failed: %s', e)
+            wait = 600
+        time.sleep(min(max(wait, 60), 3600))
+
+def start_backup_scheduler(app):
+    """Start this process's snapshot thread once; safe to call on every request."""
+    global _scheduler_pid
+    if _scheduler_pid == os.getpid():
+        return
+    with _scheduler_lock:
+        if _scheduler_pid == os.getpid():
+            return
+        # Set before starting so a failure does not retry on every request
+        _scheduler_pid = os.getpid()
+        with app.app_context():
+            try:
+                database_path()
+            except BackupError:
+                return
+        threading.Thread(target=_run_scheduler, args=(app,), name='database-snapshots', daemon=True).start()
@@ -0,0 +1,60 @@
+from datetime import date
+
+from flask import Blueprint, current_app, jsonify, make_response, request, stream_template
+
+from ..models import FamilyMember
+from ..coalesce import coalesced, Overloaded, overloaded_response
+from ..book import MAX_BOOK_GENERATIONS, family_book
+from ..families import family_units
+
+STREAM_BUFFER_SIZE = 16 * 1024
+
+bp = Blueprint('export', __name__)
+
+def build_gedcom():
+    members = FamilyMember.query.all()
+    # The generator is only loaded when first needed
+    from ..gedcom import generate_gedcom
+    return generate_gedcom(members, family_units())
+
+@bp.route('/api/export-gedcom', methods=['GET'])
+def export_gedcom():
+    try:
+        # Concurrent downloads share one build per data version
+        gedcom_content = coalesced('export-gedcom', build_gedcom)
+        
+        # Create response with GEDCOM file
+        response = make_response(gedcom_content)
+        response.headers['Content-Type'] = 'text/plain; charset=utf-8'
+        response.headers['Content-Disposition'] = 'attachment; filename=family_tree.ged'
+        
+        return response
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _buffered(parts, size=STREAM_BUFFER_SIZE):
+    # Templates stream many tiny strings; send (and compress) them in larger pieces
+    buffer, length = [], 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+@bp.route('/api/family-book/<int:member_id>')
+def export_family_book(member_id):
+    """A printable HTML register of the member's descendants, streamed as it is written.
+
+    ?generations=N stops after N generations (the ancestor's included).
+    """
+    ancestor = FamilyMember.query.get_or_404(member_id)
+    generations = max(1, min(request.args.get('generations', MAX_BOOK_GENERATIONS, type=int), MAX_BOOK_GENERATIONS))
+    book = family_book(ancestor.id, generations)
+    return current_app.response_class(
+        _buffered(stream_template('family_book.html', ancestor=ancestor, generated_on=date.today(), **book)),
+        mimetype='text/html')
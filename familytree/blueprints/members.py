@@ -0,0 +1,873 @@
+import base64
+import binascii
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, request, jsonify, current_app, abort
+from flask_login import login_required, current_user
+
+from ..extensions import db
+from ..models import FamilyMember, FamilyRelationship, IntegrityIssue, Place
+from ..services import save_photo, parse_date, member_fields_from_data, link_members
+from ..versioning import cached_for_version, current_data_version
+from ..integrity import integrity_scan_state, start_background_integrity_scan
+from ..generations import relax_generations
+from ..merge import merge_members
+from ..autocomplete import name_index
+from ..dates import MAX_WINDOW_DAYS, upcoming_dates, alive_at_filter, decade_timeline, decade_events
+from ..coalesce import coalesced, Overloaded, overloaded_response
+from ..relatives import parse_include, load_relatives, relative_summary
+from ..search import SearchError, counts_by_value, search_filters, search_summary
+from ..trees import is_tree_admin
+
+bp = Blueprint('members', __name__)
+
+@bp.route('/api/add-member', methods=['POST'])
+def add_family_member():
+    try:
+        # Handle both JSON and form data
+        if request.is_json:
+            data = request.get_json()
+            photo_filename = None
+        else:
+            data = request.form.to_dict()
+            # Handle photo upload
+            photo_file = request.files.get('photo')
+            photo_filename = save_photo(photo_file) if photo_file else None
+        
+        member = FamilyMember(photo_filename=photo_filename, **member_fields_from_data(data))
+        
+        db.session.add(member)
+        db.session.commit()
+        
+        return jsonify({'success': True, 'message': 'Family member added successfully', 'id': member.id})
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)})
+
+def build_members_json():
+    members = FamilyMember.query.all()
+    return current_app.json.dumps([{
+        'id': member.id,
+        'full_name': member.full_name,
+        'chinese_name': member.chinese_name,
+        'nickname': member.nickname,
+        'birth_date': member.birth_date.isoformat() if member.birth_date else None,
+        'death_date': member.death_date.isoformat() if member.death_date else None,
+        'birth_place': member.birth_place,
+        'death_place': member.death_place,
+        'gender': member.gender,
+        'notes': member.notes,
+        'photo_filename': member.photo_filename,
+        'is_alive': member.is_alive,
+        'marital_status': member.marital_status,
+        'father_name': member.father_name,
+        'mother_name': member.mother_name,
+        'spouse_name': member.spouse_name,
+        'have_children': member.have_children,
+        'children_data': member.children_data,
+        'created_at': member.created_at.isoformat()
+    } for member in members])
+
+@bp.route('/api/get-members')
+def get_family_members():
+    try:
+        body = coalesced('get-members', build_members_json)
+    except Overloaded as e:
+        return overloaded_response(e)
+    return current_app.response_class(body, mimetype='application/json')
+
+# Sortable columns of the admin member table; each has a (column, id) index
+MEMBER_TABLE_SORTS = {
+    'name': FamilyMember.full_name,
+    'birth_date': FamilyMember.birth_date,
+    'updated_at': FamilyMember.updated_at,
+}
+MEMBER_TABLE_MAX_LIMIT = 200
+
+def encode_cursor(value, member_id):
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value, member_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, sort):
+    """Return (sort value, member id) from a cursor made by encode_cursor; raises ValueError."""
+    try:
+        value, member_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if value is not None:
+        if sort == 'birth_date':
+            value = date.fromisoformat(value)
+        elif sort == 'updated_at':
+            value = datetime.fromisoformat(value)
+    return value, int(member_id)
+
+def _after_cursor(column, descending, value, member_id):
+    """Conditions for the rows that follow (value, member_id) in ORDER BY column, id (both ASC or both DESC).
+
+    NULLs sort first ascending and last descending, as in SQLite and MySQL.
+    Each condition is one range of the sort index, in page order; an OR of
+    them could not be read as a range and would walk the index from the start.
+    """
+    if value is None:
+        if descending:
+            return [db.and_(column.is_(None), FamilyMember.id < member_id)]
+        return [db.and_(column.is_(None), FamilyMember.id > member_id), column.isnot(None)]
+    if descending:
+        return [db.tuple_(column, FamilyMember.id) < (value, member_id), column.is_(None)]
+    return [db.tuple_(column, FamilyMember.id) > (value, member_id)]
+
+def _keyset_page(query, sort, descending, limit, after):
+    """Return (rows, next cursor or None) for one page of query in MEMBER_TABLE_SORTS[sort] order.
+
+    The query must select full_name, birth_date and updated_at; raises ValueError for a bad cursor.
+    """
+    column = MEMBER_TABLE_SORTS[sort]
+    conditions = [None]
+    if after:
+        value, member_id = decode_cursor(after, sort)
+        conditions = _after_cursor(column, descending, value, member_id)
+    order = (column.desc(), FamilyMember.id.desc()) if descending else (column, FamilyMember.id)
+    rows = []
+    for condition in conditions:
+        part = query if condition is None else query.filter(condition)
+        rows += part.order_by(*order).limit(limit + 1 - len(rows)).all()
+        if len(rows) > limit:
+            break
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor({'name': last.full_name, 'birth_date': last.birth_date,
+                                        'updated_at': last.updated_at}[sort], last.id)
+
+@bp.route('/api/members/table')
+@login_required
+def get_member_table():
+    """One page of the admin member table, sorted and filtered on the server.
+
+    Pages are keyset based: pass the returned next_cursor as 'after' to get
+    the following page, so each page costs an index range scan no matter
+    how deep the admin has scrolled.
+    """
+    if not is_tree_admin(current_user):
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    sort = request.args.get('sort', 'name')
+    if sort not in MEMBER_TABLE_SORTS:
+        return jsonify({'success': False, 'message': f"sort must be one of {', '.join(MEMBER_TABLE_SORTS)}"}), 400
+    descending = request.args.get('direction', 'asc') == 'desc'
+    limit = max(1, min(request.args.get('limit', 50, type=int), MEMBER_TABLE_MAX_LIMIT))
+
+    query = db.session.query(FamilyMember.id, FamilyMember.full_name, FamilyMember.chinese_name,
+                             FamilyMember.nickname, FamilyMember.gender, FamilyMember.birth_date,
+                             FamilyMember.is_alive, FamilyMember.photo_filename, FamilyMember.updated_at)
+    search = request.args.get('q', '').strip()
+    if search:
+        pattern = f'%{search}%'
+        query = query.filter(db.or_(FamilyMember.full_name.ilike(pattern),
+                                    FamilyMember.chinese_name.ilike(pattern),
+                                    FamilyMember.nickname.ilike(pattern)))
+    if request.args.get('gender'):
+        query = query.filter(FamilyMember.gender == request.args['gender'])
+    status = request.args.get('status')
+    if status == 'living':
+        query = query.filter(FamilyMember.is_alive.is_(True))
+    elif status == 'deceased':
+        # Unknown status counts as deceased, as in the stats
+        query = query.filter(FamilyMember.is_alive.isnot(True))
+
+    # The total only changes with the filters, so it is sent with the first page only
+    total = query.count() if not request.args.get('after') else None
+    try:
+        rows, next_cursor = _keyset_page(query, sort, descending, limit, request.args.get('after'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({
+        'success': True,
+        'members': [{
+            'id': row.id,
+            'full_name': row.full_name,
+            'chinese_name': row.chinese_name,
+            'nickname': row.nickname,
+            'gender': row.gender,
+            'birth_date': row.birth_date.isoformat() if row.birth_date else None,
+            'is_alive': row.is_alive,
+            'photo_filename': row.photo_filename,
+            'updated_at': row.updated_at.isoformat() if row.updated_at else None
+        } for row in rows],
+        'next_cursor': next_cursor,
+        'total': total
+    })
+
+@bp.route('/api/search')
+@login_required
+def search_members():
+    """Filtered, keyset-paged members with facet counts for every filter, in one request.
+
+    Filters: q (name text), gender, is_alive, marital_status, born_from and
+    born_to (years), place (a place or region), has_photo and
+    unlinked_children (says they have children but none is linked). Sorting
+    and paging work as in /api/members/table; facets and the total come with
+    the first page only.
+    """
+    if not is_tree_admin(current_user):
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    sort = request.args.get('sort', 'name')
+    if sort not in MEMBER_TABLE_SORTS:
+        return jsonify({'success': False, 'message': f"sort must be one of {', '.join(MEMBER_TABLE_SORTS)}"}), 400
+    descending = request.args.get('direction', 'asc') == 'desc'
+    limit = max(1, min(request.args.get('limit', 50, type=int), MEMBER_TABLE_MAX_LIMIT))
+    try:
+        filters = search_filters(request.args)
+    except SearchError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    query = db.session.query(FamilyMember.id, FamilyMember.full_name, FamilyMember.chinese_name,
+                             FamilyMember.nickname, FamilyMember.gender, FamilyMember.birth_date,
+                             FamilyMember.is_alive, FamilyMember.marital_status, FamilyMember.birth_place,
+                             FamilyMember.photo_filename, FamilyMember.updated_at)
+    if filters:
+        query = query.filter(*filters.values())
+    first_page = not request.args.get('after')
+    try:
+        rows, next_cursor = _keyset_page(query, sort, descending, limit, request.args.get('after'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    total, facets = search_summary(request.args, filters) if first_page else (None, None)
+    return jsonify({
+        'success': True,
+        'members': [{
+            'id': row.id,
+            'full_name': row.full_name,
+            'chinese_name': row.chinese_name,
+            'nickname': row.nickname,
+            'gender': row.gender,
+            'birth_date': row.birth_date.isoformat() if row.birth_date else None,
+            'is_alive': row.is_alive,
+            'marital_status': row.marital_status,
+            'birth_place': row.birth_place,
+            'photo_filename': row.photo_filename,
+            'updated_at': row.updated_at.isoformat() if row.updated_at else None
+        } for row in rows],
+        'next_cursor': next_cursor,
+        'total': total,
+        'facets': facets
+    })
+
+def build_family_stats():
+    """Aggregate family statistics with GROUP BY queries instead of loading every member."""
+    status_counts = dict(db.session.query(FamilyMember.is_alive, db.func.count(FamilyMember.id))
+                         .group_by(FamilyMember.is_alive).all())
+    gender_counts = (db.session.query(FamilyMember.gender, db.func.count(FamilyMember.id))
+                     .group_by(FamilyMember.gender).all())
+    marital_counts = (db.session.query(FamilyMember.marital_status, db.func.count(FamilyMember.id))
+                      .group_by(FamilyMember.marital_status).all())
+
+    births_by_decade = {entry['decade']: entry['births'] for entry in decade_timeline() if entry['births']}
+
+    # Spelling variants of a place are interned to one Place row, so they count together
+    top_birth_places = (db.session.query(Place.name, db.func.count(FamilyMember.id).label('count'))
+                        .join(FamilyMember, FamilyMember.birth_place_id == Place.id)
+                        .group_by(Place.id, Place.name)
+                        .order_by(db.desc('count'), Place.name)
+                        .limit(10).all())
+
+    recent_additions = (db.session.query(FamilyMember.id, FamilyMember.full_name, FamilyMember.created_at)
+                        .order_by(FamilyMember.created_at.desc(), FamilyMember.id.desc())
+                        .limit(5).all())
+
+    generation_counts = dict(db.session.query(FamilyMember.generation, db.func.count(FamilyMember.id))
+                             .group_by(FamilyMember.generation).all())
+
+    total = sum(status_counts.values())
+    living = status_counts.get(True, 0)
+    return {
+        'total_members': total,
+        'living_members': living,
+        'deceased_members': total - living,
+        'with_birth_dates': sum(births_by_decade.values()),
+        'gender': counts_by_value(gender_counts),
+        'marital_status': counts_by_value(marital_counts),
+        'generations': [{'generation': generation, 'count': generation_counts[generation]}
+                        for generation in sorted(generation_counts)],
+        'births_by_decade': [{'decade': decade, 'count': births_by_decade[decade]}
+                             for decade in sorted(births_by_decade)],
+        'top_birth_places': [{'place': place, 'count': count} for place, count in top_birth_places],
+        'recent_additions': [{
+            'id': member_id,
+            'full_name': full_name,
+            'created_at': created_at.isoformat() if created_at else None
+        } for member_id, full_name, created_at in recent_additions]
+    }
+
+@bp.route('/api/stats')
+def get_family_stats():
+    stats = cached_for_version('stats', build_family_stats)
+    return jsonify(dict(stats, data_version=current_data_version()))
+
+@bp.route('/api/upcoming-dates')
+def get_upcoming_dates():
+    """Birthdays of living members and death anniversaries in the next `days` days."""
+    try:
+        start = parse_date(request.args.get('from')) or date.today()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'from must be a YYYY-MM-DD date'}), 400
+    days = max(0, min(request.args.get('days', 7, type=int), MAX_WINDOW_DAYS))
+    return jsonify({
+        'success': True,
+        'from': start.isoformat(),
+        'to': (start + timedelta(days=days)).isoformat(),
+        'birthdays': upcoming_dates('birthday', start, days),
+        'death_anniversaries': upcoming_dates('death', start, days)
+    })
+
+@bp.route('/api/members/alive-at')
+def get_members_alive_at():
+    """Members alive on a date, in birth order; keyset pages like the member table."""
+    try:
+        day = parse_date(request.args.get('date'))
+    except ValueError:
+        day = None
+    if day is None:
+        return jsonify({'success': False, 'message': 'date must be a YYYY-MM-DD date'}), 400
+    limit = max(1, min(request.args.get('limit', 50, type=int), MEMBER_TABLE_MAX_LIMIT))
+
+    query = db.session.query(FamilyMember.id, FamilyMember.full_name, FamilyMember.chinese_name,
+                             FamilyMember.gender, FamilyMember.birth_date, FamilyMember.death_date
+                             ).filter(alive_at_filter(day))
+    total = query.count() if not request.args.get('after') else None
+    if request.args.get('after'):
+        try:
+            birth_date, member_id = decode_cursor(request.args['after'], 'birth_date')
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        query = query.filter(db.tuple_(FamilyMember.birth_date, FamilyMember.id) > (birth_date, member_id))
+    rows = query.order_by(FamilyMember.birth_date, FamilyMember.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        'success': True,
+        'date': day.isoformat(),
+        'members': [{
+            'id': row.id,
+            'full_name': row.full_name,
+            'chinese_name': row.chinese_name,
+            'gender': row.gender,
+            'birth_date': row.birth_date.isoformat(),
+            'death_date': row.death_date.isoformat() if row.death_date else None,
+            'age': day.year - row.birth_date.year - ((day.month, day.day) < (row.birth_date.month, row.birth_date.day))
+        } for row in rows],
+        'next_cursor': encode_cursor(rows[-1].birth_date, rows[-1].id) if has_more else None,
+        'total': total
+    })
+
+@bp.route('/api/timeline')
+def get_timeline():
+    """Births and deaths per decade, or the individual events of one decade with ?decade=1950."""
+    decade = request.args.get('decade', type=int)
+    if decade is None:
+        return jsonify({'success': True, 'decades': cached_for_version('decade_timeline', decade_timeline)})
+    limit = max(1, min(request.args.get('limit', 500, type=int), 5000))
+    return jsonify({'success': True, 'decade': decade // 10 * 10,
+                    'events': decade_events(decade // 10 * 10, limit)})
+
+@bp.route('/api/integrity-issues')
+def get_integrity_issues():
+    query = IntegrityIssue.query
+    if request.args.get('kind'):
+        query = query.filter(IntegrityIssue.kind == request.args['kind'])
+    member_id = request.args.get('member_id', type=int)
+    if member_id is not None:
+        query = query.filter(db.or_(IntegrityIssue.member_id == member_id,
+                                    IntegrityIssue.related_member_id == member_id))
+    limit = min(request.args.get('limit', 500, type=int), 5000)
+    issues = query.order_by(IntegrityIssue.kind, IntegrityIssue.member_id, IntegrityIssue.id).limit(limit).all()
+
+    counts = dict(db.session.query(IntegrityIssue.kind, db.func.count(IntegrityIssue.id))
+                  .group_by(IntegrityIssue.kind).all())
+    return jsonify({
+        'success': True,
+        'issues': [{
+            'id': issue.id,
+            'kind': issue.kind,
+            'member_id': issue.member_id,
+            'related_member_id': issue.related_member_id,
+            'relationship_id': issue.relationship_id,
+            'message': issue.message,
+            'created_at': issue.created_at.isoformat() if issue.created_at else None
+        } for issue in issues],
+        'counts': counts,
+        'total': sum(counts.values()),
+        'scan': integrity_scan_state()
+    })
+
+@bp.route('/api/integrity-scan', methods=['POST'])
+@login_required
+def start_integrity_scan():
+    if not is_tree_admin(current_user):
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    if not start_background_integrity_scan():
+        return jsonify({'success': False, 'message': 'An integrity scan is already running'}), 409
+    return jsonify({'success': True, 'message': 'Integrity scan started'}), 202
+
+@bp.route('/api/get-member/<int:member_id>')
+def get_family_member(member_id):
+    """One member; ?include=parents,children,spouses,siblings adds those relatives in the same response."""
+    try:
+        include = parse_include(request.args.get('include'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if include:
+        member, relatives = load_relatives(member_id, include)
+        if member is None:
+            abort(404)
+    else:
+        member = FamilyMember.query.get_or_404(member_id)
+    data = {
+        'id': member.id,
+        'full_name': member.full_name,
+        'chinese_name': member.chinese_name,
+        'nickname': member.nickname,
+        'birth_date': member.birth_date.isoformat() if member.birth_date else None,
+        'death_date': member.death_date.isoformat() if member.death_date else None,
+        'birth_place': member.birth_place,
+        'death_place': member.death_place,
+        'gender': member.gender,
+        'notes': member.notes,
+        'photo_filename': member.photo_filename,
+        'is_alive': member.is_alive,
+        'marital_status': member.marital_status,
+        'father_name': member.father_name,
+        'mother_name': member.mother_name,
+        'spouse_name': member.spouse_name,
+        'have_children': member.have_children,
+        'children_data': member.children_data,
+        'created_at': member.created_at.isoformat(),
+        'version': member.version
+    }
+    for kind in include:
+        data[kind] = [relative_summary(relative) for relative in relatives[kind]]
+    response = jsonify(data)
+    response.set_etag(str(member.version))
+    return response
+
+def _save_member(member):
+    """Commit the member's changes; when no value actually changed, write nothing."""
+    member_id, version = member.id, member.version
+    changed = db.session.is_modified(member)
+    if changed:
+        db.session.commit()
+        version = member.version
+    else:
+        db.session.rollback()
+    response = jsonify({'success': True, 'changed': changed, 'id': member_id, 'version': version,
+                        'message': 'Family member updated successfully' if changed else 'Nothing to update'})
+    response.set_etag(str(version))
+    return response
+
+def _version_conflict(member, data):
+    """A 409 response if the client read an older version than the stored one, else None.
+
+    The version read comes from If-Match (the ETag of /api/get-member) or a
+    "version" field; a request with neither is not checked.
+    """
+    if request.if_match:
+        matches = request.if_match.contains(str(member.version))
+    elif data.get('version') not in (None, ''):
+        matches = str(data['version']) == str(member.version)
+    else:
+        return None
+    if matches:
+        return None
+    return _conflict_response(member.version)
+
+def _conflict_response(version):
+    response = jsonify({'success': False, 'version': version,
+                        'message': 'This member was changed by someone else; reload it and try again'})
+    response.set_etag(str(version))
+    return response, 409
+
+@bp.route('/api/update-member/<int:member_id>', methods=['PUT', 'POST'])
+def update_family_member(member_id):
+    try:
+        member = FamilyMember.query.get_or_404(member_id)
+        
+        # Handle both JSON and form data
+        if request.is_json:
+            data = request.get_json()
+            photo_file = None  # Keep existing photo if no new one
+        else:
+            data = request.form.to_dict()
+            photo_file = request.files.get('photo')
+        
+        conflict = _version_conflict(member, data)
+        if conflict:
+            return conflict
+        
+        # Update member fields; updated_at and version only change if a value does
+        for name, value in member_fields_from_data(data).items():
+            setattr(member, name, value)
+        if photo_file:
+            member.photo_filename = save_photo(photo_file)
+        
+        return _save_member(member)
+    
+    except db.orm.exc.StaleDataError:
+        db.session.rollback()
+        return _conflict_response(db.session.get(FamilyMember, member_id).version)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/update-member/<int:member_id>', methods=['PATCH'])
+def patch_family_member(member_id):
+    """Change only the fields sent, as JSON or form data (plus an optional photo).
+
+    Send If-Match with the ETag from /api/get-member (or a "version" field)
+    to get 409 instead of overwriting an edit made since. When every value
+    sent is already stored nothing is written, so updated_at, the version
+    and the cached responses stay as they are.
+    """
+    member = FamilyMember.query.get_or_404(member_id)
+    try:
+        if request.is_json:
+            data = request.get_json() or {}
+            photo_file = None
+        else:
+            data = request.form.to_dict()
+            photo_file = request.files.get('photo')
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'message': 'Send an object of the fields to change'}), 400
+        
+        conflict = _version_conflict(member, data)
+        if conflict:
+            return conflict
+        
+        fields = member_fields_from_data(data, partial=True)
+        for name in ('full_name', 'gender'):
+            if name in fields and not fields[name]:
+                return jsonify({'success': False, 'message': f'{name} cannot be empty'}), 400
+        
+        for name, value in fields.items():
+            setattr(member, name, value)
+        if photo_file:
+            member.photo_filename = save_photo(photo_file)
+        
+        return _save_member(member)
+    
+    except db.orm.exc.StaleDataError:
+        # Someone saved between our read and our write
+        db.session.rollback()
+        return _conflict_response(db.session.get(FamilyMember, member_id).version)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/delete-member/<int:member_id>', methods=['DELETE', 'POST'])
+def delete_family_member(member_id):
+    try:
+        member = FamilyMember.query.get_or_404(member_id)
+        
+        # Children losing this parent may move up a generation
+        child_ids = [row.child_id for row in db.session.query(FamilyRelationship.child_id).filter_by(
+            parent_id=member_id, relationship_type='parent')]
+        
+        # Delete associated relationships first
+        FamilyRelationship.query.filter_by(parent_id=member_id).delete()
+        FamilyRelationship.query.filter_by(child_id=member_id).delete()
+        if child_ids:
+            relax_generations(db.session.connection(), child_ids)
+        
+        # Delete the member
+        db.session.delete(member)
+        db.session.commit()
+        
+        return jsonify({'success': True, 'message': 'Family member deleted successfully'})
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)})
+
+MAX_MERGE_MEMBERS = 5000
+
+@bp.route('/api/merge-members', methods=['POST'])
+@login_required
+def merge_family_members():
+    """Merge duplicates into a survivor, keeping every relationship.
+
+    Accepts {"survivor_id": 1, "loser_ids": [2, 3]} or, to clean up many
+    duplicates in one transaction, {"merges": [{"survivor_id": ..., "loser_ids": [...]}, ...]}.
+    """
+    if not is_tree_admin(current_user):
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    try:
+        data = request.get_json() or {}
+        merges = data.get('merges', [data] if 'survivor_id' in data else [])
+        groups = []
+        for merge in merges:
+            loser_ids = merge.get('loser_ids')
+            if not isinstance(loser_ids, list) or not loser_ids:
+                return jsonify({'success': False, 'message': 'Each merge needs a survivor_id and a non-empty loser_ids list'})
+            groups.append((int(merge['survivor_id']), [int(loser_id) for loser_id in loser_ids]))
+        if not groups:
+            return jsonify({'success': False, 'message': 'No merges given'})
+        if sum(len(loser_ids) + 1 for _, loser_ids in groups) > MAX_MERGE_MEMBERS:
+            return jsonify({'success': False, 'message': f'A request can merge at most {MAX_MERGE_MEMBERS} members'})
+
+        counts = merge_members(groups)
+        db.session.commit()
+
+        return jsonify(dict(counts, success=True,
+                            message=f"Merged {counts['merged']} member(s) into {counts['survivors']} survivor(s)"))
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/check-existing-names', methods=['POST'])
+def check_existing_names():
+    try:
+        data = request.get_json()
+        full_name = data.get('full_name', '').strip()
+        
+        if not full_name:
+            return jsonify({'success': False, 'message': 'Full name is required'})
+        
+        # Check for exact matches
+        exact_matches = FamilyMember.query.filter(
+            FamilyMember.full_name.ilike(f'%{full_name}%')
+        ).all()
+        
+        # Check for similar names (fuzzy matching)
+        similar_matches = FamilyMember.query.filter(
+            db.or_(
+                FamilyMember.nickname.ilike(f'%{full_name}%'),
+                FamilyMember.chinese_name.ilike(f'%{full_name}%')
+            )
+        ).all()
+        
+        # Combine and deduplicate results
+        all_matches = list(set(exact_matches + similar_matches))
+        
+        matches_data = []
+        for member in all_matches:
+            matches_data.append({
+                'id': member.id,
+                'full_name': member.full_name,
+                'chinese_name': member.chinese_name,
+                'nickname': member.nickname,
+                'gender': member.gender,
+                'birth_date': member.birth_date.isoformat() if member.birth_date else None,
+                'is_alive': member.is_alive
+            })
+        
+        return jsonify({
+            'success': True,
+            'matches': matches_data,
+            'count': len(matches_data)
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+MAX_AUTOCOMPLETE_RESULTS = 25
+
+@bp.route('/api/autocomplete')
+def autocomplete():
+    try:
+        query = request.args.get('q', '').strip()
+        limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_AUTOCOMPLETE_RESULTS)
+        matches = name_index().search(query, limit) if query else []
+        return jsonify({'success': True, 'matches': matches, 'count': len(matches)})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+BATCH_OPERATIONS = ('create_member', 'update_member', 'create_relationship')
+MAX_BATCH_OPERATIONS = 200
+
+def validate_batch(operations):
+    """Check a whole batch before anything is written; returns a list of {operation, message} errors."""
+    errors = []
+    temp_ids = set()
+    existing_refs = {}
+
+    def check_member_ref(index, ref):
+        # Temp ids must be created earlier in the batch; real ids are checked in one query below
+        if isinstance(ref, str) and not ref.isdigit():
+            if ref not in temp_ids:
+                errors.append({'operation': index, 'message': f'temp_id {ref!r} is not created earlier in the batch'})
+            return
+        try:
+            existing_refs.setdefault(int(ref), []).append(index)
+        except (TypeError, ValueError):
+            errors.append({'operation': index, 'message': f'Unknown member reference {ref!r}'})
+
+    def check_member_data(index, data, partial):
+        if not isinstance(data, dict):
+            errors.append({'operation': index, 'message': 'data must be an object'})
+            return
+        for name in ('full_name', 'gender'):
+            if (not partial or name in data) and not str(data.get(name) or '').strip():
+                errors.append({'operation': index, 'message': f'{name} is required'})
+        for name in ('birth_date', 'death_date'):
+            try:
+                parse_date(data.get(name))
+            except (TypeError, ValueError):
+                errors.append({'operation': index, 'message': f'{name} must be a YYYY-MM-DD date'})
+
+    for index, operation in enumerate(operations):
+        kind = operation.get('op') if isinstance(operation, dict) else None
+        if kind not in BATCH_OPERATIONS:
+            errors.append({'operation': index, 'message': f"op must be one of {', '.join(BATCH_OPERATIONS)}"})
+        elif kind == 'create_member':
+            temp_id = operation.get('temp_id')
+            if not isinstance(temp_id, str) or not temp_id or temp_id.isdigit() or temp_id in temp_ids:
+                errors.append({'operation': index, 'message': 'create_member needs a unique, non-numeric temp_id'})
+            else:
+                temp_ids.add(temp_id)
+            check_member_data(index, operation.get('data'), partial=False)
+        elif kind == 'update_member':
+            check_member_ref(index, operation.get('id'))
+            check_member_data(index, operation.get('data'), partial=True)
+        else:
+            check_member_ref(index, operation.get('member_id'))
+            check_member_ref(index, operation.get('related_member_id'))
+            if operation.get('relationship_type') not in ('parent', 'spouse'):
+                errors.append({'operation': index, 'message': 'relationship_type must be parent or spouse'})
+            elif str(operation.get('member_id')) == str(operation.get('related_member_id')):
+                errors.append({'operation': index, 'message': 'A member cannot be related to themselves'})
+
+    if existing_refs:
+        found = {row.id for row in db.session.query(FamilyMember.id).filter(FamilyMember.id.in_(existing_refs))}
+        for member_id in sorted(set(existing_refs) - found):
+            for index in existing_refs[member_id]:
+                errors.append({'operation': index, 'message': f'Member #{member_id} does not exist'})
+    return sorted(errors, key=lambda error: error['operation'])
+
+@bp.route('/api/batch', methods=['POST'])
+def apply_batch():
+    """Apply member creates/updates and relationship links in one transaction.
+
+    Operations may refer to members created earlier in the same batch by
+    their client-side temp_id; the response maps each temp_id to the new
+    member id. Multipart requests send the operations as a JSON string in
+    the 'operations' field, and a member op's 'photo' names its file field.
+    A link repeated in the batch is made once; the response lists the
+    repeats under 'skipped'.
+    """
+    saved_photos = []
+    index = None
+    try:
+        if request.is_json:
+            operations = (request.get_json() or {}).get('operations')
+        else:
+            operations = json.loads(request.form.get('operations') or 'null')
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'success': False, 'message': 'operations must be a non-empty list'})
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({'success': False, 'message': f'A batch can hold at most {MAX_BATCH_OPERATIONS} operations'})
+
+        errors = validate_batch(operations)
+        if errors:
+            return jsonify({'success': False, 'message': errors[0]['message'], 'errors': errors})
+
+        id_map = {}
+        linked = set()
+        skipped = []
+
+        def resolve(ref):
+            return id_map[ref] if ref in id_map else int(ref)
+
+        def photo_for(operation):
+            photo_file = request.files.get(operation['photo']) if operation.get('photo') else None
+            photo_filename = save_photo(photo_file) if photo_file else None
+            if photo_filename:
+                saved_photos.append(photo_filename)
+            return photo_filename
+
+        for index, operation in enumerate(operations):
+            if operation['op'] == 'create_member':
+                member = FamilyMember(photo_filename=photo_for(operation),
+                                      **member_fields_from_data(operation['data']))
+                db.session.add(member)
+                db.session.flush()
+                id_map[operation['temp_id']] = member.id
+            elif operation['op'] == 'update_member':
+                member = db.session.get(FamilyMember, resolve(operation['id']))
+                for name, value in member_fields_from_data(operation['data'], partial=True).items():
+                    setattr(member, name, value)
+                photo_filename = photo_for(operation)
+                if photo_filename:
+                    member.photo_filename = photo_filename
+                db.session.flush()
+            else:
+                member_id, related_member_id = resolve(operation['member_id']), resolve(operation['related_member_id'])
+                relationship_type = operation['relationship_type']
+                # The same person confirmed for two fields (or sent twice) is linked once
+                pair = (member_id, related_member_id) if relationship_type == 'parent' \
+                    else frozenset((member_id, related_member_id))
+                if (pair, relationship_type) in linked:
+                    skipped.append(index)
+                    continue
+                linked.add((pair, relationship_type))
+                link_members(member_id, related_member_id, relationship_type)
+                # Flushing here runs the cycle check against this operation
+                db.session.flush()
+
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'message': f'Applied {len(operations) - len(skipped)} operation(s) successfully',
+            'id_map': id_map,
+            'skipped': skipped
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        for photo_filename in saved_photos:
+            try:
+                os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], photo_filename))
+            except OSError:
+                pass
+        return jsonify({'success': False, 'message': str(e), 'operation': index})
+
+@bp.route('/api/convert-children-to-members', methods=['POST'])
+def convert_children_to_members():
+    """Convert all children data stored in children_data field to separate family member records"""
+    try:
+        from ..conversions import convert_children_to_members as convert
+        converted_count, new_member_ids = convert()
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': f'Successfully converted {converted_count} children to separate family members',
+            'new_member_ids': new_member_ids,
+            'converted_count': converted_count
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error converting children: {str(e)}'}), 500
+
+@bp.route('/api/convert-spouses-to-members', methods=['POST'])
+def convert_spouses_to_members():
+    """Convert all spouse names stored in spouse_name field to separate family member records"""
+    try:
+        from ..conversions import convert_spouses_to_members as convert
+        converted_count, new_member_ids = convert()
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': f'Successfully converted {converted_count} spouses to separate family members',
+            'new_member_ids': new_member_ids,
+            'converted_count': converted_count
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Error converting spouses: {str(e)}'}), 500
@@ -0,0 +1,68 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_from_directory, current_app, make_response
+from flask_login import login_user, logout_user, login_required, current_user
+
+from ..auth import authenticate, LoginRefused
+from ..trees import is_tree_admin, select_tree_for_login
+from ..snapshot import snapshot_key
+
+bp = Blueprint('pages', __name__)
+
+@bp.route('/')
+def index():
+    return render_template('index.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    # If user is already logged in, redirect them
+    if current_user.is_authenticated:
+        return redirect(url_for('pages.admin_dashboard' if is_tree_admin(current_user) else 'pages.family_form'))
+    
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        remember_me = request.form.get('remember_me') == 'on'  # Checkbox value
+        try:
+            user = authenticate(username, password, request.remote_addr)
+        except LoginRefused as e:
+            flash(str(e))
+            response = make_response(render_template('login.html'), e.status)
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        
+        if user:
+            login_user(user, remember=remember_me)  # Remember based on checkbox
+            select_tree_for_login(user)
+            return redirect(url_for('pages.admin_dashboard' if is_tree_admin(user) else 'pages.family_form'))
+        
+        flash('Invalid username or password')
+    
+    return render_template('login.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('pages.index'))
+
+@bp.route('/family-form')
+def family_form():
+    return render_template('family_form.html')
+
+@bp.route('/admin')
+@login_required
+def admin_dashboard():
+    if not is_tree_admin(current_user):
+        flash('Access denied')
+        return redirect(url_for('pages.family_form'))
+    
+    # The member table loads its rows page by page from /api/members/table
+    return render_template('admin_dashboard.html')
+
+@bp.route('/family-tree')
+def family_tree():
+    # Tells the page whether its IndexedDB copy of the tree is still current
+    return render_template('family_tree.html', snapshot_key=snapshot_key())
+
+@bp.route('/uploads/<filename>')
+def uploaded_file(filename):
+    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
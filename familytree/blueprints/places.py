@@ -0,0 +1,63 @@
+from flask import Blueprint, request, jsonify
+
+from ..extensions import db
+from ..models import FamilyMember, Place
+from ..places import place_counts, region_counts, place_flows
+
+bp = Blueprint('places', __name__)
+
+MAX_PLACE_RESULTS = 1000
+
+def _limit(default):
+    return max(1, min(request.args.get('limit', default, type=int), MAX_PLACE_RESULTS))
+
+@bp.route('/api/places')
+def get_places():
+    """Places with birth and death counts (filter with q or region), or ?group=region for the rollup."""
+    try:
+        if request.args.get('group') == 'region':
+            return jsonify({'success': True, 'regions': region_counts(_limit(100))})
+        places = place_counts(request.args.get('q', '').strip() or None, request.args.get('region'), _limit(100))
+        return jsonify({'success': True, 'places': places, 'count': len(places)})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/places/flows')
+def get_place_flows():
+    """Birth place to death place counts; ?by=region rolls them up to regions."""
+    try:
+        flows = place_flows(request.args.get('by') == 'region', _limit(100))
+        return jsonify({'success': True, 'flows': flows})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/places/<int:place_id>/members')
+def get_place_members(place_id):
+    """Members born (or with ?type=death, died) at a place, by id; pass next_after as after for more."""
+    place = db.session.get(Place, place_id)
+    if place is None:
+        return jsonify({'success': False, 'message': 'Place not found'}), 404
+    column = FamilyMember.death_place_id if request.args.get('type') == 'death' else FamilyMember.birth_place_id
+    limit = _limit(100)
+    query = (db.session.query(FamilyMember.id, FamilyMember.full_name, FamilyMember.chinese_name,
+                              FamilyMember.birth_date, FamilyMember.death_date, FamilyMember.is_alive)
+             .filter(column == place_id))
+    after = request.args.get('after', type=int)
+    if after is not None:
+        query = query.filter(FamilyMember.id > after)
+    rows = query.order_by(FamilyMember.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return jsonify({
+        'success': True,
+        'place': {'id': place.id, 'name': place.name, 'region': place.region},
+        'members': [{
+            'id': row.id,
+            'full_name': row.full_name,
+            'chinese_name': row.chinese_name,
+            'birth_date': row.birth_date.isoformat() if row.birth_date else None,
+            'death_date': row.death_date.isoformat() if row.death_date else None,
+            'is_alive': row.is_alive
+        } for row in rows],
+        'next_after': rows[-1].id if has_more else None
+    })
@@ -0,0 +1,250 @@
+from flask import Blueprint, request, jsonify, current_app
+
+from ..extensions import db
+from ..models import FamilyMember, FamilyRelationship
+from ..services import link_members
+from ..coalesce import coalesced, Overloaded, overloaded_response
+from ..kinship import MAX_PEDIGREE_GENERATIONS, current_pedigree
+from ..snapshot import build_snapshot
+from ..families import family_units, member_families
+from ..relatives import relative_summary
+
+bp = Blueprint('relationships', __name__)
+
+@bp.route('/api/suggest-relationships', methods=['POST'])
+def suggest_relationships():
+    try:
+        data = request.get_json()
+        member_id = data.get('member_id')
+        father_name = data.get('father_name', '').strip()
+        mother_name = data.get('mother_name', '').strip()
+        spouse_name = data.get('spouse_name', '').strip()
+        
+        suggestions = []
+        
+        # Check for father
+        if father_name:
+            father_matches = FamilyMember.query.filter(
+                FamilyMember.full_name.ilike(f'%{father_name}%')
+            ).all()
+            for match in father_matches:
+                suggestions.append({
+                    'type': 'parent',
+                    'relationship': 'father',
+                    'member': {
+                        'id': match.id,
+                        'full_name': match.full_name,
+                        'chinese_name': match.chinese_name,
+                        'nickname': match.nickname,
+                        'gender': match.gender
+                    }
+                })
+        
+        # Check for mother
+        if mother_name:
+            mother_matches = FamilyMember.query.filter(
+                FamilyMember.full_name.ilike(f'%{mother_name}%')
+            ).all()
+            for match in mother_matches:
+                suggestions.append({
+                    'type': 'parent',
+                    'relationship': 'mother',
+                    'member': {
+                        'id': match.id,
+                        'full_name': match.full_name,
+                        'chinese_name': match.chinese_name,
+                        'nickname': match.nickname,
+                        'gender': match.gender
+                    }
+                })
+        
+        # Check for spouse
+        if spouse_name:
+            spouse_matches = FamilyMember.query.filter(
+                FamilyMember.full_name.ilike(f'%{spouse_name}%')
+            ).all()
+            for match in spouse_matches:
+                suggestions.append({
+                    'type': 'spouse',
+                    'relationship': 'spouse',
+                    'member': {
+                        'id': match.id,
+                        'full_name': match.full_name,
+                        'chinese_name': match.chinese_name,
+                        'nickname': match.nickname,
+                        'gender': match.gender
+                    }
+                })
+        
+        return jsonify({
+            'success': True,
+            'suggestions': suggestions,
+            'count': len(suggestions)
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/create-relationship', methods=['POST'])
+def create_relationship():
+    try:
+        data = request.get_json()
+        member_id = data.get('member_id')
+        related_member_id = data.get('related_member_id')
+        relationship_type = data.get('relationship_type')  # 'parent', 'spouse', 'sibling'
+        
+        if not all([member_id, related_member_id, relationship_type]):
+            return jsonify({'success': False, 'message': 'Missing required fields'})
+        
+        link_members(member_id, related_member_id, relationship_type)
+        db.session.commit()
+        
+        if relationship_type == 'spouse':
+            return jsonify({'success': True, 'message': 'Spouse relationship created successfully'})
+        return jsonify({'success': True, 'message': 'Relationship created successfully'})
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/add-relationship', methods=['POST'])
+def add_relationship():
+    try:
+        data = request.get_json()
+        
+        relationship = FamilyRelationship(
+            parent_id=data['parent_id'],
+            child_id=data['child_id'],
+            relationship_type=data['relationship_type']
+        )
+        
+        db.session.add(relationship)
+        db.session.commit()
+        
+        return jsonify({'success': True, 'message': 'Relationship added successfully'})
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/kinship')
+def get_kinship():
+    """Kinship and relationship coefficients of members a and b, with their closest common ancestors."""
+    try:
+        a = request.args.get('a', type=int)
+        b = request.args.get('b', type=int)
+        if a is None or b is None:
+            return jsonify({'success': False, 'message': 'Give two member ids as a and b'}), 400
+        pedigree = current_pedigree()
+        if a not in pedigree or b not in pedigree:
+            return jsonify({'success': False, 'message': 'Member not found'}), 404
+        common = pedigree.closest_common_ancestors(a, b)
+        names = dict(db.session.query(FamilyMember.id, FamilyMember.full_name).filter(FamilyMember.id.in_(common)))
+        return jsonify({
+            'success': True,
+            'a': a,
+            'b': b,
+            'kinship': pedigree.kinship(a, b),
+            'relationship': pedigree.relationship(a, b),
+            'inbreeding': {'a': pedigree.inbreeding(a), 'b': pedigree.inbreeding(b)},
+            'closest_common_ancestors': [{'id': member_id, 'full_name': names.get(member_id)}
+                                         for member_id in sorted(common)]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/pedigree/<int:member_id>')
+def get_pedigree_collapse(member_id):
+    """Inbreeding coefficient and pedigree collapse per generation back (?generations=, default 15)."""
+    try:
+        generations = min(max(request.args.get('generations', 15, type=int), 1), MAX_PEDIGREE_GENERATIONS)
+        pedigree = current_pedigree()
+        if member_id not in pedigree:
+            return jsonify({'success': False, 'message': 'Member not found'}), 404
+        return jsonify(dict(pedigree.collapse(member_id, generations), success=True, member_id=member_id,
+                            inbreeding=pedigree.inbreeding(member_id)))
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/member-families/<int:member_id>')
+def get_member_families(member_id):
+    """The family a member was born into and the families they head, each with partners and children."""
+    try:
+        born_into, families = member_families(member_id)
+        units = families + ([born_into] if born_into else [])
+        ids = {member_id} | {person_id for unit in units for person_id in (unit[1], unit[2], *unit[3])}
+        people = {member.id: member for member in FamilyMember.query.filter(FamilyMember.id.in_(ids))}
+        if member_id not in people:
+            return jsonify({'success': False, 'message': 'Member not found'}), 404
+
+        def family(unit):
+            unit_id, partner1_id, partner2_id, child_ids = unit
+            return {
+                'id': unit_id,
+                'partners': [relative_summary(people[partner_id]) for partner_id in (partner1_id, partner2_id)
+                             if partner_id in people],
+                'children': sorted((relative_summary(people[child_id]) for child_id in child_ids
+                                    if child_id in people),
+                                   key=lambda child: (child['birth_date'] is None, child['birth_date'] or '',
+                                                      child['full_name'], child['id']))
+            }
+
+        return jsonify({
+            'success': True,
+            'member_id': member_id,
+            'born_into': family(born_into) if born_into else None,
+            'families': [family(unit) for unit in families]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+def build_family_tree_json():
+    members = FamilyMember.query.all()
+    relationships = FamilyRelationship.query.all()
+    
+    tree_data = {
+        'members': [{
+            'id': member.id,
+            'full_name': member.full_name,
+            'chinese_name': member.chinese_name,
+            'nickname': member.nickname,
+            'birth_date': member.birth_date.isoformat() if member.birth_date else None,
+            'death_date': member.death_date.isoformat() if member.death_date else None,
+            'gender': member.gender,
+            'current_status': 'Living' if member.is_alive else 'Deceased',
+            'photo_filename': member.photo_filename,
+            'generation': member.generation
+        } for member in members],
+        'relationships': [{
+            'parent_id': rel.parent_id,
+            'child_id': rel.child_id,
+            'type': rel.relationship_type
+        } for rel in relationships],
+        'families': [{
+            'id': unit_id,
+            'partners': [partner_id for partner_id in (partner1_id, partner2_id) if partner_id is not None],
+            'children': child_ids
+        } for unit_id, partner1_id, partner2_id, child_ids in family_units()]
+    }
+    return current_app.json.dumps(tree_data)
+
+@bp.route('/api/family-tree-data')
+def get_family_tree_data():
+    # Everyone opening a shared tree link at once shares one build per data version
+    try:
+        body = coalesced('family-tree-data', build_family_tree_json)
+    except Overloaded as e:
+        return overloaded_response(e)
+    return current_app.response_class(body, mimetype='application/json')
+
+def build_family_tree_snapshot_json():
+    return current_app.json.dumps(build_snapshot(), separators=(',', ':'), ensure_ascii=False)
+
+@bp.route('/api/family-tree-snapshot')
+def get_family_tree_snapshot():
+    """The tree data in the compact columnar format of snapshot.py, built once per data version."""
+    try:
+        body = coalesced('family-tree-snapshot', build_family_tree_snapshot_json)
+    except Overloaded as e:
+        return overloaded_response(e)
+    return current_app.response_class(body, mimetype='application/json')
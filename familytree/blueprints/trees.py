@@ -0,0 +1,88 @@
+from flask import Blueprint, request, jsonify, session
+from flask_login import login_required, current_user
+
+from ..extensions import db
+from ..models import FamilyTree, TreeMembership, User
+from ..trees import TREE_ROLES, SLUG_PATTERN, can_open_tree, current_tree_id, open_trees, tree_role, is_tree_admin, use_tree
+
+bp = Blueprint('trees', __name__)
+
+def _tree_summary(tree):
+    return {
+        'id': tree.id,
+        'name': tree.name,
+        'slug': tree.slug,
+        'public': tree.is_public,
+        'role': tree_role(current_user, tree.id),
+        'current': tree.id == current_tree_id()
+    }
+
+@bp.route('/api/trees')
+def get_trees():
+    """The family trees the user may open, with their role in each and which one is current."""
+    return jsonify({'success': True, 'trees': [_tree_summary(tree) for tree in open_trees(current_user)]})
+
+@bp.route('/api/trees', methods=['POST'])
+@login_required
+def create_tree():
+    """Add a family tree ({name, slug, public}); installation admins only."""
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    try:
+        data = request.get_json() or {}
+        name = (data.get('name') or '').strip()
+        slug = (data.get('slug') or '').strip().lower()
+        if not name or not SLUG_PATTERN.match(slug):
+            return jsonify({'success': False,
+                            'message': 'name is required and slug must be lowercase letters, digits and dashes'}), 400
+        if FamilyTree.query.filter_by(slug=slug).first():
+            return jsonify({'success': False, 'message': f'A tree with slug {slug} already exists'}), 409
+        tree = FamilyTree(name=name[:200], slug=slug[:100], is_public=bool(data.get('public')))
+        db.session.add(tree)
+        db.session.commit()
+        return jsonify({'success': True, 'message': 'Family tree created', 'tree': _tree_summary(tree)}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/trees/<int:tree_id>/select', methods=['POST'])
+def select_tree(tree_id):
+    """Make this tree the current one for the session (same as visiting any page with ?tree=<slug>)."""
+    tree = db.session.get(FamilyTree, tree_id)
+    if tree is None:
+        return jsonify({'success': False, 'message': 'Family tree not found'}), 404
+    if not can_open_tree(current_user, tree):
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    session['tree_id'] = tree.id
+    use_tree(tree.id)
+    return jsonify({'success': True, 'tree': _tree_summary(tree)})
+
+@bp.route('/api/trees/<int:tree_id>/roles', methods=['PUT'])
+@login_required
+def set_tree_role(tree_id):
+    """Give a user a role in the tree ({username, role}); a null role removes them. Tree admins only."""
+    if db.session.get(FamilyTree, tree_id) is None:
+        return jsonify({'success': False, 'message': 'Family tree not found'}), 404
+    if not is_tree_admin(current_user, tree_id):
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    try:
+        data = request.get_json() or {}
+        role = data.get('role')
+        if role is not None and role not in TREE_ROLES:
+            return jsonify({'success': False, 'message': f"role must be one of {', '.join(TREE_ROLES)} or null"}), 400
+        user = User.query.filter_by(username=data.get('username')).first()
+        if user is None:
+            return jsonify({'success': False, 'message': 'User not found'}), 404
+        membership = TreeMembership.query.filter_by(user_id=user.id, tree_id=tree_id).first()
+        if role is None:
+            if membership is not None:
+                db.session.delete(membership)
+        elif membership is None:
+            db.session.add(TreeMembership(user_id=user.id, tree_id=tree_id, role=role))
+        else:
+            membership.role = role
+        db.session.commit()
+        return jsonify({'success': True, 'message': 'Role updated', 'username': user.username, 'role': role})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)})
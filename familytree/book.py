@@ -0,0 +1,122 @@
+"""The family book: a printable register of one ancestor's descendants.
+
+Descendants are numbered the Henry way: the ancestor is 1, their children
+11, 12, ... in birth order, grandchildren 111, 112, ..., and a tenth child
+or later is written in parentheses, 1(10). The book lists them generation
+by generation in that order.
+
+Only ids, numbers and names are walked up front, one query per generation.
+The people themselves are then read in chunks of BOOK_CHUNK_SIZE, with
+their spouses preloaded in one more query per chunk, and rendered as the
+chunk arrives, so the page starts at once and memory stays bounded by
+the chunk rather than the size of the family.
+"""
+from .extensions import db
+from .models import FamilyMember, FamilyRelationship
+
+BOOK_CHUNK_SIZE = 250
+MAX_BOOK_GENERATIONS = 50
+
+def _child_digit(position):
+    return str(position) if position < 10 else f'({position})'
+
+def parent_number(number):
+    """The Henry number of the parent a number was given under ('' for the ancestor)."""
+    if number.endswith(')'):
+        return number[:number.rindex('(')]
+    return number[:-1]
+
+def _birth_order(row):
+    _, child_id, full_name, birth_date = row
+    return (birth_date is None, birth_date, full_name, child_id)
+
+def descendant_register(ancestor_id, generations=MAX_BOOK_GENERATIONS):
+    """Number the ancestor's descendants; returns (generations, children).
+
+    generations is a list of [(number, member_id), ...] per generation in
+    number order, starting with [('1', ancestor_id)]. children maps a
+    member id to [(number, child_id, full_name), ...]. Someone descended
+    through both parents is numbered under the first parent reached and
+    only cross-referenced under the other, and is not walked twice.
+    """
+    rel = FamilyRelationship.__table__
+    member = FamilyMember.__table__
+    numbers = {ancestor_id: '1'}
+    levels = [[('1', ancestor_id)]]
+    children = {}
+    while len(levels) < generations:
+        frontier = levels[-1]
+        rows = []
+        for start in range(0, len(frontier), BOOK_CHUNK_SIZE):
+            parent_ids = [member_id for _, member_id in frontier[start:start + BOOK_CHUNK_SIZE]]
+            rows += db.session.execute(
+                db.select(rel.c.parent_id, member.c.id, member.c.full_name, member.c.birth_date)
+                .join(member, member.c.id == rel.c.child_id)
+                .where(rel.c.relationship_type == 'parent', rel.c.parent_id.in_(parent_ids))).all()
+        by_parent = {}
+        for row in sorted(rows, key=_birth_order):
+            by_parent.setdefault(row[0], []).append(row)
+        level = []
+        for number, parent_id in frontier:
+            for position, (_, child_id, full_name, _) in enumerate(by_parent.get(parent_id, ()), start=1):
+                if child_id not in numbers:
+                    numbers[child_id] = number + _child_digit(position)
+                    level.append((numbers[child_id], child_id))
+                children.setdefault(parent_id, []).append((numbers[child_id], child_id, full_name))
+        if not level:
+            break
+        levels.append(level)
+    return levels, children
+
+def _spouses(member_ids):
+    """{member id: [spouse, ...]} for the given members, in one query for the links and one for the people."""
+    rel = FamilyRelationship.__table__
+    edges = db.session.execute(
+        db.select(rel.c.parent_id, rel.c.child_id).where(
+            rel.c.relationship_type == 'spouse',
+            db.or_(rel.c.parent_id.in_(member_ids), rel.c.child_id.in_(member_ids)))).all()
+    wanted = set(member_ids)
+    spouse_ids = {}
+    for a, b in edges:
+        # Spouse links are stored in both directions; either one counts
+        for member_id, spouse_id in ((a, b), (b, a)):
+            if member_id in wanted and spouse_id != member_id:
+                spouse_ids.setdefault(member_id, set()).add(spouse_id)
+    all_spouse_ids = set().union(*spouse_ids.values()) if spouse_ids else set()
+    spouses = {row.id: row for row in db.session.execute(
+        db.select(FamilyMember.id, FamilyMember.full_name, FamilyMember.chinese_name,
+                  FamilyMember.birth_date, FamilyMember.death_date)
+        .where(FamilyMember.id.in_(all_spouse_ids)))} if all_spouse_ids else {}
+    return {member_id: sorted((spouses[spouse_id] for spouse_id in ids if spouse_id in spouses),
+                              key=lambda spouse: (spouse.birth_date is None, spouse.birth_date, spouse.full_name))
+            for member_id, ids in spouse_ids.items()}
+
+def book_entries(level, children):
+    """Yield one dict per person of a generation, reading BOOK_CHUNK_SIZE people at a time."""
+    for start in range(0, len(level), BOOK_CHUNK_SIZE):
+        chunk = level[start:start + BOOK_CHUNK_SIZE]
+        member_ids = [member_id for _, member_id in chunk]
+        members = {member.id: member for member in FamilyMember.query.options(db.load_only(
+            FamilyMember.full_name, FamilyMember.chinese_name, FamilyMember.nickname, FamilyMember.gender,
+            FamilyMember.birth_date, FamilyMember.death_date, FamilyMember.birth_place, FamilyMember.death_place,
+            FamilyMember.is_alive, FamilyMember.photo_filename)).filter(FamilyMember.id.in_(member_ids))}
+        spouses = _spouses(member_ids)
+        for number, member_id in chunk:
+            member = members.get(member_id)
+            if member is None:
+                continue
+            yield {
+                'number': number,
+                'parent_number': parent_number(number),
+                'member': member,
+                'spouses': spouses.get(member_id, []),
+                'children': children.get(member_id, []),
+            }
+
+def family_book(ancestor_id, generations=MAX_BOOK_GENERATIONS):
+    """Template values: the number of descendants and (generation, entries) pairs, read lazily."""
+    levels, children = descendant_register(ancestor_id, generations)
+    return {
+        'descendants': sum(len(level) for level in levels) - 1,
+        'generations': ((index, book_entries(level, children)) for index, level in enumerate(levels, start=1)),
+    }
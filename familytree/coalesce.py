@@ -0,0 +1,90 @@
+"""Single-flight coalescing for expensive read endpoints.
+
+Concurrent requests for the same endpoint, family tree and data version
+share one computation: the first builds the serialized response body while the
+rest wait for it (up to COALESCE_WAIT_TIMEOUT seconds), and the body is
+kept until the data version moves on. Each endpoint also has a cap on the
+requests waiting or building at once (COALESCE_MAX_ACTIVE); beyond it,
+requests are turned away with 503 and Retry-After instead of tying up
+every worker thread.
+"""
+import math
+import threading
+import time
+
+from flask import current_app, g, jsonify
+
+from .extensions import db
+from .trees import current_tree_id
+from .versioning import current_data_version
+
+class Overloaded(Exception):
+    """The request was shed; retry_after is in seconds."""
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _Flight:
+    def __init__(self, version):
+        self.version = version
+        self.done = threading.Event()
+        self.body = None
+        self.error = None
+
+_lock = threading.Lock()
+_flights = {}    # (tree id, name) -> in-flight or finished _Flight for the newest version seen
+_active = {}     # name -> requests currently waiting or building, over all trees
+_durations = {}  # (tree id, name) -> seconds the last build took
+
+def _retry_after(key):
+    return max(1, math.ceil(_durations.get(key, 1)))
+
+def coalesced(name, builder):
+    """Return builder()'s body for the current data version, building it at most once per version.
+
+    Raises Overloaded when too many requests for this endpoint are already
+    active or the shared build does not finish in time.
+    """
+    config = current_app.config
+    key = (current_tree_id(), name)
+    version = current_data_version()
+    with _lock:
+        flight = _flights.get(key)
+        if flight is not None and flight.version == version and flight.done.is_set() and flight.error is None:
+            g.versioned_body = (key, version)
+            return flight.body
+        if _active.get(name, 0) >= config['COALESCE_MAX_ACTIVE']:
+            raise Overloaded('The server is busy, please try again shortly', _retry_after(key))
+        _active[name] = _active.get(name, 0) + 1
+        leader = flight is None or flight.version != version or (flight.done.is_set() and flight.error is not None)
+        if leader:
+            flight = _flights[key] = _Flight(version)
+    try:
+        if leader:
+            started = time.perf_counter()
+            try:
+                flight.body = builder()
+            except Exception as e:
+                flight.error = e
+            finally:
+                _durations[key] = time.perf_counter() - started
+                flight.done.set()
+        else:
+            # Hand the pooled connection back while waiting; only the leader needs one
+            db.session.close()
+            if not flight.done.wait(config['COALESCE_WAIT_TIMEOUT']):
+                raise Overloaded('The server is busy, please try again shortly', _retry_after(key))
+        if flight.error is not None:
+            raise flight.error
+        # Lets compress.py reuse the compressed body for this version
+        g.versioned_body = (key, version)
+        return flight.body
+    finally:
+        with _lock:
+            _active[name] -= 1
+
+def overloaded_response(error):
+    response = jsonify({'success': False, 'message': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
@@ -0,0 +1,295 @@
+"""flask CLI commands: database setup and maintenance."""
+from datetime import date, timedelta
+
+import click
+from flask.cli import with_appcontext
+
+from .extensions import db
+from .models import User, FamilyTree, FamilyMember, FamilyRelationship, IntegrityIssue
+from .trees import SLUG_PATTERN, find_tree, use_tree
+from .integrity import run_integrity_scan
+from .generations import compute_generations, _write_generations
+from .families import rebuild_family_units
+from .dates import MAX_WINDOW_DAYS, upcoming_dates
+from .backups import BackupError, create_backup, list_backups, verify_backup, restore_backup
+
+SAMPLE_MEMBERS = [
+    {
+        'full_name': 'Juan Santos TU SANG',
+        'chinese_name': '胡安·桑托斯·图桑',
+        'nickname': 'Papa Juan',
+        'gender': 'Male',
+        'birth_date': date(1950, 1, 15),
+        'birth_place': 'Manila, Philippines',
+        'is_alive': True,
+        'notes': 'Family patriarch'
+    },
+    {
+        'full_name': 'Maria Cruz TU SANG',
+        'chinese_name': '玛丽亚·克鲁兹·图桑',
+        'nickname': 'Mama Maria',
+        'gender': 'Female',
+        'birth_date': date(1955, 3, 20),
+        'birth_place': 'Cebu, Philippines',
+        'is_alive': True,
+        'notes': 'Family matriarch'
+    },
+    {
+        'full_name': 'Pedro Juan TU SANG',
+        'chinese_name': '佩德罗·胡安·图桑',
+        'nickname': 'Pete',
+        'gender': 'Male',
+        'birth_date': date(1980, 7, 10),
+        'birth_place': 'Manila, Philippines',
+        'is_alive': True,
+        'notes': 'First son'
+    }
+]
+
+DEFAULT_TREE = {'name': 'TU SANG Family', 'slug': 'tu-sang', 'is_public': True}
+
+tree_option = click.option('--tree', 'tree_slug', help='Family tree slug (default: every tree, or the first).')
+
+def _trees(tree_slug):
+    """The tree named by --tree, or every tree when it was not given."""
+    if tree_slug:
+        tree = find_tree(tree_slug)
+        if tree is None:
+            raise click.ClickException(f"No family tree with slug {tree_slug}")
+        return [tree]
+    return FamilyTree.query.order_by(FamilyTree.id).all()
+
+def _create_tables():
+    """Create every table at the latest schema and record that revision for 'flask db upgrade'."""
+    from flask_migrate import stamp
+    db.create_all()
+    stamp()
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create or upgrade the tables, then add the admin user, the first family tree and sample members."""
+    print("Initializing TU SANG Family Tree Database...")
+    
+    # create_all() only adds missing tables, so an existing database is
+    # brought to the current schema with the migrations instead
+    if db.inspect(db.engine).has_table('alembic_version'):
+        from flask_migrate import upgrade
+        print("Upgrading database tables...")
+        upgrade()
+    else:
+        print("Creating database tables...")
+        _create_tables()
+    
+    # Check if admin user already exists
+    admin_user = User.query.filter_by(username='admin').first()
+    if not admin_user:
+        print("Creating admin user...")
+        admin = User(
+            username='admin',
+            email='admin@tusangfamily.com',
+            is_admin=True
+        )
+        admin.set_password('admin123')
+        db.session.add(admin)
+        db.session.commit()
+        print("✓ Admin user created: username=admin, password=admin123")
+    else:
+        print("✓ Admin user already exists")
+    
+    tree = FamilyTree.query.order_by(FamilyTree.id).first()
+    if tree is None:
+        print("Creating family tree...")
+        tree = FamilyTree(**DEFAULT_TREE)
+        db.session.add(tree)
+        db.session.commit()
+        print(f"✓ Family tree created: {tree.name} ({tree.slug})")
+    use_tree(tree.id)
+
+    # Add sample family members (optional)
+    if FamilyMember.query.count() == 0:
+        print("Adding sample family members...")
+        for member_data in SAMPLE_MEMBERS:
+            db.session.add(FamilyMember(**member_data))
+        db.session.commit()
+        print("✓ Sample family members added")
+    else:
+        print("✓ Family members already exist")
+    
+    print("\nDatabase initialization completed successfully!")
+    print("Run the application with: python app.py")
+    print("Login as admin: username=admin, password=admin123")
+
+@click.command('reset-db')
+@with_appcontext
+def reset_db_command():
+    """Drop and recreate all tables (WARNING: This will delete all data)."""
+    print("WARNING: This will delete ALL data in the database!")
+    confirm = input("Type 'YES' to confirm: ")
+    
+    if confirm == 'YES':
+        print("Dropping all tables...")
+        db.drop_all()
+        print("Recreating tables...")
+        _create_tables()
+        print("Database reset completed.")
+    else:
+        print("Database reset cancelled.")
+
+@click.command('db-status')
+@with_appcontext
+def db_status_command():
+    """Show current database status."""
+    user_count = User.query.count()
+    member_count = FamilyMember.query.count()
+    relationship_count = FamilyRelationship.query.count()
+    
+    print("\nDatabase Status:")
+    print(f"- Users: {user_count}")
+    print(f"- Family Members: {member_count}")
+    print(f"- Relationships: {relationship_count}")
+
+    trees = FamilyTree.query.order_by(FamilyTree.id).all()
+    if trees:
+        print("\nFamily trees:")
+        for tree in trees:
+            use_tree(tree.id)
+            print(f"  - {tree.name} ({tree.slug}): {FamilyMember.query.count()} member(s), "
+                  f"{FamilyRelationship.query.count()} relationship(s)")
+        use_tree(None)
+    
+    if user_count > 0:
+        print("\nUsers:")
+        for user in User.query.all():
+            roles = ', '.join(f"{role} of tree #{tree_id}" for tree_id, role in sorted(user.tree_roles.items()))
+            print(f"  - {user.username} ({'Admin' if user.is_admin else 'Regular'}{'; ' + roles if roles else ''})")
+
+@click.command('create-tree')
+@click.argument('name')
+@click.argument('slug')
+@click.option('--public', is_flag=True, help='Let anyone open the tree, not only its members.')
+@with_appcontext
+def create_tree_command(name, slug, public):
+    """Add a family tree, e.g. flask create-tree "Lim Family" lim."""
+    if not SLUG_PATTERN.match(slug):
+        raise click.ClickException("The slug must be lowercase letters, digits and dashes")
+    if find_tree(slug):
+        raise click.ClickException(f"A tree with slug {slug} already exists")
+    tree = FamilyTree(name=name, slug=slug, is_public=public)
+    db.session.add(tree)
+    db.session.commit()
+    print(f"✓ Family tree #{tree.id} created: {tree.name} ({tree.slug}, {'public' if public else 'members only'})")
+
+@click.command('check-integrity')
+@tree_option
+@with_appcontext
+def check_integrity_command(tree_slug):
+    """Run a full data integrity scan and store the issues found."""
+    for tree in _trees(tree_slug):
+        use_tree(tree.id)
+        issue_count, seconds = run_integrity_scan()
+        print(f"{tree.name}: integrity scan found {issue_count} issue(s) in {seconds * 1000:.1f} ms")
+        for kind, count in db.session.query(IntegrityIssue.kind, db.func.count(IntegrityIssue.id)).group_by(IntegrityIssue.kind):
+            print(f"- {kind}: {count}")
+
+@click.command('rebuild-generations')
+@tree_option
+@with_appcontext
+def rebuild_generations_command(tree_slug):
+    """Recompute every member's generation from the parent relationships."""
+    for tree in _trees(tree_slug):
+        use_tree(tree.id)
+        generations = compute_generations()
+        member_count = db.session.query(db.func.count(FamilyMember.id)).scalar()
+        _write_generations(db.session.connection(), generations)
+        db.session.info['data_changed'] = True
+        db.session.commit()
+        print(f"{tree.name}: rebuilt generations for {len(generations)} member(s)")
+        if len(generations) < member_count:
+            print(f"{member_count - len(generations)} member(s) are on or below a parent cycle; "
+                  f"run 'flask check-integrity --tree {tree.slug}' to find it")
+
+@click.command('rebuild-family-units')
+@tree_option
+@with_appcontext
+def rebuild_family_units_command(tree_slug):
+    """Derive every family unit (couple or lone parent and their children) from the relationships again."""
+    for tree in _trees(tree_slug):
+        use_tree(tree.id)
+        unit_count = rebuild_family_units(db.session.connection(), tree.id)
+        db.session.info['data_changed'] = True
+        db.session.commit()
+        print(f"{tree.name}: rebuilt {unit_count} family unit(s)")
+
+@click.command('birthday-digest')
+@click.option('--days', default=7, show_default=True, type=click.IntRange(0, MAX_WINDOW_DAYS),
+              help='Number of days ahead to include.')
+@tree_option
+@with_appcontext
+def birthday_digest_command(days, tree_slug):
+    """Print upcoming birthdays and death anniversaries, e.g. for a weekly digest."""
+    trees = _trees(tree_slug)
+    if not trees:
+        raise click.ClickException("There is no family tree yet; run 'flask init-db'")
+    tree = trees[0]
+    use_tree(tree.id)
+    start = date.today()
+    print(f"{tree.name} dates from {start.isoformat()} to {start + timedelta(days=days)}")
+    for title, kind, label in (('Birthdays', 'birthday', 'turns'), ('Remembering', 'death', 'years since passing:')):
+        entries = upcoming_dates(kind, start, days)
+        print(f"\n{title}:")
+        if not entries:
+            print("  (none)")
+        for entry in entries:
+            print(f"  {entry['date']}  {entry['full_name']} ({label} {entry['years']})")
+
+@click.command('backup-db')
+@with_appcontext
+def backup_db_command():
+    """Take a consistent snapshot of the SQLite database into the backup folder."""
+    try:
+        result = create_backup()
+    except BackupError as e:
+        raise click.ClickException(str(e))
+    print(f"Snapshot written to {result['path']}")
+    print(f"- {result['size']} bytes in {result['steps']} step(s), {result['seconds']:.2f}s")
+    print(f"- sha256 {result['sha256']}")
+
+@click.command('verify-backup')
+@click.argument('path', required=False)
+@with_appcontext
+def verify_backup_command(path):
+    """Check a snapshot's checksum and integrity (every snapshot if no PATH is given)."""
+    paths = [path] if path else list_backups()
+    if not paths:
+        print("No snapshots found.")
+        return
+    failed = 0
+    for snapshot in paths:
+        ok, message = verify_backup(snapshot)
+        failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {snapshot}: {message}")
+    if failed:
+        raise click.ClickException(f"{failed} snapshot(s) failed verification")
+
+@click.command('restore-db')
+@click.argument('path')
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation.')
+@with_appcontext
+def restore_db_command(path, yes):
+    """Replace the database with a verified snapshot (the current data is snapshotted first)."""
+    if not yes and not click.confirm(f"Replace the current database with {path}?"):
+        print("Restore cancelled.")
+        return
+    try:
+        safety = restore_backup(path)
+    except BackupError as e:
+        raise click.ClickException(str(e))
+    print(f"Database restored from {path}")
+    print(f"The previous data was saved to {safety['path']}")
+
+def register_commands(app):
+    for command in (init_db_command, reset_db_command, db_status_command, create_tree_command,
+                    check_integrity_command, rebuild_generations_command, rebuild_family_units_command,
+                    birthday_digest_command, backup_db_command, verify_backup_command, restore_db_command):
+        app.cli.add_command(command)
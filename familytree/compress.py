@@ -0,0 +1,94 @@
+"""Response compression: gzip, or zstd when the zstandard package is installed.
+
+JSON, text and HTML responses of at least COMPRESS_MIN_SIZE bytes are
+compressed with the best encoding the client accepts. Streamed responses
+are compressed chunk by chunk and flushed after each chunk, so the client
+keeps receiving data as it is produced. Bodies shared per data version
+(see coalesce.py) are compressed once per version and encoding, by one of
+the requests that share them, and then reused.
+"""
+import gzip
+import threading
+import zlib
+
+from flask import current_app, g, request
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip only
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/css',
+                          'text/javascript', 'application/javascript'}
+
+# ((tree id, name), encoding) -> (data version, compressed body) for the newest version seen
+_versioned_bodies = {}
+_lock = threading.Lock()
+_body_locks = {}  # ((tree id, name), encoding) -> lock held while that body is compressed
+
+def available_encodings():
+    """Encodings this server can produce, preferred first."""
+    return ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+
+def compress_body(data, encoding):
+    config = current_app.config
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=config['COMPRESS_ZSTD_LEVEL']).compress(data)
+    # mtime=0 so the same body always compresses to the same bytes
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+
+def _compress_chunks(chunks, encoding, config):
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=config['COMPRESS_ZSTD_LEVEL']).compressobj()
+        sync = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    else:
+        compressor = zlib.compressobj(config['COMPRESS_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        sync = zlib.Z_SYNC_FLUSH
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if chunk:
+            yield compressor.compress(chunk) + compressor.flush(sync)
+    yield compressor.flush()
+
+def _versioned_body(data, encoding):
+    # Set by coalesced() when the body is the shared one for a data version
+    key, version = g.get('versioned_body', (None, None))
+    if key is None:
+        return compress_body(data, encoding)
+    cached = _versioned_bodies.get((key, encoding))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _lock:
+        body_lock = _body_locks.setdefault((key, encoding), threading.Lock())
+    # The requests that shared a build arrive together; one compresses, the rest wait for it
+    with body_lock:
+        cached = _versioned_bodies.get((key, encoding))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        body = compress_body(data, encoding)
+        _versioned_bodies[(key, encoding)] = (version, body)
+    return body
+
+def compress_response(response):
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = _compress_chunks(response.response, encoding, current_app.config)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(_versioned_body(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_compression(app):
+    app.after_request(compress_response)
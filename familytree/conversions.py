@@ -0,0 +1,161 @@
+"""Turn names stored in text fields into real member records.
+
+Imported on first use by the conversion endpoints. The functions add to the
+session and leave committing to the caller.
+"""
+import json
+from datetime import datetime
+
+from .extensions import db
+from .models import FamilyMember, FamilyRelationship
+
+def convert_children_to_members():
+    """Convert all children data stored in children_data field to separate family member records.
+
+    Returns (converted count, new member ids).
+    """
+    # Get all members who have children data
+    members_with_children = FamilyMember.query.filter(
+        FamilyMember.children_data.isnot(None),
+        FamilyMember.children_data != '',
+        FamilyMember.children_data != '[]'
+    ).all()
+    
+    converted_count = 0
+    new_member_ids = []
+    
+    for parent in members_with_children:
+        try:
+            children_data = json.loads(parent.children_data)
+            if not children_data or not isinstance(children_data, list):
+                continue
+            
+            for child_data in children_data:
+                # Check if child already exists (by full name)
+                existing_child = FamilyMember.query.filter_by(full_name=child_data.get('full_name', '')).first()
+                if existing_child:
+                    continue  # Skip if child already exists
+                
+                # Create new family member for child
+                child_member = FamilyMember(
+                    full_name=child_data.get('full_name', ''),
+                    chinese_name=child_data.get('chinese_name', ''),
+                    nickname=child_data.get('nickname', ''),
+                    birth_date=datetime.strptime(child_data.get('birth_date', ''), '%Y-%m-%d').date() if child_data.get('birth_date') else None,
+                    birth_place='',  # Not stored in children_data
+                    death_date=None,  # Children are typically alive
+                    death_place='',
+                    gender=child_data.get('gender', ''),
+                    notes=f"Child of {parent.full_name}",
+                    photo_filename=None,
+                    is_alive=True,  # Children are typically alive
+                    marital_status='Single',  # Default for children
+                    father_name=parent.full_name if parent.gender == 'Male' else '',
+                    mother_name=parent.full_name if parent.gender == 'Female' else '',
+                    spouse_name='',
+                    have_children='No',
+                    children_data=None
+                )
+                
+                db.session.add(child_member)
+                db.session.flush()  # Get the ID
+                
+                # Create parent-child relationship
+                relationship = FamilyRelationship(
+                    parent_id=parent.id,
+                    child_id=child_member.id,
+                    relationship_type='parent'
+                )
+                db.session.add(relationship)
+                
+                new_member_ids.append(child_member.id)
+                converted_count += 1
+            
+            # Clear children_data from parent after conversion
+            parent.children_data = None
+            
+        except (json.JSONDecodeError, ValueError, KeyError) as e:
+            print(f"Error processing children data for member {parent.id}: {e}")
+            continue
+    
+    return converted_count, new_member_ids
+
+def convert_spouses_to_members():
+    """Convert all spouse names stored in spouse_name field to separate family member records.
+
+    Returns (converted count, new member ids).
+    """
+    # Get all members who have spouse names
+    members_with_spouses = FamilyMember.query.filter(
+        FamilyMember.spouse_name.isnot(None),
+        FamilyMember.spouse_name != '',
+        FamilyMember.spouse_name != 'undefined'
+    ).all()
+    
+    converted_count = 0
+    new_member_ids = []
+    
+    for member in members_with_spouses:
+        spouse_name = member.spouse_name.strip()
+        if not spouse_name:
+            continue
+        
+        # Check if spouse already exists (by full name)
+        existing_spouse = FamilyMember.query.filter_by(full_name=spouse_name).first()
+        if existing_spouse:
+            # If spouse exists, create spouse relationship if it doesn't exist
+            existing_spouse_rel = FamilyRelationship.query.filter(
+                ((FamilyRelationship.parent_id == member.id) & (FamilyRelationship.child_id == existing_spouse.id)) |
+                ((FamilyRelationship.parent_id == existing_spouse.id) & (FamilyRelationship.child_id == member.id))
+            ).first()
+            
+            if not existing_spouse_rel:
+                # Create spouse relationship
+                spouse_relationship = FamilyRelationship(
+                    parent_id=member.id,
+                    child_id=existing_spouse.id,
+                    relationship_type='spouse'
+                )
+                db.session.add(spouse_relationship)
+                converted_count += 1
+            continue
+        
+        # Determine spouse gender (opposite of current member)
+        spouse_gender = 'Female' if member.gender == 'Male' else 'Male'
+        
+        # Create new family member for spouse
+        spouse_member = FamilyMember(
+            full_name=spouse_name,
+            chinese_name='',  # Not available in spouse_name field
+            nickname='',  # Not available in spouse_name field
+            birth_date=None,  # Not available
+            birth_place='',  # Not available
+            death_date=None,  # Unknown status
+            death_place='',
+            gender=spouse_gender,
+            notes=f"Spouse of {member.full_name}",
+            photo_filename=None,
+            is_alive=True,  # Default assumption
+            marital_status='Married',
+            father_name='',  # Not available
+            mother_name='',  # Not available
+            spouse_name=member.full_name,  # Link back to original member
+            have_children='',  # Unknown
+            children_data=None
+        )
+        
+        db.session.add(spouse_member)
+        db.session.flush()  # Get the ID
+        
+        # Create spouse relationship
+        spouse_relationship = FamilyRelationship(
+            parent_id=member.id,
+            child_id=spouse_member.id,
+            relationship_type='spouse'
+        )
+        db.session.add(spouse_relationship)
+        
+        new_member_ids.append(spouse_member.id)
+        converted_count += 1
+    
+    return converted_count, new_member_ids
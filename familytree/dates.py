@@ -0,0 +1,130 @@
+"""Derived date columns and the date-driven queries they index.
+
+birth_date and death_date are split into a year and a month-day (MMDD as
+an integer) column, kept in step by mapper events, so upcoming birthdays,
+death anniversaries and per-decade timelines are index range scans or
+index-only aggregates instead of a pass over every member.
+"""
+import calendar
+from datetime import date, timedelta
+
+from .extensions import db
+from .models import FamilyMember
+
+# Bounds the "alive at" range scan on birth_date: nobody is older than this
+MAX_LIFESPAN_YEARS = 125
+MAX_WINDOW_DAYS = 366
+
+def month_day(value):
+    return value.month * 100 + value.day if value else None
+
+def sync_date_columns(member):
+    member.birth_year = member.birth_date.year if member.birth_date else None
+    member.birth_month_day = month_day(member.birth_date)
+    member.death_year = member.death_date.year if member.death_date else None
+    member.death_month_day = month_day(member.death_date)
+
+@db.event.listens_for(FamilyMember, 'before_insert')
+@db.event.listens_for(FamilyMember, 'before_update')
+def _sync_date_columns(mapper, connection, member):
+    sync_date_columns(member)
+
+def _years_before(day, years):
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        # 29 February in a year that is not a leap year
+        return day.replace(year=day.year - years, day=28)
+
+def _occurrence(month_day_value, year):
+    month, day = divmod(month_day_value, 100)
+    if month == 2 and day == 29 and not calendar.isleap(year):
+        return date(year, 2, 28)
+    return date(year, month, day)
+
+def month_day_ranges(start, days):
+    """Inclusive MMDD ranges covering the days from start to start + days."""
+    if days >= 365:
+        return [(101, 1231)]
+    end = start + timedelta(days=days)
+    lower, upper = month_day(start), month_day(end)
+    # 29 February birthdays fall on the 28th outside leap years
+    if upper == 228 and not calendar.isleap(end.year):
+        upper = 229
+    if end.year == start.year:
+        return [(lower, upper)]
+    return [(lower, 1231), (101, upper)]
+
+def upcoming_dates(kind, start, days):
+    """Birthdays of living members or death anniversaries between start and start + days.
+
+    Returns dicts sorted by the date they fall on, with the age reached or
+    the years since the death.
+    """
+    if kind == 'birthday':
+        month_day_column, year_column = FamilyMember.birth_month_day, FamilyMember.birth_year
+        query = db.session.query(FamilyMember.id, FamilyMember.full_name, FamilyMember.chinese_name,
+                                 FamilyMember.nickname, month_day_column, year_column
+                                 ).filter(FamilyMember.is_alive.is_(True))
+    else:
+        month_day_column, year_column = FamilyMember.death_month_day, FamilyMember.death_year
+        query = db.session.query(FamilyMember.id, FamilyMember.full_name, FamilyMember.chinese_name,
+                                 FamilyMember.nickname, month_day_column, year_column)
+    query = query.filter(db.or_(*[month_day_column.between(lower, upper)
+                                  for lower, upper in month_day_ranges(start, days)]))
+
+    end = start + timedelta(days=days)
+    results = []
+    for member_id, full_name, chinese_name, nickname, month_day_value, year in query:
+        occurrence = _occurrence(month_day_value, start.year)
+        if occurrence < start:
+            occurrence = _occurrence(month_day_value, start.year + 1)
+        if occurrence > end:
+            continue
+        results.append({
+            'id': member_id,
+            'full_name': full_name,
+            'chinese_name': chinese_name,
+            'nickname': nickname,
+            'date': occurrence.isoformat(),
+            'days_until': (occurrence - start).days,
+            'years': occurrence.year - year
+        })
+    results.sort(key=lambda item: (item['date'], item['full_name']))
+    return results
+
+def alive_at_filter(day):
+    """Members born on or before day who had not died by then.
+
+    The lower bound on birth_date keeps this a bounded range scan of the
+    (birth_date, id) index. Deceased members without a death date are left
+    out because it is unknown whether they were alive.
+    """
+    return db.and_(
+        FamilyMember.birth_date <= day,
+        FamilyMember.birth_date > _years_before(day, MAX_LIFESPAN_YEARS),
+        db.or_(FamilyMember.death_date >= day,
+               db.and_(FamilyMember.death_date.is_(None), FamilyMember.is_alive.is_(True))))
+
+def decade_timeline():
+    """Births and deaths per decade, from index-only GROUP BY queries on the year columns."""
+    decades = {}
+    for key, column in (('births', FamilyMember.birth_year), ('deaths', FamilyMember.death_year)):
+        for year, count in (db.session.query(column, db.func.count(FamilyMember.id))
+                            .filter(column.isnot(None)).group_by(column)):
+            entry = decades.setdefault(year // 10 * 10, {'births': 0, 'deaths': 0})
+            entry[key] += count
+    return [{'decade': decade, **decades[decade]} for decade in sorted(decades)]
+
+def decade_events(decade, limit):
+    """Births and deaths within one decade, in date order, via the year column indexes."""
+    events = []
+    for kind, date_column, year_column in (('birth', FamilyMember.birth_date, FamilyMember.birth_year),
+                                           ('death', FamilyMember.death_date, FamilyMember.death_year)):
+        rows = (db.session.query(FamilyMember.id, FamilyMember.full_name, date_column)
+                .filter(year_column.between(decade, decade + 9))
+                .order_by(date_column, FamilyMember.id).limit(limit))
+        events.extend({'type': kind, 'id': member_id, 'full_name': full_name, 'date': value.isoformat()}
+                      for member_id, full_name, value in rows)
+    events.sort(key=lambda event: (event['date'], event['type'], event['id']))
+    return events[:limit]
@@ -0,0 +1,23 @@
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+
+db = SQLAlchemy()
+login_manager = LoginManager()
+login_manager.login_view = 'pages.login'
+
+def init_migrate(app):
+    """Register Flask-Migrate; imported here so web workers never load Alembic."""
+    from flask_migrate import Migrate
+    Migrate(app, db)
+
+def _use_wal(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.close()
+
+def init_sqlite_wal(app):
+    """Put a file-based SQLite database in WAL mode, so readers (and snapshots) never block writers."""
+    with app.app_context():
+        engine = db.engine
+    if engine.url.get_backend_name() == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+        db.event.listen(engine, 'connect', _use_wal)
@@ -0,0 +1,258 @@
+"""Family units: a couple, or a lone parent, and the children born to them.
+
+Couples are stored as one or two 'spouse' relationship rows and children
+link to each parent separately, so which couple a child came from used
+to be guessed by scanning relationships. family_unit keeps one row per
+couple (partner1_id is the lower id) or lone parent (partner2_id is
+NULL and partner2_key 0), and family_unit_child puts every child in the one unit they were
+born into:
+
+- a child with two recorded parents belongs to that pair (a third
+  recorded parent, an integrity issue, is ignored as in kinship.py)
+- a child with one recorded parent belongs to that parent and their
+  spouse if they have exactly one spouse, otherwise to the parent alone
+- every spouse pair is a unit, with or without children
+
+The rows are refreshed around every relationship written or member
+deleted through the session (see _maintain_family_units); a deleted
+member's rows are removed before the member itself, since they point at
+it. Merging, which moves relationships with bulk statements, calls
+refresh_family_units itself, as it does for generations.py, before it
+deletes the duplicates.
+"""
+from .extensions import db
+from .models import FamilyMember, FamilyRelationship, FamilyUnit, FamilyUnitChild
+
+def unit_key(parent_ids, spouses):
+    """(partner1_id, partner2_id or None) of a child with these parents, given {member id: spouse ids}."""
+    parent_ids = sorted(parent_ids)[:2]
+    if len(parent_ids) == 2:
+        return tuple(parent_ids)
+    parent_id = parent_ids[0]
+    partner_ids = spouses.get(parent_id, ())
+    if len(partner_ids) == 1:
+        (partner_id,) = partner_ids
+        return (min(parent_id, partner_id), max(parent_id, partner_id))
+    return (parent_id, None)
+
+def _spouse_map(pairs):
+    # Spouse links are stored in one or both directions; either one counts
+    spouses = {}
+    for a, b in pairs:
+        if a != b:
+            spouses.setdefault(a, set()).add(b)
+            spouses.setdefault(b, set()).add(a)
+    return spouses
+
+def _couples(spouses, member_ids):
+    return {(min(a, b), max(a, b)) for a in member_ids for b in spouses.get(a, ())}
+
+def _store_units(connection, keys, tree_ids):
+    """{key: unit id} for keys, inserting the units that do not exist yet."""
+    unit_table = FamilyUnit.__table__
+    units = {}
+    if keys:
+        for unit_id, partner1_id, partner2_id in connection.execute(
+            db.select(unit_table.c.id, unit_table.c.partner1_id, unit_table.c.partner2_id)
+            .where(unit_table.c.partner1_id.in_({partner1_id for partner1_id, _ in keys}))
+        ):
+            if (partner1_id, partner2_id) in keys:
+                units[(partner1_id, partner2_id)] = unit_id
+    # One INSERT per unit: a multi-row INSERT .. RETURNING is not available on MySQL
+    for partner1_id, partner2_id in sorted((key for key in keys if key not in units),
+                                           key=lambda key: (key[0], key[1] or 0)):
+        result = connection.execute(unit_table.insert().values(
+            tree_id=tree_ids[partner1_id], partner1_id=partner1_id,
+            partner2_id=partner2_id, partner2_key=partner2_id or 0))
+        units[(partner1_id, partner2_id)] = result.inserted_primary_key[0]
+    return units
+
+def _read_tree_ids(connection, member_ids, tree_ids):
+    """Add {member id: tree id} for the members of member_ids that exist and are not in tree_ids yet."""
+    member_table = FamilyMember.__table__
+    wanted = set(member_ids).difference(tree_ids)
+    if wanted:
+        tree_ids.update(connection.execute(
+            db.select(member_table.c.id, member_table.c.tree_id).where(member_table.c.id.in_(wanted))).all())
+
+def refresh_family_units(connection, member_ids):
+    """Re-derive the units around member_ids after relationship rows touching them changed.
+
+    The children re-filed are the members themselves and every child of a
+    unit the members or their partners are in; units left with neither
+    children nor a spouse link are deleted.
+    """
+    member_ids = set(member_ids)
+    if not member_ids:
+        return
+    rel_table = FamilyRelationship.__table__
+    unit_table = FamilyUnit.__table__
+    child_table = FamilyUnitChild.__table__
+
+    # The members' spouses and co-parents may have gained or lost a spouse,
+    # which moves their lone-parent children, so their units are redone too
+    partner_ids = set(member_ids)
+    for partner1_id, partner2_id in connection.execute(
+        db.select(unit_table.c.partner1_id, unit_table.c.partner2_id).where(db.or_(
+            unit_table.c.partner1_id.in_(member_ids), unit_table.c.partner2_id.in_(member_ids),
+            unit_table.c.id.in_(db.select(child_table.c.unit_id).where(child_table.c.child_id.in_(member_ids)))))
+    ):
+        partner_ids.update((partner1_id, partner2_id))
+    partner_ids.discard(None)
+    old_units = set(connection.execute(
+        db.select(unit_table.c.id).where(db.or_(
+            unit_table.c.partner1_id.in_(partner_ids), unit_table.c.partner2_id.in_(partner_ids),
+            unit_table.c.id.in_(db.select(child_table.c.unit_id).where(child_table.c.child_id.in_(member_ids))))))
+        .scalars())
+    child_ids = set(member_ids)
+    if old_units:
+        child_ids.update(connection.execute(
+            db.select(child_table.c.child_id).where(child_table.c.unit_id.in_(old_units))).scalars())
+
+    # Links to missing members are left to the integrity checker (orphan_edge)
+    tree_ids = {}
+    parent_edges = connection.execute(
+        db.select(rel_table.c.parent_id, rel_table.c.child_id)
+        .where(rel_table.c.relationship_type == 'parent', rel_table.c.child_id.in_(child_ids))).all()
+    _read_tree_ids(connection, child_ids | partner_ids | {parent_id for parent_id, _ in parent_edges}, tree_ids)
+    parents = {}
+    for parent_id, child_id in parent_edges:
+        if parent_id in tree_ids and child_id in tree_ids:
+            parents.setdefault(child_id, set()).add(parent_id)
+    lone_parents = {next(iter(ids)) for ids in parents.values() if len(ids) == 1}
+    with_spouses = partner_ids | lone_parents
+    spouse_edges = connection.execute(
+        db.select(rel_table.c.parent_id, rel_table.c.child_id).where(
+            rel_table.c.relationship_type == 'spouse',
+            db.or_(rel_table.c.parent_id.in_(with_spouses), rel_table.c.child_id.in_(with_spouses)))).all()
+    _read_tree_ids(connection, {member_id for edge in spouse_edges for member_id in edge}, tree_ids)
+    spouses = _spouse_map(edge for edge in spouse_edges if edge[0] in tree_ids and edge[1] in tree_ids)
+
+    births = {child_id: unit_key(ids, spouses) for child_id, ids in parents.items()}
+    units = _store_units(connection, set(births.values()) | _couples(spouses, partner_ids), tree_ids)
+
+    connection.execute(child_table.delete().where(child_table.c.child_id.in_(child_ids)))
+    if births:
+        connection.execute(child_table.insert(), [{'child_id': child_id, 'unit_id': units[key]}
+                                                  for child_id, key in births.items()])
+    unused = old_units - set(units.values())
+    if unused:
+        connection.execute(unit_table.delete().where(unit_table.c.id.in_(unused)))
+
+def rebuild_family_units(connection, tree_id):
+    """Derive every unit of a tree from scratch; returns the number of units."""
+    rel_table = FamilyRelationship.__table__
+    member_table = FamilyMember.__table__
+    unit_table = FamilyUnit.__table__
+    child_table = FamilyUnitChild.__table__
+    tree_units = db.select(unit_table.c.id).where(unit_table.c.tree_id == tree_id)
+    connection.execute(child_table.delete().where(child_table.c.unit_id.in_(tree_units)))
+    connection.execute(unit_table.delete().where(unit_table.c.tree_id == tree_id))
+
+    member_ids = set(connection.execute(
+        db.select(member_table.c.id).where(member_table.c.tree_id == tree_id)).scalars())
+    edges = connection.execute(
+        db.select(rel_table.c.parent_id, rel_table.c.child_id, rel_table.c.relationship_type)
+        .where(rel_table.c.tree_id == tree_id, rel_table.c.relationship_type.in_(('parent', 'spouse')))).all()
+    edges = [edge for edge in edges if edge.parent_id in member_ids and edge.child_id in member_ids]
+    parents = {}
+    for parent_id, child_id, relationship_type in edges:
+        if relationship_type == 'parent':
+            parents.setdefault(child_id, set()).add(parent_id)
+    spouses = _spouse_map((a, b) for a, b, relationship_type in edges if relationship_type == 'spouse')
+    births = {child_id: unit_key(ids, spouses) for child_id, ids in parents.items()}
+    keys = set(births.values()) | _couples(spouses, spouses)
+    units = _store_units(connection, keys, dict.fromkeys(member_ids, tree_id))
+    if births:
+        connection.execute(child_table.insert(), [{'child_id': child_id, 'unit_id': units[key]}
+                                                  for child_id, key in births.items()])
+    return len(units)
+
+def release_members(connection, member_ids):
+    """Remove the unit rows naming members that are about to be deleted.
+
+    Units and unit children point at family_member, so this has to happen
+    before the member rows go. Returns the other partners and children of
+    those units, to pass to refresh_family_units once the members are gone.
+    """
+    unit_table = FamilyUnit.__table__
+    child_table = FamilyUnitChild.__table__
+    member_ids = set(member_ids)
+    partnered = db.select(unit_table.c.id).where(db.or_(
+        unit_table.c.partner1_id.in_(member_ids), unit_table.c.partner2_id.in_(member_ids)))
+    units = connection.execute(
+        db.select(unit_table.c.id, unit_table.c.partner1_id, unit_table.c.partner2_id).where(db.or_(
+            unit_table.c.id.in_(partnered),
+            unit_table.c.id.in_(db.select(child_table.c.unit_id).where(child_table.c.child_id.in_(member_ids)))))
+    ).all()
+    if not units:
+        return set()
+    affected = {partner_id for unit in units for partner_id in unit[1:]}
+    affected.update(connection.execute(
+        db.select(child_table.c.child_id).where(child_table.c.unit_id.in_([unit.id for unit in units]))).scalars())
+    connection.execute(child_table.delete().where(db.or_(
+        child_table.c.unit_id.in_(partnered), child_table.c.child_id.in_(member_ids))))
+    connection.execute(unit_table.delete().where(unit_table.c.id.in_(partnered)))
+    affected.discard(None)
+    return affected - member_ids
+
+@db.event.listens_for(db.session, 'before_flush')
+def _release_deleted_members(session, flush_context, instances):
+    member_ids = {obj.id for obj in session.deleted if isinstance(obj, FamilyMember) and obj.id is not None}
+    if member_ids:
+        session.info.setdefault('released_member_ids', set()).update(
+            release_members(session.connection(), member_ids))
+
+@db.event.listens_for(db.session, 'after_flush')
+def _maintain_family_units(session, flush_context):
+    member_ids = session.info.pop('released_member_ids', set())
+    edges = [obj for obj in list(session.new) + list(session.deleted) if isinstance(obj, FamilyRelationship)]
+    edges += [obj for obj in session.dirty if isinstance(obj, FamilyRelationship) and session.is_modified(obj)]
+    for edge in edges:
+        state = db.inspect(edge)
+        for attr in ('parent_id', 'child_id'):
+            member_ids.add(getattr(edge, attr))
+            member_ids.update(state.attrs[attr].history.deleted or ())
+    member_ids.update(obj.id for obj in session.deleted if isinstance(obj, FamilyMember))
+    member_ids.discard(None)
+    if member_ids:
+        refresh_family_units(session.connection(), member_ids)
+
+def _units_with_children(units):
+    children = {}
+    if units:
+        for unit_id, child_id in db.session.execute(
+            db.select(FamilyUnitChild.unit_id, FamilyUnitChild.child_id)
+            .where(FamilyUnitChild.unit_id.in_([unit.id for unit in units]))
+            .order_by(FamilyUnitChild.child_id)
+        ):
+            children.setdefault(unit_id, []).append(child_id)
+    return [(unit.id, unit.partner1_id, unit.partner2_id, children.get(unit.id, [])) for unit in units]
+
+def family_units():
+    """Every unit of the current tree as (id, partner1_id, partner2_id or None, [child ids]), by id."""
+    children = {}
+    for unit_id, child_id in db.session.execute(
+        db.select(FamilyUnitChild.unit_id, FamilyUnitChild.child_id)
+        .join(FamilyUnit, FamilyUnit.id == FamilyUnitChild.unit_id)
+        .order_by(FamilyUnitChild.child_id)
+    ):
+        children.setdefault(unit_id, []).append(child_id)
+    return [(unit_id, partner1_id, partner2_id, children.get(unit_id, []))
+            for unit_id, partner1_id, partner2_id in db.session.execute(
+                db.select(FamilyUnit.id, FamilyUnit.partner1_id, FamilyUnit.partner2_id).order_by(FamilyUnit.id))]
+
+def member_families(member_id):
+    """(the unit the member was born into or None, [units they are a partner in]), as family_units() tuples."""
+    unit_table = FamilyUnit.__table__
+    child_table = FamilyUnitChild.__table__
+    # One index lookup each; the outer query limits them to the current tree
+    unit_ids = db.union_all(
+        db.select(unit_table.c.id).where(unit_table.c.partner1_id == member_id),
+        db.select(unit_table.c.id).where(unit_table.c.partner2_id == member_id),
+        db.select(child_table.c.unit_id).where(child_table.c.child_id == member_id))
+    units = _units_with_children(db.session.execute(
+        db.select(FamilyUnit.id, FamilyUnit.partner1_id, FamilyUnit.partner2_id)
+        .where(FamilyUnit.id.in_(unit_ids)).order_by(FamilyUnit.id)).all())
+    born_into = next((unit for unit in units if member_id in unit[3]), None)
+    return born_into, [unit for unit in units if member_id in unit[1:3]]
@@ -0,0 +1,102 @@
+"""GEDCOM 5.5.1 export; imported on first use by the export view."""
+from datetime import datetime
+
+def generate_gedcom(members, families):
+    """Generate GEDCOM format from family data.
+
+    families are family units as (id, partner1_id, partner2_id or None,
+    [child ids]) (see families.py); each becomes one FAM record.
+    """
+    gedcom_lines = []
+    genders = {member.id: member.gender for member in members}
+    partner_in = {}
+    child_in = {}
+    for family_id, partner1_id, partner2_id, child_ids in families:
+        for partner_id in (partner1_id, partner2_id):
+            if partner_id is not None:
+                partner_in.setdefault(partner_id, []).append(family_id)
+        for child_id in child_ids:
+            child_in[child_id] = family_id
+    
+    # GEDCOM header
+    gedcom_lines.append("0 HEAD")
+    gedcom_lines.append("1 SOUR TU SANG Family Tree")
+    gedcom_lines.append("2 NAME TU SANG Family Tree Application")
+    gedcom_lines.append("2 VERS 1.0")
+    gedcom_lines.append("1 DEST ANSTFILE")
+    gedcom_lines.append("1 DATE " + datetime.now().strftime("%d %b %Y"))
+    gedcom_lines.append("1 GEDC")
+    gedcom_lines.append("2 VERS 5.5.1")
+    gedcom_lines.append("2 FORM LINEAGE-LINKED")
+    gedcom_lines.append("1 CHAR UTF-8")
+    gedcom_lines.append("0 @SUBM@ SUBM")
+    gedcom_lines.append("1 NAME TU SANG Family")
+    gedcom_lines.append("")
+    
+    # Create individual records
+    for member in members:
+        individual_id = f"@I{member.id:03d}@"
+        gedcom_lines.append(f"0 {individual_id} INDI")
+        
+        # Name
+        if member.full_name:
+            gedcom_lines.append(f"1 NAME {member.full_name}")
+            if member.chinese_name:
+                gedcom_lines.append(f"2 GIVN {member.chinese_name}")
+            if member.nickname:
+                gedcom_lines.append(f"2 NICK {member.nickname}")
+        
+        # Gender
+        if member.gender:
+            gender_code = "M" if member.gender == "Male" else "F"
+            gedcom_lines.append(f"1 SEX {gender_code}")
+        
+        # Birth
+        if member.birth_date:
+            birth_date = member.birth_date.strftime("%d %b %Y")
+            gedcom_lines.append(f"1 BIRT")
+            gedcom_lines.append(f"2 DATE {birth_date}")
+            if member.birth_place:
+                gedcom_lines.append(f"2 PLAC {member.birth_place}")
+        
+        # Death
+        if not member.is_alive and member.death_date:
+            death_date = member.death_date.strftime("%d %b %Y")
+            gedcom_lines.append(f"1 DEAT")
+            gedcom_lines.append(f"2 DATE {death_date}")
+            if member.death_place:
+                gedcom_lines.append(f"2 PLAC {member.death_place}")
+        
+        # Notes
+        if member.notes:
+            gedcom_lines.append(f"1 NOTE {member.notes}")
+        
+        # Family links
+        if member.id in child_in:
+            gedcom_lines.append(f"1 FAMC @F{child_in[member.id]:03d}@")
+        for family_id in partner_in.get(member.id, ()):
+            gedcom_lines.append(f"1 FAMS @F{family_id:03d}@")
+        
+        gedcom_lines.append("")
+    
+    # Family records
+    for family_id, partner1_id, partner2_id, child_ids in families:
+        gedcom_lines.append(f"0 @F{family_id:03d}@ FAM")
+        # HUSB is the male partner of a couple, or the first when that does not decide it
+        partners = [partner_id for partner_id in (partner1_id, partner2_id) if partner_id is not None]
+        if len(partners) == 2 and genders.get(partners[1]) == 'Male' and genders.get(partners[0]) != 'Male':
+            partners.reverse()
+        if len(partners) == 2:
+            tags = ('HUSB', 'WIFE')
+        else:
+            tags = ('HUSB',) if genders.get(partners[0]) == 'Male' else ('WIFE',)
+        for tag, partner_id in zip(tags, partners):
+            gedcom_lines.append(f"1 {tag} @I{partner_id:03d}@")
+        for child_id in child_ids:
+            gedcom_lines.append(f"1 CHIL @I{child_id:03d}@")
+        gedcom_lines.append("")
+    
+    # GEDCOM trailer
+    gedcom_lines.append("0 TRLR")
+    
+    return "\n".join(gedcom_lines)
@@ -0,0 +1,139 @@
+"""Generation index: an incrementally maintained topological order of the parent graph."""
+from .extensions import db
+from .models import FamilyMember, FamilyRelationship
+
+class RelationshipCycleError(ValueError):
+    pass
+
+def compute_generations():
+    """Map member id -> generation (0 for members without recorded parents), from scratch.
+
+    A member's generation is one below their deepest parent, computed with
+    Kahn's algorithm over the parent edges. Members caught in a parent cycle
+    never become ready and are left out.
+    """
+    member_ids = [row[0] for row in db.session.query(FamilyMember.id)]
+    edges = db.session.query(FamilyRelationship.parent_id, FamilyRelationship.child_id).filter(
+        FamilyRelationship.relationship_type == 'parent'
+    ).all()
+
+    children = {member_id: [] for member_id in member_ids}
+    pending_parents = {member_id: 0 for member_id in member_ids}
+    for parent_id, child_id in edges:
+        if parent_id in children and child_id in pending_parents:
+            children[parent_id].append(child_id)
+            pending_parents[child_id] += 1
+
+    generations = {}
+    ready = [member_id for member_id, count in pending_parents.items() if count == 0]
+    for member_id in ready:
+        generations[member_id] = 0
+    while ready:
+        member_id = ready.pop()
+        for child_id in children[member_id]:
+            generations[child_id] = max(generations.get(child_id, 0), generations[member_id] + 1)
+            pending_parents[child_id] -= 1
+            if pending_parents[child_id] == 0:
+                ready.append(child_id)
+    return generations
+
+def _parent_edges_from(connection, member_ids):
+    """(parent_id, child_id, child generation) for parent edges leaving member_ids."""
+    member_table = FamilyMember.__table__
+    rel_table = FamilyRelationship.__table__
+    return connection.execute(
+        db.select(rel_table.c.parent_id, rel_table.c.child_id, member_table.c.generation)
+        .join(member_table, member_table.c.id == rel_table.c.child_id)
+        .where(rel_table.c.relationship_type == 'parent', rel_table.c.parent_id.in_(member_ids))
+    ).all()
+
+def _write_generations(connection, new_generations):
+    if new_generations:
+        member_table = FamilyMember.__table__
+        connection.execute(
+            member_table.update().where(member_table.c.id == db.bindparam('member_id'))
+            .values(generation=db.bindparam('new_generation')),
+            [{'member_id': member_id, 'new_generation': generation} for member_id, generation in new_generations.items()])
+
+def order_parent_edge(connection, parent_id, child_id):
+    """Keep generation[child] > generation[parent] after inserting parent_id -> child_id.
+
+    Because generations strictly increase along every parent edge, the edge
+    cannot close a cycle when the child already sits below the parent, which
+    is the common case and costs one lookup. Otherwise the child and its
+    descendants are pushed down level by level (Pearce-Kelly style, touching
+    only the region whose order is violated); if that push ever has to move
+    the parent itself, the parent descends from the child and the edge is
+    rejected.
+    """
+    if parent_id == child_id:
+        raise RelationshipCycleError('A member cannot be their own parent')
+    member_table = FamilyMember.__table__
+    rows = connection.execute(
+        db.select(member_table.c.id, member_table.c.generation, member_table.c.tree_id)
+        .where(member_table.c.id.in_([parent_id, child_id]))
+    ).all()
+    generations = {member_id: generation for member_id, generation, _ in rows}
+    if parent_id not in generations or child_id not in generations:
+        return
+    tree_id = next(tree_id for member_id, _, tree_id in rows if member_id == parent_id)
+    if generations[child_id] > generations[parent_id]:
+        return
+
+    new_generations = {child_id: generations[parent_id] + 1}
+    frontier = {child_id}
+    limit = None
+    while frontier:
+        next_frontier = set()
+        for from_id, to_id, to_generation in _parent_edges_from(connection, frontier):
+            needed = new_generations[from_id] + 1
+            if new_generations.get(to_id, to_generation) < needed:
+                if limit is None:
+                    # No generation in an acyclic tree can reach the number of members
+                    limit = connection.execute(db.select(db.func.count()).select_from(member_table)
+                                               .where(member_table.c.tree_id == tree_id)).scalar()
+                if to_id == parent_id or needed >= limit:
+                    raise RelationshipCycleError('This relationship would make a member their own ancestor')
+                new_generations[to_id] = needed
+                next_frontier.add(to_id)
+        frontier = next_frontier
+    _write_generations(connection, new_generations)
+
+def relax_generations(connection, member_ids):
+    """Lower generations after parent edges into member_ids were removed."""
+    member_table = FamilyMember.__table__
+    rel_table = FamilyRelationship.__table__
+    parent_member = member_table.alias('parent_member')
+    frontier = set(member_ids)
+    while frontier:
+        current = dict(connection.execute(
+            db.select(member_table.c.id, member_table.c.generation).where(member_table.c.id.in_(frontier))
+        ).all())
+        deepest_parent = dict(connection.execute(
+            db.select(rel_table.c.child_id, db.func.max(parent_member.c.generation))
+            .join(parent_member, parent_member.c.id == rel_table.c.parent_id)
+            .where(rel_table.c.relationship_type == 'parent', rel_table.c.child_id.in_(frontier))
+            .group_by(rel_table.c.child_id)
+        ).all())
+        lowered = {}
+        for member_id, generation in current.items():
+            expected = deepest_parent[member_id] + 1 if member_id in deepest_parent else 0
+            if expected < generation:
+                lowered[member_id] = expected
+        _write_generations(connection, lowered)
+        frontier = {to_id for _, to_id, _ in _parent_edges_from(connection, lowered)} if lowered else set()
+
+@db.event.listens_for(db.session, 'after_flush')
+def _maintain_generations(session, flush_context):
+    new_edges = [obj for obj in session.new
+                 if isinstance(obj, FamilyRelationship) and obj.relationship_type == 'parent']
+    removed_children = {obj.child_id for obj in session.deleted
+                        if isinstance(obj, FamilyRelationship) and obj.relationship_type == 'parent'}
+    if not new_edges and not removed_children:
+        return
+    connection = session.connection()
+    for edge in new_edges:
+        order_parent_edge(connection, edge.parent_id, edge.child_id)
+    if removed_children:
+        relax_generations(connection, removed_children)
+
@@ -0,0 +1,273 @@
+"""Data integrity checks: full scans and incremental revalidation on commit."""
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from .extensions import db
+from .models import FamilyMember, FamilyRelationship, IntegrityIssue
+from .trees import current_tree_id, use_tree
+
+def _integrity_member_rows(member_ids=None):
+    query = db.session.query(FamilyMember.id, FamilyMember.full_name, FamilyMember.gender,
+                             FamilyMember.birth_date, FamilyMember.death_date, FamilyMember.marital_status,
+                             FamilyMember.spouse_name, FamilyMember.father_name, FamilyMember.mother_name)
+    if member_ids is not None:
+        query = query.filter(FamilyMember.id.in_(member_ids))
+    return {row.id: row for row in query}
+
+def _integrity_edge_rows(member_ids=None):
+    query = db.session.query(FamilyRelationship.id, FamilyRelationship.parent_id,
+                             FamilyRelationship.child_id, FamilyRelationship.relationship_type)
+    if member_ids is not None:
+        query = query.filter(db.or_(FamilyRelationship.parent_id.in_(member_ids),
+                                    FamilyRelationship.child_id.in_(member_ids)))
+    return query.all()
+
+def _members_by_tree(member_ids):
+    member_table = FamilyMember.__table__
+    by_tree = {}
+    for member_id, tree_id in db.session.execute(
+            db.select(member_table.c.id, member_table.c.tree_id).where(member_table.c.id.in_(member_ids))):
+        by_tree.setdefault(tree_id, set()).add(member_id)
+    return by_tree
+
+def member_issues(member):
+    """Checks that only need the member's own row."""
+    issues = []
+    if not (member.full_name or '').strip():
+        issues.append(('missing_name', member.id, None, None, f'Member #{member.id} has no full name'))
+    if not member.gender:
+        issues.append(('missing_gender', member.id, None, None, f'Member #{member.id} has no gender'))
+    if member.marital_status == 'Married' and not member.spouse_name:
+        issues.append(('married_without_spouse', member.id, None, None,
+                       f'{member.full_name} (#{member.id}) is married but has no spouse name'))
+    if member.marital_status == 'Single' and (not member.father_name or not member.mother_name):
+        issues.append(('single_without_parents', member.id, None, None,
+                       f'{member.full_name} (#{member.id}) is single but is missing parent names'))
+    if member.birth_date and member.death_date and member.death_date < member.birth_date:
+        issues.append(('death_before_birth', member.id, None, None,
+                       f'{member.full_name} (#{member.id}) died {member.death_date} before being born {member.birth_date}'))
+    return issues
+
+def edge_issues(edge, members, spouse_pairs):
+    """Checks for one relationship row, given its endpoints' rows and all spouse (from, to) pairs."""
+    rel_id, parent_id, child_id, relationship_type = edge
+    parent = members.get(parent_id)
+    child = members.get(child_id)
+    if parent is None or child is None:
+        missing = [str(member_id) for member_id, row in ((parent_id, parent), (child_id, child)) if row is None]
+        return [('orphan_edge', child_id, parent_id, rel_id,
+                 f'Relationship #{rel_id} ({relationship_type}) points at deleted member #{", #".join(missing)}')]
+    if parent_id == child_id:
+        return [('self_relationship', child_id, parent_id, rel_id,
+                 f'{child.full_name} (#{child_id}) has a {relationship_type} relationship with themselves')]
+    issues = []
+    if relationship_type == 'parent' and parent.birth_date and child.birth_date and child.birth_date <= parent.birth_date:
+        issues.append(('child_born_before_parent', child_id, parent_id, rel_id,
+                       f'{child.full_name} (#{child_id}) was born {child.birth_date}, not after their parent '
+                       f'{parent.full_name} (#{parent_id}) born {parent.birth_date}'))
+    if relationship_type == 'spouse' and (child_id, parent_id) not in spouse_pairs:
+        issues.append(('spouse_asymmetry', child_id, parent_id, rel_id,
+                       f'{parent.full_name} (#{parent_id}) is recorded as spouse of {child.full_name} (#{child_id}) '
+                       f'but not the other way round'))
+    return issues
+
+def find_parent_cycles(parent_edges):
+    """Return the ids of members lying on a cycle of parent edges.
+
+    Iterative Tarjan strongly-connected components, linear in the number of
+    edges. Self-loops are reported by edge_issues as self_relationship.
+    """
+    children = {}
+    for parent_id, child_id in parent_edges:
+        if parent_id != child_id:
+            children.setdefault(parent_id, []).append(child_id)
+
+    index_of, lowlink, on_stack = {}, {}, set()
+    stack, in_cycle = [], set()
+    counter = 0
+    for root in list(children):
+        if root in index_of:
+            continue
+        work = [(root, iter(children.get(root, ())))]
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, neighbours = work[-1]
+            for child in neighbours:
+                if child not in index_of:
+                    index_of[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(children.get(child, ()))))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member_id = stack.pop()
+                        on_stack.discard(member_id)
+                        component.append(member_id)
+                        if member_id == node:
+                            break
+                    if len(component) > 1:
+                        in_cycle.update(component)
+    return in_cycle
+
+def _cycle_issues(cycle_ids, members):
+    return [('parent_cycle', member_id, None, None,
+             f'{members[member_id].full_name if member_id in members else "Member"} (#{member_id}) is their own ancestor')
+            for member_id in sorted(cycle_ids)]
+
+def _store_issues(issues, tree_id):
+    if issues:
+        now = datetime.utcnow()
+        db.session.execute(IntegrityIssue.__table__.insert(), [{
+            'tree_id': tree_id,
+            'kind': kind,
+            'member_id': member_id,
+            'related_member_id': related_member_id,
+            'relationship_id': relationship_id,
+            'message': message[:500],
+            'created_at': now
+        } for kind, member_id, related_member_id, relationship_id, message in issues])
+
+def run_integrity_scan():
+    """Check the whole current tree, replace its stored issues and commit. Returns (issue count, seconds)."""
+    tree_id = current_tree_id()
+    if tree_id is None:
+        raise ValueError('No family tree is selected')
+    started = time.perf_counter()
+    members = _integrity_member_rows()
+    edges = _integrity_edge_rows()
+    spouse_pairs = {(parent_id, child_id) for _, parent_id, child_id, kind in edges if kind == 'spouse'}
+
+    issues = []
+    for member in members.values():
+        issues.extend(member_issues(member))
+    for edge in edges:
+        issues.extend(edge_issues(edge, members, spouse_pairs))
+    issues.extend(_cycle_issues(
+        find_parent_cycles((parent_id, child_id) for _, parent_id, child_id, kind in edges if kind == 'parent'),
+        members))
+
+    table = IntegrityIssue.__table__
+    db.session.execute(table.delete().where(table.c.tree_id == tree_id))
+    _store_issues(issues, tree_id)
+    db.session.commit()
+    return len(issues), time.perf_counter() - started
+
+def revalidate_members(member_ids):
+    """Re-check only the given members and the relationships touching them.
+
+    Runs inside the committing transaction, so its cost is a handful of
+    indexed queries proportional to the members' degree. Longer parent
+    cycles are a whole-graph property: they are found by the full scan, and
+    re-derived here only when an edit touches a member already on one.
+    """
+    member_ids = set(member_ids)
+    tree_id = current_tree_id()
+    if tree_id is None:
+        # Outside any tree (e.g. a CLI command), check each tree the members are in
+        for tree_id, ids in _members_by_tree(member_ids).items():
+            use_tree(tree_id)
+            try:
+                revalidate_members(ids)
+            finally:
+                use_tree(None)
+        return
+    edges = _integrity_edge_rows(member_ids)
+    involved = member_ids | {parent_id for _, parent_id, _, _ in edges} | {child_id for _, _, child_id, _ in edges}
+    members = _integrity_member_rows(involved)
+    spouse_pairs = {(parent_id, child_id) for _, parent_id, child_id, kind in edges if kind == 'spouse'}
+
+    issues = []
+    for member_id in member_ids:
+        if member_id in members:
+            issues.extend(member_issues(members[member_id]))
+    for edge in edges:
+        issues.extend(edge_issues(edge, members, spouse_pairs))
+
+    table = IntegrityIssue.__table__
+    touches_cycle = db.session.query(
+        db.exists().where(table.c.kind == 'parent_cycle', table.c.member_id.in_(member_ids))
+    ).scalar()
+    stale = db.or_(table.c.member_id.in_(member_ids), table.c.related_member_id.in_(member_ids))
+    if touches_cycle:
+        parent_edges = db.session.query(FamilyRelationship.parent_id, FamilyRelationship.child_id).filter(
+            FamilyRelationship.relationship_type == 'parent').all()
+        cycle_ids = find_parent_cycles(parent_edges)
+        issues.extend(_cycle_issues(cycle_ids, _integrity_member_rows(cycle_ids)))
+        stale = db.or_(stale, db.and_(table.c.tree_id == tree_id, table.c.kind == 'parent_cycle'))
+    else:
+        # Two-member loops are visible from the neighbourhood alone
+        parent_pairs = {(parent_id, child_id) for _, parent_id, child_id, kind in edges if kind == 'parent'}
+        loop_ids = {parent_id for parent_id, child_id in parent_pairs
+                    if parent_id != child_id and (child_id, parent_id) in parent_pairs}
+        issues.extend(_cycle_issues(loop_ids, members))
+        # Keep full-scan cycle issues for members outside this neighbourhood
+        stale = db.and_(stale, db.or_(table.c.kind != 'parent_cycle', table.c.member_id.in_(loop_ids)))
+
+    db.session.execute(table.delete().where(stale))
+    # Issues for loops discovered from both ends would otherwise be stored twice
+    _store_issues(list(dict.fromkeys(issues)), tree_id)
+
+@db.event.listens_for(db.session, 'before_commit')
+def _revalidate_changed_members(session):
+    session.flush()
+    changed_ids = session.info.pop('changed_member_ids', None)
+    if changed_ids:
+        revalidate_members(changed_ids)
+
+# Per tree: a lock held while its scan runs, and the last scan's outcome
+_integrity_scans_lock = threading.Lock()
+_integrity_scans = {}
+
+def _integrity_scan(tree_id):
+    with _integrity_scans_lock:
+        if tree_id not in _integrity_scans:
+            _integrity_scans[tree_id] = (threading.Lock(), {'running': False, 'last_finished': None,
+                                                            'issue_count': None, 'duration_ms': None})
+        return _integrity_scans[tree_id]
+
+def integrity_scan_state():
+    """The current tree's background scan: running, last_finished, issue_count, duration_ms."""
+    return dict(_integrity_scan(current_tree_id())[1])
+
+def start_background_integrity_scan():
+    """Run run_integrity_scan for the current tree in a daemon thread; False if one is already running."""
+    tree_id = current_tree_id()
+    if tree_id is None:
+        raise ValueError('No family tree is selected')
+    lock, state = _integrity_scan(tree_id)
+    if not lock.acquire(blocking=False):
+        return False
+    state['running'] = True
+    app = current_app._get_current_object()
+
+    def worker():
+        try:
+            with app.app_context():
+                use_tree(tree_id)
+                issue_count, seconds = run_integrity_scan()
+            state.update(last_finished=datetime.utcnow().isoformat(),
+                         issue_count=issue_count, duration_ms=round(seconds * 1000, 1))
+        except Exception as e:
+            app.logger.warning('Integrity scan failed: %s', e)
+        finally:
+            state['running'] = False
+            lock.release()
+
+    threading.Thread(target=worker, name='integrity-scan', daemon=True).start()
+    return True
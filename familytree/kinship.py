@@ -0,0 +1,139 @@
+"""Kinship, inbreeding and pedigree collapse over the parent edges.
+
+Coefficients follow the usual recursion over a topological order of the
+parent graph: a member's kinship with themselves is (1 + F) / 2, where F is
+the kinship of their two parents, and for two different members, with a no
+earlier in the order than b, kinship(a, b) is the mean of kinship(parent,
+b) over a's two parents (an unrecorded parent counts as unrelated). Every
+pair is computed once and memoized, so deep pedigrees with many shared
+ancestors cost one step per distinct pair rather than one per path.
+
+The parent graph and memo live in one Pedigree per data version (see
+versioning.cached_for_version).
+"""
+import math
+
+from .extensions import db
+from .generations import compute_generations
+from .models import FamilyRelationship
+from .versioning import cached_for_version
+
+# Memoized pairs kept per data version before the memo is dropped and rebuilt on demand
+MAX_MEMO_PAIRS = 2000000
+MAX_PEDIGREE_GENERATIONS = 40
+
+class Pedigree:
+    def __init__(self, parents, order):
+        self.parents = parents  # member id -> tuple of up to two parent ids
+        self.order = order      # member id -> generation; parents always come first
+        self._kinship = {}
+
+    @classmethod
+    def load(cls):
+        order = compute_generations()
+        parents = {member_id: [] for member_id in order}
+        edges = db.session.query(FamilyRelationship.parent_id, FamilyRelationship.child_id).filter(
+            FamilyRelationship.relationship_type == 'parent'
+        ).order_by(FamilyRelationship.parent_id)
+        for parent_id, child_id in edges:
+            # Members caught in a parent cycle have no generation and are left out; a third
+            # recorded parent (an integrity issue) is ignored, as a member has two parents
+            if parent_id in order and child_id in order and len(parents[child_id]) < 2:
+                parents[child_id].append(parent_id)
+        return cls({member_id: tuple(ids) for member_id, ids in parents.items()}, order)
+
+    def __contains__(self, member_id):
+        return member_id in self.order
+
+    def _key(self, a, b):
+        # Recurse on the later member, who cannot be an ancestor of the other
+        if self.order[a] < self.order[b] or (self.order[a] == self.order[b] and a < b):
+            a, b = b, a
+        return a, b
+
+    def _dependencies(self, a, b):
+        if a == b:
+            parents = self.parents[a]
+            return [self._key(*parents)] if len(parents) == 2 else []
+        return [self._key(parent_id, b) for parent_id in self.parents[a]]
+
+    def kinship(self, a, b):
+        """Probability that an allele drawn from a and one drawn from b are identical by descent."""
+        if len(self._kinship) > MAX_MEMO_PAIRS:
+            # Replaced rather than cleared, so a thread still computing keeps its own
+            self._kinship = {}
+        memo = self._kinship
+        key = self._key(a, b)
+        stack = [key]
+        # Explicit stack: a long line of descent must not hit Python's recursion limit
+        while stack:
+            pair = stack[-1]
+            if pair in memo:
+                stack.pop()
+                continue
+            dependencies = self._dependencies(*pair)
+            missing = [dependency for dependency in dependencies if dependency not in memo]
+            if missing:
+                stack.extend(missing)
+                continue
+            if pair[0] == pair[1]:
+                memo[pair] = (1 + (memo[dependencies[0]] if dependencies else 0)) / 2
+            else:
+                memo[pair] = sum(memo[dependency] for dependency in dependencies) / 2
+            stack.pop()
+        return memo[key]
+
+    def inbreeding(self, member_id):
+        """Wright's inbreeding coefficient F: the kinship of the member's two parents."""
+        parents = self.parents[member_id]
+        return self.kinship(*parents) if len(parents) == 2 else 0.0
+
+    def relationship(self, a, b):
+        """Wright's coefficient of relationship (0.5 for parent and child or full siblings)."""
+        if a == b:
+            return 1.0
+        return 2 * self.kinship(a, b) / math.sqrt((1 + self.inbreeding(a)) * (1 + self.inbreeding(b)))
+
+    def ancestors(self, member_ids):
+        """Every ancestor of member_ids, not including them."""
+        seen = set()
+        frontier = [parent_id for member_id in member_ids for parent_id in self.parents[member_id]]
+        while frontier:
+            member_id = frontier.pop()
+            if member_id not in seen:
+                seen.add(member_id)
+                frontier.extend(self.parents[member_id])
+        return seen
+
+    def closest_common_ancestors(self, a, b):
+        """Common ancestors (a or b themselves included) that are not ancestors of another common ancestor."""
+        common = (self.ancestors([a]) | {a}) & (self.ancestors([b]) | {b})
+        return common - self.ancestors(common)
+
+    def collapse(self, member_id, generations):
+        """Pedigree collapse up to `generations` back from the member.
+
+        Returns per-generation rows of theoretical ancestor slots (2 ** n),
+        recorded slots and distinct ancestors, plus totals over all rows.
+        Slots are counted by number of lines of descent per ancestor, so the
+        work grows with distinct ancestors, not with 2 ** generations.
+        """
+        rows = []
+        seen = set()
+        level = {member_id: 1}
+        for generation in range(1, generations + 1):
+            next_level = {}
+            for descendant_id, lines in level.items():
+                for parent_id in self.parents[descendant_id]:
+                    next_level[parent_id] = next_level.get(parent_id, 0) + lines
+            if not next_level:
+                break
+            rows.append({'generation': generation, 'theoretical': 2 ** generation,
+                         'recorded': sum(next_level.values()), 'unique': len(next_level)})
+            seen.update(next_level)
+            level = next_level
+        return {'generations': rows, 'recorded_ancestors': sum(row['recorded'] for row in rows),
+                'unique_ancestors': len(seen)}
+
+def current_pedigree():
+    return cached_for_version('kinship-pedigree', Pedigree.load)
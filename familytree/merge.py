@@ -0,0 +1,143 @@
+"""Merge duplicate member records into one survivor.
+
+Relationships are re-pointed with set-based UPDATE statements over all
+merge groups at once, so the cost is a fixed handful of statements plus
+the generation upkeep for the survivors' parent edges. The function adds
+to the session and leaves committing to the caller.
+"""
+from .extensions import db
+from .models import FamilyMember, FamilyRelationship
+from .generations import order_parent_edge, relax_generations
+from .families import refresh_family_units
+from .versioning import note_changed_members
+
+class MergeError(ValueError):
+    pass
+
+# Fields taken from the first loser that has a value when the survivor's is empty
+MERGE_FIELDS = ('full_name', 'chinese_name', 'nickname', 'gender', 'birth_date', 'death_date',
+                'birth_place', 'death_place', 'marital_status', 'father_name',
+                'mother_name', 'spouse_name', 'have_children', 'children_data')
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and value.strip() in ('', '[]', 'undefined'))
+
+def merge_member_fields(survivor, losers):
+    """Fill the survivor's empty fields from the losers in order.
+
+    Notes from every record are kept, and a member recorded as deceased in
+    any record ends up deceased. The first photo (the survivor's if it has
+    one) stays the photo; the other uploads are kept and returned, so the
+    caller can report them.
+    """
+    for name in MERGE_FIELDS:
+        if _is_blank(getattr(survivor, name)):
+            for loser in losers:
+                value = getattr(loser, name)
+                if not _is_blank(value):
+                    setattr(survivor, name, value)
+                    break
+    photos = list(dict.fromkeys(member.photo_filename for member in [survivor, *losers]
+                                if not _is_blank(member.photo_filename)))
+    if photos:
+        survivor.photo_filename = photos[0]
+    notes = [member.notes.strip() for member in [survivor, *losers] if member.notes and member.notes.strip()]
+    if notes:
+        survivor.notes = '\n\n'.join(dict.fromkeys(notes))
+    if survivor.is_alive is None or any(loser.is_alive is False for loser in losers):
+        survivor.is_alive = all(member.is_alive is not False for member in [survivor, *losers])
+    return photos[1:]
+
+def merge_members(groups):
+    """Merge each (survivor_id, loser_ids) group; returns a dict of counts.
+
+    Raises MergeError for unknown ids, ids used in more than one group, or
+    a group that contains both a parent and their child.
+    """
+    loser_to_survivor = {}
+    survivor_ids = set()
+    for survivor_id, loser_ids in groups:
+        if survivor_id in survivor_ids or survivor_id in loser_to_survivor:
+            raise MergeError(f'Member #{survivor_id} appears in more than one merge')
+        survivor_ids.add(survivor_id)
+        for loser_id in loser_ids:
+            if loser_id == survivor_id or loser_id in loser_to_survivor or loser_id in survivor_ids:
+                raise MergeError(f'Member #{loser_id} appears in more than one merge')
+            loser_to_survivor[loser_id] = survivor_id
+    all_ids = survivor_ids | set(loser_to_survivor)
+
+    members = {member.id: member for member in FamilyMember.query.filter(FamilyMember.id.in_(all_ids))}
+    missing = sorted(all_ids - set(members))
+    if missing:
+        raise MergeError(f"Member #{', #'.join(map(str, missing))} does not exist")
+
+    rel_table = FamilyRelationship.__table__
+    for parent_id, child_id in db.session.execute(
+        db.select(rel_table.c.parent_id, rel_table.c.child_id).where(
+            rel_table.c.relationship_type == 'parent',
+            rel_table.c.parent_id.in_(all_ids), rel_table.c.child_id.in_(all_ids))
+    ):
+        if loser_to_survivor.get(parent_id, parent_id) == loser_to_survivor.get(child_id, child_id):
+            raise MergeError(f'Member #{parent_id} is the parent of #{child_id}; they cannot be merged')
+
+    unused_photos = {}
+    for survivor_id, loser_ids in groups:
+        photos = merge_member_fields(members[survivor_id], [members[loser_id] for loser_id in loser_ids])
+        if photos:
+            unused_photos[survivor_id] = photos
+    db.session.flush()
+
+    # Re-point every edge of every loser in one UPDATE per column
+    losers = list(loser_to_survivor)
+    repointed = 0
+    for column in (FamilyRelationship.parent_id, FamilyRelationship.child_id):
+        result = db.session.execute(
+            db.update(FamilyRelationship).where(column.in_(losers))
+            .values({column: db.case(loser_to_survivor, value=column)})
+            .execution_options(synchronize_session=False))
+        repointed += result.rowcount
+
+    # Links between duplicates became self-links, and shared links became duplicates
+    edges = db.session.execute(
+        db.select(rel_table.c.id, rel_table.c.parent_id, rel_table.c.child_id, rel_table.c.relationship_type)
+        .where(db.or_(rel_table.c.parent_id.in_(survivor_ids), rel_table.c.child_id.in_(survivor_ids)))
+        .order_by(rel_table.c.id)
+    ).all()
+    seen = set()
+    removed_ids = []
+    parent_edges = []
+    for edge_id, parent_id, child_id, relationship_type in edges:
+        key = (parent_id, child_id, relationship_type)
+        if parent_id == child_id or key in seen:
+            removed_ids.append(edge_id)
+            continue
+        seen.add(key)
+        if relationship_type == 'parent':
+            parent_edges.append((parent_id, child_id))
+    if removed_ids:
+        db.session.execute(db.delete(FamilyRelationship).where(FamilyRelationship.id.in_(removed_ids))
+                           .execution_options(synchronize_session=False))
+
+
+    # Survivors inherit parents and children, so restore the generation order
+    # (this also rejects merges that would make someone their own ancestor)
+    connection = db.session.connection()
+    for parent_id, child_id in parent_edges:
+        order_parent_edge(connection, parent_id, child_id)
+    relax_generations(connection, survivor_ids | {child_id for parent_id, child_id in parent_edges
+                                                  if parent_id in survivor_ids})
+    touched_ids = all_ids | {edge.parent_id for edge in edges} | {edge.child_id for edge in edges}
+    # Couples and children of the losers now belong to the survivors; the losers
+    # are left without units, which point at them, so they can be deleted next
+    refresh_family_units(connection, touched_ids)
+    FamilyMember.query.filter(FamilyMember.id.in_(losers)).delete(synchronize_session='fetch')
+
+    note_changed_members(touched_ids)
+    return {
+        'survivors': len(survivor_ids),
+        'merged': len(losers),
+        'relationships_repointed': repointed,
+        'relationships_removed': len(removed_ids),
+        # {survivor id: [photo filenames of their duplicates that it does not use]}; the files are kept
+        'unused_photos': unused_photos
+    }
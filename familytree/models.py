@@ -0,0 +1,211 @@
+from datetime import datetime
+
+from flask_login import UserMixin
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from .extensions import db
+
+# Database Models
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(120), nullable=False)
+    is_admin = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    tree_memberships = db.relationship('TreeMembership', backref='user', lazy='select',
+                                       cascade='all, delete-orphan')
+
+    def set_password(self, password):
+        self.password_hash = generate_password_hash(password)
+
+    def check_password(self, password):
+        return check_password_hash(self.password_hash, password)
+
+    @property
+    def tree_roles(self):
+        """Family tree id -> this user's role in it ('member' or 'admin')."""
+        return {membership.tree_id: membership.role for membership in self.tree_memberships}
+
+class FamilyTree(db.Model):
+    """One family (clan) hosted by this installation.
+
+    Members, relationships and integrity issues belong to exactly one tree,
+    and every query on them is limited to the current request's tree (see
+    trees.py). Places are shared: they are only interned place names.
+    Anyone may open a public tree; the others only their members.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    slug = db.Column(db.String(100), nullable=False, unique=True, index=True)  # used in ?tree=<slug>
+    is_public = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TreeMembership(db.Model):
+    """A user's role in one family tree: 'member', or 'admin' for the admin dashboard and tools."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', name='fk_tree_membership_user_id_user'), nullable=False)
+    tree_id = db.Column(db.Integer, db.ForeignKey('family_tree.id', name='fk_tree_membership_tree_id_family_tree'),
+                        nullable=False, index=True)
+    role = db.Column(db.String(20), nullable=False, default='member')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'tree_id', name='uq_tree_membership_user_id_tree_id'),
+    )
+
+class FamilyMember(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    tree_id = db.Column(db.Integer, db.ForeignKey('family_tree.id', name='fk_family_member_tree_id_family_tree'),
+                        nullable=False)
+    full_name = db.Column(db.String(200), nullable=False)
+    chinese_name = db.Column(db.String(100))
+    nickname = db.Column(db.String(100))
+    birth_date = db.Column(db.Date)
+    death_date = db.Column(db.Date)
+    birth_place = db.Column(db.String(200))
+    death_place = db.Column(db.String(200))
+    # Interned form of birth_place/death_place, set on every flush (see places.py)
+    birth_place_id = db.Column(db.Integer, db.ForeignKey('place.id', name='fk_family_member_birth_place_id_place'))
+    death_place_id = db.Column(db.Integer, db.ForeignKey('place.id', name='fk_family_member_death_place_id_place'))
+    gender = db.Column(db.String(10), nullable=False)
+    notes = db.Column(db.Text)
+    photo_filename = db.Column(db.String(500))
+    is_alive = db.Column(db.Boolean, default=True)
+    # Derived from birth_date/death_date on every flush (see dates.py) for indexed date queries
+    birth_year = db.Column(db.Integer)
+    birth_month_day = db.Column(db.Integer)  # MMDD, e.g. 315 for 15 March
+    death_year = db.Column(db.Integer)
+    death_month_day = db.Column(db.Integer)
+    # Longest chain of parent links above this member; maintained on every parent edge write
+    generation = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # New fields for marital status and family information
+    marital_status = db.Column(db.String(20))  # Single, Married
+    father_name = db.Column(db.String(200))
+    mother_name = db.Column(db.String(200))
+    spouse_name = db.Column(db.String(200))
+    have_children = db.Column(db.String(10))  # Yes, No
+    children_data = db.Column(db.Text)  # JSON string for children information
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Raised by one on every UPDATE, which also checks it, so an edit based on an
+    # older read fails (StaleDataError) instead of overwriting a newer one
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version}
+    
+    # Relationships: plain lazy collections rather than dynamic queries, so code that walks
+    # many members can batch them with .options(db.selectinload(FamilyMember.parent_relationships))
+    parent_relationships = db.relationship('FamilyRelationship', 
+                                         foreign_keys='FamilyRelationship.child_id',
+                                         backref='child', lazy='select')
+    child_relationships = db.relationship('FamilyRelationship',
+                                        foreign_keys='FamilyRelationship.parent_id', 
+                                        backref='parent', lazy='select')
+    birth_place_ref = db.relationship('Place', foreign_keys=[birth_place_id])
+    death_place_ref = db.relationship('Place', foreign_keys=[death_place_id])
+
+    # Every query is limited to one tree, so indexes lead with tree_id and a
+    # lookup or range scan only reads that tree's entries
+    __table_args__ = (
+        # Keyset pagination of the admin member table: one (sort column, id) index per sort
+        db.Index('ix_family_member_tree_id_full_name_id', 'tree_id', 'full_name', 'id'),
+        db.Index('ix_family_member_tree_id_birth_date_id', 'tree_id', 'birth_date', 'id'),
+        db.Index('ix_family_member_tree_id_updated_at_id', 'tree_id', 'updated_at', 'id'),
+        # "Who was born/died here" pages and per-place counts
+        db.Index('ix_family_member_tree_id_birth_place_id_id', 'tree_id', 'birth_place_id', 'id'),
+        db.Index('ix_family_member_tree_id_death_place_id_id', 'tree_id', 'death_place_id', 'id'),
+        # Date-driven queries (see dates.py) and generation rows
+        db.Index('ix_family_member_tree_id_birth_year', 'tree_id', 'birth_year'),
+        db.Index('ix_family_member_tree_id_birth_month_day', 'tree_id', 'birth_month_day'),
+        db.Index('ix_family_member_tree_id_death_year', 'tree_id', 'death_year'),
+        db.Index('ix_family_member_tree_id_death_month_day', 'tree_id', 'death_month_day'),
+        db.Index('ix_family_member_tree_id_generation', 'tree_id', 'generation'),
+        # Every column /api/search counts facets on, so facet queries never touch the table
+        db.Index('ix_family_member_tree_id_search_facets', 'tree_id', 'gender', 'is_alive', 'marital_status',
+                 'birth_year', 'birth_place_id', 'death_place_id', 'have_children', 'photo_filename'),
+    )
+
+class Place(db.Model):
+    """One distinct place; spelling variants of the same place share a key."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)  # as first entered, e.g. 'Kota Kinabalu, Sabah'
+    key = db.Column(db.String(200), nullable=False, unique=True, index=True)  # 'kota kinabalu, sabah'
+    region = db.Column(db.String(200), nullable=False, index=True)  # key of the last part, 'sabah'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class FamilyRelationship(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # Always the tree of both members (checked on flush, see trees.py)
+    tree_id = db.Column(db.Integer, db.ForeignKey('family_tree.id', name='fk_family_relationship_tree_id_family_tree'),
+                        nullable=False)
+    parent_id = db.Column(db.Integer, db.ForeignKey('family_member.id'), nullable=False, index=True)
+    child_id = db.Column(db.Integer, db.ForeignKey('family_member.id'), nullable=False, index=True)
+    relationship_type = db.Column(db.String(50), nullable=False)  # 'parent', 'spouse', 'sibling'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # "Has this member any linked child" without reading the relationship rows
+        db.Index('ix_family_relationship_parent_id_relationship_type', 'parent_id', 'relationship_type'),
+        # A tree's parent (or spouse) edges, for generations, kinship and the tree page
+        db.Index('ix_family_relationship_tree_id_relationship_type', 'tree_id', 'relationship_type'),
+    )
+
+class FamilyUnit(db.Model):
+    """A couple, or a lone parent, and the children born to them; derived from the relationships (see families.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    tree_id = db.Column(db.Integer, db.ForeignKey('family_tree.id', name='fk_family_unit_tree_id_family_tree'),
+                        nullable=False, index=True)
+    # The lower id of a couple, or the lone parent
+    partner1_id = db.Column(db.Integer, db.ForeignKey('family_member.id', name='fk_family_unit_partner1_id_family_member'),
+                            nullable=False)
+    partner2_id = db.Column(db.Integer, db.ForeignKey('family_member.id', name='fk_family_unit_partner2_id_family_member'),
+                            index=True)
+    # partner2_id, or 0 for a lone parent: NULLs never collide in a unique
+    # constraint, so this is what keeps a lone parent to one unit
+    partner2_key = db.Column(db.Integer, nullable=False, server_default='0',
+                             default=lambda context: context.get_current_parameters().get('partner2_id') or 0)
+
+    __table_args__ = (
+        db.UniqueConstraint('partner1_id', 'partner2_key', name='uq_family_unit_partner1_id_partner2_key'),
+    )
+
+class FamilyUnitChild(db.Model):
+    """The unit a child was born into; every child is in at most one."""
+    child_id = db.Column(db.Integer, db.ForeignKey('family_member.id', name='fk_family_unit_child_child_id_family_member'),
+                         primary_key=True, autoincrement=False)
+    unit_id = db.Column(db.Integer, db.ForeignKey('family_unit.id', name='fk_family_unit_child_unit_id_family_unit'),
+                        nullable=False, index=True)
+
+class DataVersion(db.Model):
+    """Counter bumped by every commit that changes a family tree's data; one row per tree, id = tree id.
+
+    Read endpoints cache their results per tree and version, so a cache
+    entry stays valid exactly until the next write to that tree from any
+    worker process.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class IntegrityIssue(db.Model):
+    """A data problem found by the integrity checker.
+
+    Edge problems store the relationship's child as member_id and its parent
+    as related_member_id. There are deliberately no foreign keys to members,
+    so issues can describe edges that point at deleted members.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    tree_id = db.Column(db.Integer, db.ForeignKey('family_tree.id', name='fk_integrity_issue_tree_id_family_tree'),
+                        nullable=False)
+    kind = db.Column(db.String(50), nullable=False)
+    member_id = db.Column(db.Integer, index=True)
+    related_member_id = db.Column(db.Integer, index=True)
+    relationship_id = db.Column(db.Integer)
+    message = db.Column(db.String(500), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_integrity_issue_tree_id_kind', 'tree_id', 'kind'),
+    )
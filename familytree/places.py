@@ -0,0 +1,126 @@
+"""Interned places and the geographic aggregates built on them.
+
+Members keep the place text as submitted, and every flush points
+birth_place_id/death_place_id at the Place with the same normalized key,
+so "Manila,  Philippines" and "manila, philippines" count as one place and
+per-place questions are indexed joins on small integers.
+"""
+from .autocomplete import normalize_name
+from .extensions import db
+from .models import FamilyMember, Place
+
+PLACE_FIELDS = (('birth_place', 'birth_place_ref'), ('death_place', 'death_place_ref'))
+
+def split_place(text):
+    """' Kota  Kinabalu ,Sabah,' -> ['Kota Kinabalu', 'Sabah']; parts with no letters or digits are dropped."""
+    parts = (' '.join(part.split()) for part in (text or '').split(','))
+    return [part for part in parts if normalize_name(part)]
+
+def place_key(parts):
+    return ', '.join(normalize_name(part) for part in parts)
+
+def preferred_spelling(names):
+    """The spelling to show for a new place: mixed case over all-lower or all-upper, then alphabetical."""
+    return min(names, key=lambda name: (name.islower() or name.isupper(), name))
+
+def intern_places(texts):
+    """Return {text: Place or None} for the given place strings, adding new places to the session."""
+    parts_by_text = {text: split_place(text) for text in texts}
+    keys = {place_key(parts) for parts in parts_by_text.values() if parts}
+    with db.session.no_autoflush:
+        places = {place.key: place for place in Place.query.filter(Place.key.in_(keys))} if keys else {}
+    spellings = {}
+    for parts in parts_by_text.values():
+        if parts and place_key(parts) not in places:
+            spellings.setdefault(place_key(parts), []).append(', '.join(parts))
+    for key, names in spellings.items():
+        # Normalized parts contain no commas, so the region is the key's last part
+        places[key] = Place(name=preferred_spelling(names)[:200], key=key[:200],
+                            region=key.rsplit(', ', 1)[-1][:200])
+        db.session.add(places[key])
+    return {text: places[place_key(parts)] if parts else None for text, parts in parts_by_text.items()}
+
+@db.event.listens_for(db.session, 'before_flush')
+def _intern_member_places(session, flush_context, instances):
+    changed = []
+    for member in list(session.new) + list(session.dirty):
+        if not isinstance(member, FamilyMember):
+            continue
+        state = db.inspect(member)
+        for text_attr, ref_attr in PLACE_FIELDS:
+            if state.pending or state.attrs[text_attr].history.has_changes():
+                changed.append((member, text_attr, ref_attr))
+    if changed:
+        places = intern_places({getattr(member, text_attr) for member, text_attr, _ in changed})
+        for member, text_attr, ref_attr in changed:
+            setattr(member, ref_attr, places[getattr(member, text_attr)])
+
+def _place_count_subqueries():
+    births = (db.session.query(FamilyMember.birth_place_id.label('place_id'),
+                               db.func.count(FamilyMember.id).label('count'))
+              .filter(FamilyMember.birth_place_id.isnot(None))
+              .group_by(FamilyMember.birth_place_id).subquery())
+    deaths = (db.session.query(FamilyMember.death_place_id.label('place_id'),
+                               db.func.count(FamilyMember.id).label('count'))
+              .filter(FamilyMember.death_place_id.isnot(None))
+              .group_by(FamilyMember.death_place_id).subquery())
+    return births, deaths
+
+def place_counts(search=None, region=None, limit=100):
+    """Places in use with their birth and death counts, most used first."""
+    births, deaths = _place_count_subqueries()
+    birth_count = db.func.coalesce(births.c.count, 0)
+    death_count = db.func.coalesce(deaths.c.count, 0)
+    query = (db.session.query(Place.id, Place.name, Place.region, birth_count.label('births'),
+                              death_count.label('deaths'))
+             .outerjoin(births, births.c.place_id == Place.id)
+             .outerjoin(deaths, deaths.c.place_id == Place.id)
+             .filter(db.or_(births.c.count.isnot(None), deaths.c.count.isnot(None))))
+    if search:
+        query = query.filter(Place.key.like(f'%{normalize_name(search)}%'))
+    if region:
+        query = query.filter(Place.region == normalize_name(region))
+    rows = query.order_by((birth_count + death_count).desc(), Place.name).limit(limit)
+    return [{'id': place_id, 'name': name, 'region': region, 'births': births_total, 'deaths': deaths_total}
+            for place_id, name, region, births_total, deaths_total in rows]
+
+def region_counts(limit=100):
+    """Birth and death counts rolled up to the last part of each place ('Sabah', 'Philippines')."""
+    births, deaths = _place_count_subqueries()
+    birth_total = db.func.coalesce(db.func.sum(births.c.count), 0)
+    death_total = db.func.coalesce(db.func.sum(deaths.c.count), 0)
+    rows = (db.session.query(Place.region, birth_total.label('births'), death_total.label('deaths'),
+                             db.func.count(Place.id).label('places'))
+            .outerjoin(births, births.c.place_id == Place.id)
+            .outerjoin(deaths, deaths.c.place_id == Place.id)
+            .filter(db.or_(births.c.count.isnot(None), deaths.c.count.isnot(None)))
+            .group_by(Place.region)
+            .order_by((birth_total + death_total).desc(), Place.region)
+            .limit(limit))
+    rows = rows.all()
+    # Show a region as spelled by the place that is just that region, when there is one
+    names = dict(db.session.query(Place.key, Place.name).filter(Place.key.in_([row.region for row in rows])))
+    return [{'region': region, 'name': names.get(region, region.title()), 'births': births_total,
+             'deaths': deaths_total, 'places': place_total}
+            for region, births_total, deaths_total, place_total in rows]
+
+def place_flows(by_region=False, limit=100):
+    """Counts of members who died somewhere other than where they were born, largest first."""
+    birth_place = db.aliased(Place)
+    death_place = db.aliased(Place)
+    count = db.func.count(FamilyMember.id).label('count')
+    if by_region:
+        columns = (birth_place.region, death_place.region)
+        different = birth_place.region != death_place.region
+    else:
+        columns = (birth_place.id, birth_place.name, death_place.id, death_place.name)
+        different = FamilyMember.birth_place_id != FamilyMember.death_place_id
+    rows = (db.session.query(*columns, count).select_from(FamilyMember)
+            .join(birth_place, FamilyMember.birth_place_id == birth_place.id)
+            .join(death_place, FamilyMember.death_place_id == death_place.id)
+            .filter(different).group_by(*columns)
+            .order_by(count.desc()).limit(limit))
+    if by_region:
+        return [{'from': origin, 'to': destination, 'count': total} for origin, destination, total in rows]
+    return [{'from': {'id': origin_id, 'name': origin}, 'to': {'id': destination_id, 'name': destination},
+             'count': total} for origin_id, origin, destination_id, destination, total in rows]
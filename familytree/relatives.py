@@ -0,0 +1,69 @@
+"""A member's parents, children, spouses and siblings in two queries.
+
+The first query reads every relationship row the requested kinds need
+(rows touching the member, plus the parents' other children for siblings);
+the second loads the member and all of those relatives together.
+"""
+from .extensions import db
+from .models import FamilyMember, FamilyRelationship
+
+RELATIVE_KINDS = ('parents', 'children', 'spouses', 'siblings')
+
+def parse_include(value):
+    """Kinds listed in an ?include= value, in RELATIVE_KINDS order; raises ValueError for unknown kinds."""
+    kinds = {kind.strip() for kind in (value or '').split(',') if kind.strip()}
+    unknown = kinds.difference(RELATIVE_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown include {', '.join(sorted(unknown))}; use {', '.join(RELATIVE_KINDS)}")
+    return [kind for kind in RELATIVE_KINDS if kind in kinds]
+
+def _relative_ids(member_id, kinds):
+    rel = FamilyRelationship.__table__
+    condition = db.or_(rel.c.parent_id == member_id, rel.c.child_id == member_id)
+    if 'siblings' in kinds:
+        parent_ids = db.select(rel.c.parent_id).where(rel.c.child_id == member_id,
+                                                       rel.c.relationship_type == 'parent')
+        condition = db.or_(condition, db.and_(rel.c.relationship_type == 'parent', rel.c.parent_id.in_(parent_ids)))
+    edges = db.session.execute(db.select(rel.c.parent_id, rel.c.child_id, rel.c.relationship_type).where(condition)).all()
+
+    parents = {parent_id for parent_id, child_id, kind in edges if kind == 'parent' and child_id == member_id}
+    ids = {
+        'parents': parents,
+        'children': {child_id for parent_id, child_id, kind in edges if kind == 'parent' and parent_id == member_id},
+        # Spouse links are stored in both directions; either one counts
+        'spouses': {parent_id if child_id == member_id else child_id
+                    for parent_id, child_id, kind in edges
+                    if kind == 'spouse' and member_id in (parent_id, child_id)},
+        'siblings': {child_id for parent_id, child_id, kind in edges
+                     if kind == 'parent' and parent_id in parents and child_id != member_id}
+                    | {parent_id if child_id == member_id else child_id
+                       for parent_id, child_id, kind in edges
+                       if kind == 'sibling' and member_id in (parent_id, child_id)},
+    }
+    return {kind: ids[kind] - {member_id} for kind in kinds}
+
+def _birth_order(member):
+    return (member.birth_date is None, member.birth_date, member.full_name, member.id)
+
+def load_relatives(member_id, kinds):
+    """Return (member, {kind: [FamilyMember, ...]}) with relatives in birth order; member is None if missing."""
+    ids = _relative_ids(member_id, kinds)
+    wanted = set().union(*ids.values()) | {member_id}
+    members = {member.id: member for member in FamilyMember.query.filter(FamilyMember.id.in_(wanted))}
+    relatives = {kind: sorted((members[relative_id] for relative_id in ids[kind] if relative_id in members),
+                              key=_birth_order)
+                 for kind in kinds}
+    return members.get(member_id), relatives
+
+def relative_summary(member):
+    return {
+        'id': member.id,
+        'full_name': member.full_name,
+        'chinese_name': member.chinese_name,
+        'nickname': member.nickname,
+        'gender': member.gender,
+        'birth_date': member.birth_date.isoformat() if member.birth_date else None,
+        'death_date': member.death_date.isoformat() if member.death_date else None,
+        'is_alive': member.is_alive,
+        'photo_filename': member.photo_filename,
+    }
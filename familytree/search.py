@@ -0,0 +1,178 @@
+"""Faceted member search for the admin dashboard.
+
+Every filter is a WHERE clause on family_member. Facet counts are
+disjunctive: each facet is counted with all the other active filters but
+not its own, so the counts show what picking another value would return.
+Facets are GROUP BY queries answered from ix_family_member_search_facets,
+which holds every faceted column, so they read the index, not the table.
+The yes/no facets without a filter of their own share one query.
+
+The total and facets only change with the filters and the data, so they
+are cached per data version for the filters in use (see
+versioning.cached_for_version); paging and re-sorting a search reads only
+the page itself.
+"""
+from .extensions import db
+from .models import FamilyMember, FamilyRelationship, Place
+from .places import place_key, split_place
+from .versioning import cached_for_version
+
+BOOLEAN_VALUES = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+FILTER_ARGS = ('q', 'gender', 'is_alive', 'marital_status', 'born_from', 'born_to', 'place', 'has_photo',
+               'unlinked_children')
+MAX_PLACE_FACETS = 10
+# Integer facet columns that also have an index of their own
+OWN_INDEX_FACETS = ('birth_year', 'birth_place_id')
+# Distinct filter combinations whose counts are kept per data version
+MAX_CACHED_SUMMARIES = 256
+
+class SearchError(ValueError):
+    pass
+
+def _boolean(args, name):
+    value = args.get(name, '').strip().lower()
+    if not value:
+        return None
+    if value not in BOOLEAN_VALUES:
+        raise SearchError(f'{name} must be true or false')
+    return BOOLEAN_VALUES[value]
+
+def _year(args, name):
+    value = args.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise SearchError(f'{name} must be a year') from None
+
+def _has_photo():
+    return db.and_(FamilyMember.photo_filename.isnot(None), FamilyMember.photo_filename != '')
+
+def _has_unlinked_children():
+    # Says they have children, but no child is linked to them yet
+    linked = db.exists().where(FamilyRelationship.parent_id == FamilyMember.id,
+                               FamilyRelationship.relationship_type == 'parent')
+    return db.and_(FamilyMember.have_children == 'Yes', ~linked)
+
+def search_filters(args):
+    """Map facet name -> WHERE clause for the filters given in request args; raises SearchError."""
+    filters = {}
+    text = args.get('q', '').strip()
+    if text:
+        pattern = f'%{text}%'
+        filters['q'] = db.or_(FamilyMember.full_name.ilike(pattern), FamilyMember.chinese_name.ilike(pattern),
+                              FamilyMember.nickname.ilike(pattern))
+    if args.get('gender'):
+        filters['gender'] = FamilyMember.gender == args['gender']
+    is_alive = _boolean(args, 'is_alive')
+    if is_alive is not None:
+        # Unknown status counts as deceased, as in the stats
+        filters['is_alive'] = FamilyMember.is_alive.is_(True) if is_alive else FamilyMember.is_alive.isnot(True)
+    if args.get('marital_status'):
+        status = args['marital_status']
+        filters['marital_status'] = (db.or_(FamilyMember.marital_status.is_(None), FamilyMember.marital_status == '')
+                                     if status == 'Unknown' else FamilyMember.marital_status == status)
+    born_from, born_to = _year(args, 'born_from'), _year(args, 'born_to')
+    if born_from is not None or born_to is not None:
+        filters['birth_decade'] = FamilyMember.birth_year.between(
+            born_from if born_from is not None else -9999, born_to if born_to is not None else 9999)
+    if args.get('place'):
+        key = place_key(split_place(args['place']))
+        # Resolved up front: a handful of ids, rather than a subquery in every facet query
+        place_ids = [place_id for (place_id,) in
+                     db.session.query(Place.id).filter(db.or_(Place.key == key, Place.region == key))]
+        filters['place'] = db.or_(FamilyMember.birth_place_id.in_(place_ids),
+                                  FamilyMember.death_place_id.in_(place_ids))
+    has_photo = _boolean(args, 'has_photo')
+    if has_photo is not None:
+        filters['has_photo'] = _has_photo() if has_photo else ~_has_photo()
+    unlinked_children = _boolean(args, 'unlinked_children')
+    if unlinked_children is not None:
+        filters['unlinked_children'] = _has_unlinked_children() if unlinked_children else ~_has_unlinked_children()
+    return filters
+
+def counts_by_value(rows):
+    """{value: count} from (value, count) rows, with NULL and '' both added into 'Unknown'."""
+    counts = {}
+    for value, count in rows:
+        counts[value or 'Unknown'] = counts.get(value or 'Unknown', 0) + count
+    return counts
+
+def _counts(column, filters, facet):
+    clauses = [clause for name, clause in filters.items() if name != facet]
+    group = column
+    if clauses and column.key in OWN_INDEX_FACETS and 'q' not in filters:
+        # Grouped by +column, SQLite no longer walks the column's own index to skip the
+        # sort, reading every row of the tree, and answers from the facet index instead
+        # (name text is not in it, so with q the rows are read either way)
+        group = db.literal_column(f'+{FamilyMember.__tablename__}.{column.key}')
+    query = db.session.query(group, db.func.count()).select_from(FamilyMember)
+    if clauses:
+        query = query.filter(*clauses)
+    return query.group_by(group).all()
+
+def _flag_counts(conditions, filters, facet=None):
+    """{name: {'true': n, 'false': m}} for each condition in one query, with every filter but facet's."""
+    names = list(conditions)
+    query = db.session.query(db.func.count(), *(db.func.sum(db.case((conditions[name], 1), else_=0))
+                                                for name in names)).select_from(FamilyMember)
+    clauses = [clause for name, clause in filters.items() if name != facet]
+    if clauses:
+        query = query.filter(*clauses)
+    total, *matching = query.one()
+    return {name: {'true': count or 0, 'false': total - (count or 0)} for name, count in zip(names, matching)}
+
+def _places():
+    # Places are only added by member writes, so the data version covers them
+    return {place_id: (key, name, region)
+            for place_id, key, name, region in db.session.query(Place.id, Place.key, Place.name, Place.region)}
+
+def _place_counts(filters):
+    # Grouped by place id from the facet index, then folded into regions here
+    places = cached_for_version('search-places', _places)
+    regions = {}
+    for place_id, count in _counts(FamilyMember.birth_place_id, filters, 'place'):
+        if place_id in places:
+            region = places[place_id][2]
+            regions[region] = regions.get(region, 0) + count
+    # Show a region by the spelling of the place that is the region itself (e.g. 'Sabah')
+    names = {key: name for key, name, region in places.values() if key == region and key in regions}
+    top = sorted(regions.items(), key=lambda item: (-item[1], item[0]))[:MAX_PLACE_FACETS]
+    return [{'place': region, 'name': names.get(region, region.title()), 'count': count} for region, count in top]
+
+def facet_counts(filters):
+    """Counts for every facet; each ignores its own filter but applies all the others."""
+    decades = {}
+    for year, count in _counts(FamilyMember.birth_year, filters, 'birth_decade'):
+        if year is not None:
+            decades[year // 10 * 10] = decades.get(year // 10 * 10, 0) + count
+    flags = {'is_alive': FamilyMember.is_alive.is_(True), 'has_photo': _has_photo(),
+             'unlinked_children': _has_unlinked_children()}
+    flag_counts = _flag_counts({name: flags[name] for name in flags if name not in filters}, filters)
+    for name in flags:
+        if name in filters:
+            flag_counts.update(_flag_counts({name: flags[name]}, filters, name))
+    return {
+        'gender': counts_by_value(_counts(FamilyMember.gender, filters, 'gender')),
+        'is_alive': flag_counts['is_alive'],
+        'marital_status': counts_by_value(_counts(FamilyMember.marital_status, filters, 'marital_status')),
+        'birth_decade': [{'decade': decade, 'count': decades[decade]} for decade in sorted(decades)],
+        'place': _place_counts(filters),
+        'has_photo': flag_counts['has_photo'],
+        'unlinked_children': flag_counts['unlinked_children'],
+    }
+
+def search_summary(args, filters):
+    """Return (total, facet counts) for the filters parsed from args, cached per data version."""
+    summaries = cached_for_version('search-summaries', dict)
+    key = tuple(args.get(name, '').strip() for name in FILTER_ARGS)
+    summary = summaries.get(key)
+    if summary is None:
+        if len(summaries) >= MAX_CACHED_SUMMARIES:
+            summaries.clear()
+        query = db.session.query(FamilyMember.id)
+        if filters:
+            query = query.filter(*filters.values())
+        summary = summaries[key] = (query.count(), facet_counts(filters))
+    return summary
@@ -0,0 +1,88 @@
+"""Helpers shared by the member and relationship views."""
+import json
+import os
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+from .extensions import db
+from .models import FamilyRelationship
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+def save_photo(file):
+    if file and allowed_file(file.filename):
+        # Generate unique filename
+        filename = secure_filename(file.filename)
+        name, ext = os.path.splitext(filename)
+        unique_filename = f"{name}_{uuid.uuid4().hex[:8]}{ext}"
+        
+        os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
+        file.save(file_path)
+        return unique_filename
+    return None
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+# Form/JSON keys that map straight onto FamilyMember text columns
+MEMBER_TEXT_FIELDS = ('chinese_name', 'nickname', 'birth_place', 'death_place', 'notes',
+                      'marital_status', 'father_name', 'mother_name', 'spouse_name', 'have_children')
+
+def member_fields_from_data(data, partial=False):
+    """Column values for a FamilyMember from submitted form or JSON data.
+
+    With partial=True only the fields present in data are returned, so
+    omitted fields keep their current values.
+    """
+    fields = {}
+    if not partial or 'full_name' in data:
+        fields['full_name'] = data['full_name']
+    if not partial or 'gender' in data:
+        fields['gender'] = data['gender']
+    for name in MEMBER_TEXT_FIELDS:
+        if not partial or name in data:
+            fields[name] = data.get(name, '')
+    for name in ('birth_date', 'death_date'):
+        if not partial or name in data:
+            fields[name] = parse_date(data.get(name))
+    if not partial or 'is_alive' in data:
+        fields['is_alive'] = str(data.get('is_alive', 'true')).lower() == 'true'
+    # Process children data if present
+    if 'children_data' in data:
+        fields['children_data'] = json.dumps(data['children_data']) if data['children_data'] else None
+    elif not partial:
+        fields['children_data'] = None
+    return fields
+
+def link_members(member_id, related_member_id, relationship_type):
+    """Add the relationship rows for 'related_member_id is the parent/spouse of member_id'.
+
+    Raises ValueError if the pair is already linked or the type is unknown.
+    """
+    # Check if relationship already exists
+    existing = FamilyRelationship.query.filter(
+        db.or_(
+            db.and_(FamilyRelationship.parent_id == member_id, FamilyRelationship.child_id == related_member_id),
+            db.and_(FamilyRelationship.parent_id == related_member_id, FamilyRelationship.child_id == member_id)
+        )
+    ).first()
+    if existing:
+        raise ValueError('Relationship already exists')
+    
+    if relationship_type == 'parent':
+        relationships = [FamilyRelationship(parent_id=related_member_id, child_id=member_id, relationship_type='parent')]
+    elif relationship_type == 'spouse':
+        # For spouse relationships, we'll create bidirectional
+        relationships = [
+            FamilyRelationship(parent_id=member_id, child_id=related_member_id, relationship_type='spouse'),
+            FamilyRelationship(parent_id=related_member_id, child_id=member_id, relationship_type='spouse')
+        ]
+    else:
+        raise ValueError('Invalid relationship type')
+    db.session.add_all(relationships)
+    return relationships
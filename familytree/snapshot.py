@@ -0,0 +1,125 @@
+"""Compact, versioned snapshot of a tree for the tree page.
+
+The same members and relationships as /api/family-tree-data, stored as
+columns instead of one object per member, which is several times smaller
+before compression and still smaller after:
+
+- names, nicknames, Chinese names and photo file names go into one string
+  table and places into another; columns hold 1-based indexes, 0 = none
+- ids are delta-coded in ascending order, so most are 1, and so are the
+  full name indexes
+- dates are days since 1970-01-01 (negative before), null if unknown
+- genders and relationship types are small codes into their own tables
+- relationships refer to members by position, sorted by child so the
+  child column is delta-coded too
+- family units (see families.py) are two partner columns of positions,
+  the second 1-based with 0 for a lone parent, and each member's "family"
+  is the 1-based unit they were born into, 0 for none
+
+"key" is "<tree id>:<data version>"; the page knows the current key and
+static/js/main.js keeps the snapshot in IndexedDB under it, so a visit
+after which nothing changed reads the tree without downloading it.
+"""
+from datetime import date
+
+from .extensions import db
+from .families import family_units
+from .models import FamilyMember, FamilyRelationship
+from .trees import current_tree_id
+from .versioning import current_data_version
+
+SNAPSHOT_FORMAT = 2
+EPOCH = date(1970, 1, 1)
+
+def snapshot_key(tree_id=None):
+    tree_id = current_tree_id() if tree_id is None else tree_id
+    return f'{tree_id}:{current_data_version(tree_id)}'
+
+class _Table:
+    """Strings in first-seen order; index() is 1-based with 0 for blank."""
+
+    def __init__(self):
+        self.values = []
+        self._positions = {}
+
+    def index(self, value):
+        if not value:
+            return 0
+        position = self._positions.get(value)
+        if position is None:
+            self.values.append(value)
+            position = self._positions[value] = len(self.values)
+        return position
+
+def _days(value):
+    return (value - EPOCH).days if value else None
+
+def _deltas(values):
+    previous = 0
+    for value in values:
+        yield value - previous
+        previous = value
+
+def build_snapshot():
+    # Read the version first: if data changes while we read, the snapshot is
+    # labelled older than its contents and simply gets replaced next visit
+    key = snapshot_key()
+    member = FamilyMember
+    rows = db.session.execute(
+        db.select(member.id, member.full_name, member.chinese_name, member.nickname, member.photo_filename,
+                  member.birth_date, member.death_date, member.birth_place, member.death_place,
+                  member.gender, member.is_alive, member.generation)
+        .order_by(member.id)).all()
+    strings, places, genders = _Table(), _Table(), _Table()
+    position = {row.id: index for index, row in enumerate(rows)}
+    members = {
+        'id': list(_deltas(row.id for row in rows)),
+        # Names are mostly new strings, so their indexes mostly go up by one
+        'full_name': list(_deltas(strings.index(row.full_name) for row in rows)),
+        'chinese_name': [strings.index(row.chinese_name) for row in rows],
+        'nickname': [strings.index(row.nickname) for row in rows],
+        'photo': [strings.index(row.photo_filename) for row in rows],
+        'birth': [_days(row.birth_date) for row in rows],
+        'death': [_days(row.death_date) for row in rows],
+        'birth_place': [places.index(row.birth_place) for row in rows],
+        'death_place': [places.index(row.death_place) for row in rows],
+        'gender': [genders.index(row.gender) for row in rows],
+        'alive': [1 if row.is_alive else 0 for row in rows],
+        'generation': [row.generation for row in rows],
+    }
+
+    units = [(partner1_id, partner2_id, child_ids) for _, partner1_id, partner2_id, child_ids in family_units()
+             if partner1_id in position and (partner2_id is None or partner2_id in position)]
+    born_into = [0] * len(rows)
+    for number, (_, _, child_ids) in enumerate(units, start=1):
+        for child_id in child_ids:
+            if child_id in position:
+                born_into[position[child_id]] = number
+    members['family'] = born_into
+
+    rel = FamilyRelationship
+    types = _Table()
+    edges = sorted(
+        (position[child_id], position[parent_id], types.index(relationship_type))
+        for parent_id, child_id, relationship_type in db.session.execute(
+            db.select(rel.parent_id, rel.child_id, rel.relationship_type))
+        # Links to missing members are left to the integrity checker
+        if parent_id in position and child_id in position)
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'key': key,
+        'strings': strings.values,
+        'places': places.values,
+        'genders': genders.values,
+        'types': types.values,
+        'members': members,
+        'edges': {
+            'child': list(_deltas(child for child, _, _ in edges)),
+            'parent': [parent for _, parent, _ in edges],
+            'type': [kind for _, _, kind in edges],
+        },
+        'families': {
+            'partner1': [position[partner1_id] for partner1_id, _, _ in units],
+            'partner2': [0 if partner2_id is None else position[partner2_id] + 1 for _, partner2_id, _ in units],
+        },
+    }
@@ -0,0 +1,162 @@
+"""Family trees: one installation hosting several related clans.
+
+Each request works in one tree: ?tree=<slug> picks it (and the session
+remembers it), otherwise the session's tree or the first tree. Only
+public trees and trees the user has a role in can be picked; when the
+session's tree is neither, the request falls back to the first tree the
+user may open, and without one it has to log in. A session
+hook adds "tree_id = current tree" to every ORM statement on members,
+relationships, family units and integrity issues, subqueries, counts and
+bulk updates/deletes included, so queries read one tree's rows through
+the tree-prefixed indexes and their cost follows that tree's size. Core
+statements (generations.py, families.py, merge.py, relatives.py,
+integrity.py) look rows up by member id, which already pins the tree, or
+filter on tree_id themselves. New rows are put in the current tree on insert.
+
+CLI commands and background threads have no request; they pick a tree
+with use_tree(), and see every tree when none is picked.
+"""
+import re
+
+from flask import abort, current_app, g, has_app_context, request, session
+from flask_login import current_user
+
+from .extensions import db
+from .models import FamilyTree, FamilyMember, FamilyRelationship, FamilyUnit, IntegrityIssue
+
+TREE_ROLES = ('member', 'admin')
+TREE_SCOPED_MODELS = (FamilyMember, FamilyRelationship, FamilyUnit, IntegrityIssue)
+SLUG_PATTERN = re.compile(r'^[a-z0-9]+(?:-[a-z0-9]+)*$')
+
+def current_tree_id():
+    """Id of the tree this request or command works in; None when it sees every tree."""
+    return g.get('tree_id') if has_app_context() else None
+
+def use_tree(tree_id):
+    g.tree_id = tree_id
+
+def find_tree(value):
+    """The tree with this slug (or id), or None."""
+    tree = FamilyTree.query.filter_by(slug=str(value)).first()
+    if tree is None and str(value).isdigit():
+        tree = db.session.get(FamilyTree, int(value))
+    return tree
+
+_default_tree_id = None
+
+def default_tree_id():
+    """The first tree, used until a request picks another; None before any tree exists."""
+    global _default_tree_id
+    if _default_tree_id is None:
+        # Trees are never deleted, so once found it stays valid
+        _default_tree_id = db.session.query(db.func.min(FamilyTree.id)).scalar()
+    return _default_tree_id
+
+def tree_role(user, tree_id=None):
+    """The user's role in the tree (default: the current one): 'admin', 'member' or None.
+
+    Installation admins (User.is_admin) are admins of every tree.
+    """
+    if not getattr(user, 'is_authenticated', False):
+        return None
+    if user.is_admin:
+        return 'admin'
+    return user.tree_roles.get(current_tree_id() if tree_id is None else tree_id)
+
+def is_tree_admin(user, tree_id=None):
+    return tree_role(user, tree_id) == 'admin'
+
+def can_open_tree(user, tree):
+    """Whether the user may work in the tree: it is public or they have a role in it."""
+    return tree.is_public or tree_role(user, tree.id) is not None
+
+def open_trees(user):
+    """The trees the user may work in, by name."""
+    return [tree for tree in FamilyTree.query.order_by(FamilyTree.name) if can_open_tree(user, tree)]
+
+def _first_open_tree_id(user):
+    # The first tree when the user may open it, else the lowest public tree or tree of theirs
+    tree_ids = [tree_id for tree_id, is_public in db.session.execute(
+        db.select(FamilyTree.id, FamilyTree.is_public).order_by(FamilyTree.id))
+        if is_public or tree_role(user, tree_id) is not None]
+    return tree_ids[0] if tree_ids else None
+
+def select_tree_for_login(user):
+    """After login, move to one of the user's trees unless the current tree is already one."""
+    if user.is_admin or not user.tree_roles or current_tree_id() in user.tree_roles:
+        return
+    tree_id = min(user.tree_roles, key=lambda tree_id: (user.tree_roles[tree_id] != 'admin', tree_id))
+    session['tree_id'] = tree_id
+    use_tree(tree_id)
+
+def _select_request_tree():
+    if request.endpoint == 'static':
+        return
+    requested = request.args.get('tree')
+    if requested:
+        tree = find_tree(requested)
+        if tree is None:
+            abort(404)
+        if not can_open_tree(current_user, tree):
+            if not current_user.is_authenticated:
+                return current_app.login_manager.unauthorized()
+            abort(403)
+        session['tree_id'] = tree.id
+    tree_id = session.get('tree_id') or default_tree_id()
+    # Members and admins skip the lookup; the session may also outlive a role
+    if tree_id is not None and tree_role(current_user, tree_id) is None \
+            and not getattr(db.session.get(FamilyTree, tree_id), 'is_public', False):
+        session.pop('tree_id', None)
+        tree_id = _first_open_tree_id(current_user)
+        if tree_id is None and request.endpoint != 'pages.login':
+            if not current_user.is_authenticated:
+                return current_app.login_manager.unauthorized()
+            abort(403)
+    # Without an open tree only the login page is served, and it reads no tree data
+    use_tree(tree_id)
+
+def _template_trees():
+    if current_tree_id() is None:
+        return {'current_tree': None, 'family_trees': []}
+    trees = open_trees(current_user)
+    return {'current_tree': next((tree for tree in trees if tree.id == current_tree_id()), None),
+            'family_trees': trees}
+
+def init_trees(app):
+    app.before_request(_select_request_tree)
+    app.context_processor(_template_trees)
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def _limit_to_current_tree(orm_execute_state):
+    tree_id = current_tree_id()
+    if tree_id is None or orm_execute_state.execution_options.get('all_trees'):
+        return
+    if (orm_execute_state.is_select and not orm_execute_state.is_column_load) \
+            or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.statement = orm_execute_state.statement.options(*(
+            db.with_loader_criteria(model, lambda cls: cls.tree_id == tree_id, include_aliases=True)
+            for model in TREE_SCOPED_MODELS))
+
+def _put_in_current_tree(mapper, connection, target):
+    if target.tree_id is None:
+        target.tree_id = current_tree_id()
+        if target.tree_id is None:
+            raise ValueError('No family tree is selected')
+
+for _model in TREE_SCOPED_MODELS:
+    db.event.listen(_model, 'before_insert', _put_in_current_tree)
+
+@db.event.listens_for(db.session, 'after_flush')
+def _check_relationship_trees(orm_session, flush_context):
+    edges = [obj for obj in orm_session.new if isinstance(obj, FamilyRelationship)]
+    edges += [obj for obj in orm_session.dirty if isinstance(obj, FamilyRelationship) and orm_session.is_modified(obj)]
+    if not edges:
+        return
+    member_table = FamilyMember.__table__
+    member_ids = {edge.parent_id for edge in edges} | {edge.child_id for edge in edges}
+    trees = dict(orm_session.connection().execute(
+        db.select(member_table.c.id, member_table.c.tree_id).where(member_table.c.id.in_(member_ids))).all())
+    for edge in edges:
+        # Ids of missing members are left to the integrity checker (orphan_edge)
+        if any(trees.get(member_id, edge.tree_id) != edge.tree_id for member_id in (edge.parent_id, edge.child_id)):
+            raise ValueError('A relationship can only link members of the same family tree')
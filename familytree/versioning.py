@@ -0,0 +1,115 @@
+"""Change tracking, the per-tree data version counters and caches keyed on them."""
+import threading
+from collections import deque
+
+from .extensions import db
+from .models import FamilyTree, FamilyMember, FamilyRelationship, DataVersion
+from .trees import current_tree_id
+
+# Models whose changes invalidate everything cached per data version
+VERSIONED_MODELS = (FamilyMember, FamilyRelationship)
+
+def note_changed_members(member_ids):
+    """Record members touched by a bulk statement that the flush hooks cannot see."""
+    db.session.info.setdefault('changed_member_ids', set()).update(member_ids)
+
+def _changed_member_ids(obj):
+    """Member ids whose checks depend on obj, including values overwritten in this flush."""
+    if isinstance(obj, FamilyMember):
+        return {obj.id}
+    ids = {obj.parent_id, obj.child_id}
+    state = db.inspect(obj)
+    for attr in ('parent_id', 'child_id'):
+        ids.update(state.attrs[attr].history.deleted or ())
+    return ids
+
+@db.event.listens_for(db.session, 'after_flush')
+def _track_data_changes(session, flush_context):
+    changed_ids = session.info.setdefault('changed_member_ids', set())
+    changed = list(session.new) + list(session.deleted)
+    changed += [obj for obj in session.dirty if session.is_modified(obj)]
+    for obj in changed:
+        if isinstance(obj, VERSIONED_MODELS):
+            session.info['data_changed'] = True
+            session.info.setdefault('changed_tree_ids', set()).add(obj.tree_id)
+            changed_ids.update(member_id for member_id in _changed_member_ids(obj) if member_id is not None)
+
+@db.event.listens_for(db.session, 'do_orm_execute')
+def _track_bulk_data_changes(orm_execute_state):
+    # Query.delete() / Query.update() bypass the flush, so catch them here
+    if (orm_execute_state.is_delete or orm_execute_state.is_update) and orm_execute_state.bind_mapper is not None:
+        if issubclass(orm_execute_state.bind_mapper.class_, VERSIONED_MODELS):
+            orm_execute_state.session.info['data_changed'] = True
+            # Scoped to the current tree; None (no tree selected) stands for every tree
+            orm_execute_state.session.info.setdefault('changed_tree_ids', set()).add(current_tree_id())
+
+@db.event.listens_for(db.session, 'before_commit')
+def _bump_data_version(session):
+    session.flush()
+    if not session.info.pop('data_changed', False):
+        return
+    # Code that flags data_changed itself (e.g. a generation rebuild) changed the current tree
+    tree_ids = session.info.pop('changed_tree_ids', None) or {current_tree_id()}
+    if None in tree_ids:
+        tree_ids = {tree_id for (tree_id,) in session.execute(db.select(FamilyTree.id))}
+    table = DataVersion.__table__
+    new_versions = {}
+    for tree_id in sorted(tree_ids):
+        result = session.execute(table.update().where(table.c.id == tree_id).values(version=table.c.version + 1))
+        if result.rowcount == 0:
+            session.execute(table.insert().values(id=tree_id, version=1))
+        # The row is locked by the UPDATE, so this is exactly the version being committed
+        new_versions[tree_id] = session.execute(db.select(table.c.version).where(table.c.id == tree_id)).scalar()
+    session.info['new_data_versions'] = new_versions
+
+# (tree id, version) pairs committed by this process, so per-process indexes can
+# tell their own writes (already applied incrementally) from other workers' writes
+_local_versions_lock = threading.Lock()
+_local_versions = deque(maxlen=1024)
+
+@db.event.listens_for(db.session, 'after_commit')
+def _record_local_version(session):
+    new_versions = session.info.pop('new_data_versions', None)
+    if new_versions:
+        with _local_versions_lock:
+            _local_versions.extend(new_versions.items())
+
+def committed_here(since, until, tree_id=None):
+    """True if every data version in (since, until] of the tree (default: current) was committed here."""
+    tree_id = current_tree_id() if tree_id is None else tree_id
+    with _local_versions_lock:
+        local = set(_local_versions)
+    if until - since > len(local):
+        return False
+    return all((tree_id, version) in local for version in range(since + 1, until + 1))
+
+
+@db.event.listens_for(db.session, 'after_soft_rollback')
+def _discard_data_changes(session, previous_transaction):
+    session.info.pop('data_changed', None)
+    session.info.pop('changed_tree_ids', None)
+    session.info.pop('changed_member_ids', None)
+    session.info.pop('new_data_versions', None)
+
+def current_data_version(tree_id=None):
+    """Return the tree's (default: current tree's) committed data version, 0 if it was never written to."""
+    tree_id = current_tree_id() if tree_id is None else tree_id
+    if tree_id is None:
+        # Seeing every tree: the sum moves whenever any tree's version does
+        return db.session.query(db.func.sum(DataVersion.version)).scalar() or 0
+    version = db.session.query(DataVersion.version).filter(DataVersion.id == tree_id).scalar()
+    return version or 0
+
+# Per-process cache of derived data, keyed by tree and name and tagged with the data version
+_version_cache = {}
+
+def cached_for_version(key, builder):
+    """Return builder() for the current tree and data version, computing it at most once per version."""
+    tree_id = current_tree_id()
+    version = current_data_version(tree_id)
+    entry = _version_cache.get((tree_id, key))
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    value = builder()
+    _version_cache[(tree_id, key)] = (version, value)
+    return value
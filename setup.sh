@@ -44,9 +44,9 @@ source venv/bin/activate
 echo "📥 Installing Python packages..."
 pip install -r requirements.txt
 
-# Initialize database
+# Initialize database (init-db also applies any pending migrations to an existing one)
 echo "🗄️  Initializing database..."
-python init_db.py init
+flask --app app init-db || exit 1
 
 echo ""
 echo "🎉 Setup completed successfully!"
@@ -0,0 +1,150 @@
+// Family tree layout, off the main thread.
+//
+// Takes the tree data from the page (decoded from the cached snapshot) or
+// fetches /api/family-tree-data, places every member on a grid row per
+// generation and builds the connector lines, then posts back the members
+// plus typed arrays the page uses to find the cards and lines inside the
+// viewport without walking the whole tree on every frame.
+
+self.onmessage = event => {
+    const {url, data: given, card} = event.data;
+    const loaded = given ? Promise.resolve(given) : fetch(url).then(response => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+    });
+    loaded
+        .then(data => {
+            const layout = layoutTree(data, card);
+            self.postMessage(layout, [
+                layout.x.buffer, layout.y.buffer, layout.parentLines.buffer, layout.spouseLines.buffer,
+                ...layout.rows.flatMap(row => [row.xs.buffer, row.indices.buffer])
+            ]);
+        })
+        .catch(error => self.postMessage({error: error.message}));
+};
+
+function layoutTree(data, card) {
+    const members = data.members || [];
+    const relationships = data.relationships || [];
+    const count = members.length;
+    const indexById = new Map(members.map((member, index) => [member.id, index]));
+
+    // A spouse link may be stored one way only; each member gets every
+    // partner once, whichever way round the link was recorded
+    const parentsOf = Array.from({length: count}, () => []);
+    const partners = Array.from({length: count}, () => new Set());
+    relationships.forEach(rel => {
+        const parent = indexById.get(rel.parent_id);
+        const child = indexById.get(rel.child_id);
+        if (parent === undefined || child === undefined) return;
+        if (rel.type === 'parent') parentsOf[child].push(parent);
+        else if (rel.type === 'spouse' && parent !== child) {
+            partners[child].add(parent);
+            partners[parent].add(child);
+        }
+    });
+    const spousesOf = partners.map(spouses => [...spouses]);
+    // Family units: the couple (or lone parent) each child was born into, as
+    // [partner indices, child indices]; without them, each child's own parents
+    const families = data.families
+        ? data.families.map(family => [family.partners, family.children].map(
+            ids => ids.map(id => indexById.get(id)).filter(index => index !== undefined)))
+        : parentsOf.flatMap((parents, child) => parents.length ? [[parents, [child]]] : []);
+    const familyOf = new Array(count);
+    families.forEach(family => family[1].forEach(child => { familyOf[child] = family; }));
+
+    // One row per generation; the server keeps generations in topological order.
+    // Someone without recorded parents who married in joins their partner's
+    // row, as long as it stays above their own children.
+    const lowestChild = new Array(count).fill(Infinity);
+    parentsOf.forEach((parents, child) => parents.forEach(parent => {
+        lowestChild[parent] = Math.min(lowestChild[parent], members[child].generation || 0);
+    }));
+    const levels = new Map();
+    members.forEach((member, index) => {
+        let level = member.generation || 0;
+        if (!parentsOf[index].length) {
+            spousesOf[index].forEach(spouse => { level = Math.max(level, members[spouse].generation || 0); });
+            level = Math.min(level, lowestChild[index] - 1);
+        }
+        if (!levels.has(level)) levels.set(level, []);
+        levels.get(level).push(index);
+    });
+    const levelNumbers = [...levels.keys()].sort((a, b) => a - b);
+    const widest = Math.max(0, ...[...levels.values()].map(level => level.length));
+    const pitchX = card.width + card.spacingX;
+    const pitchY = card.height + card.spacingY;
+
+    // Within a row, order members under their parents (mean column of the
+    // couple they were born into), with married-in spouses next to their partner
+    const x = new Float64Array(count);
+    const y = new Float64Array(count);
+    const rows = [];
+    levelNumbers.forEach(level => {
+        const row = levels.get(level);
+        const key = new Map();
+        row.forEach(index => {
+            const parents = familyOf[index] ? familyOf[index][0] : [];
+            if (parents.length) key.set(index, parents.reduce((sum, parent) => sum + x[parent], 0) / parents.length);
+        });
+        // A married-in spouse takes their partner's place and sorts right after them
+        const partnerOf = new Map();
+        row.forEach(index => {
+            if (key.has(index)) return;
+            const spouse = spousesOf[index].find(other => key.has(other));
+            key.set(index, spouse === undefined ? Infinity : key.get(spouse));
+            if (spouse !== undefined) partnerOf.set(index, spouse);
+        });
+        const anchorId = index => members[partnerOf.has(index) ? partnerOf.get(index) : index].id;
+        row.sort((a, b) => (key.get(a) - key.get(b)) || (anchorId(a) - anchorId(b))
+                           || (partnerOf.has(a) - partnerOf.has(b)) || (members[a].id - members[b].id));
+
+        const startX = (widest - row.length) * pitchX / 2 + card.spacingX;
+        const top = level * pitchY + card.spacingY;
+        const xs = new Float64Array(row.length);
+        row.forEach((index, column) => {
+            x[index] = xs[column] = startX + column * pitchX;
+            y[index] = top;
+        });
+        rows.push({top, xs, indices: Int32Array.from(row)});
+    });
+
+    // Parent lines: from the middle of the line between a couple side by side,
+    // otherwise from each recorded parent; across above the child's row, down
+    // to the child
+    const parentLines = [];
+    families.forEach(([parents, children]) => {
+        const [a, b] = parents;
+        const sideBySide = parents.length === 2 && y[a] === y[b] && Math.abs(x[a] - x[b]) === pitchX;
+        const drop = parent => [x[parent] + card.width / 2, y[parent] + card.height];
+        children.forEach(child => {
+            const childX = x[child] + card.width / 2;
+            const busY = y[child] - card.spacingY / 2;
+            const drops = sideBySide ? [[(x[a] + x[b] + card.width) / 2, y[a] + card.height / 2]]
+                : parentsOf[child].length ? parentsOf[child].map(drop) : parents.map(drop);
+            drops.forEach(([dropX, dropY]) => {
+                parentLines.push(dropX, dropY, dropX, busY,
+                                 dropX, busY, childX, busY,
+                                 childX, busY, childX, y[child]);
+            });
+        });
+    });
+    // Every couple is in both partners' lists; draw it once, card edge to card edge
+    const spouseLines = [];
+    spousesOf.forEach((spouses, a) => {
+        spouses.forEach(b => {
+            if (a > b) return;
+            const [left, right] = x[a] <= x[b] ? [a, b] : [b, a];
+            spouseLines.push(x[left] + card.width, y[left] + card.height / 2, x[right], y[right] + card.height / 2);
+        });
+    });
+
+    return {
+        members,
+        x, y, rows,
+        parentLines: Float32Array.from(parentLines),
+        spouseLines: Float32Array.from(spouseLines),
+        width: widest * pitchX + card.spacingX,
+        height: (levelNumbers.length ? levelNumbers[levelNumbers.length - 1] + 1 : 0) * pitchY + card.spacingY
+    };
+}
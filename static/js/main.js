@@ -270,6 +270,129 @@ window.addEventListener('unhandledrejection', function(e) {
     showErrorMessage('An unexpected error occurred. Please try again.');
 });
 
+// Compact tree snapshots (/api/family-tree-snapshot, see familytree/snapshot.py).
+// The packed snapshot is kept in IndexedDB under its "<tree id>:<data version>"
+// key, so as long as the tree has not changed the page reads it locally
+// instead of downloading it again.
+const SNAPSHOT_DB = 'tusang-family-tree';
+const SNAPSHOT_STORE = 'snapshots';
+const SNAPSHOT_FORMAT = 2;
+
+function openSnapshotDb() {
+    return new Promise((resolve, reject) => {
+        if (!window.indexedDB) {
+            reject(new Error('IndexedDB is not available'));
+            return;
+        }
+        const request = indexedDB.open(SNAPSHOT_DB, 1);
+        request.onupgradeneeded = () => request.result.createObjectStore(SNAPSHOT_STORE);
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function snapshotRequest(db, mode, action) {
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction(SNAPSHOT_STORE, mode);
+        const request = action(transaction.objectStore(SNAPSHOT_STORE));
+        transaction.oncomplete = () => resolve(request.result);
+        transaction.onerror = () => reject(transaction.error);
+    });
+}
+
+async function storeSnapshot(db, packed) {
+    // One snapshot per tree: drop the tree's older versions
+    const tree = packed.key.split(':')[0];
+    const keys = await snapshotRequest(db, 'readonly', store => store.getAllKeys());
+    await snapshotRequest(db, 'readwrite', store => {
+        keys.filter(key => key.split(':')[0] === tree && key !== packed.key).forEach(key => store.delete(key));
+        return store.put(packed, packed.key);
+    });
+}
+
+function isoDate(days) {
+    // YYYY-MM-DD of a day number counted from 1970-01-01 (proleptic Gregorian),
+    // several times faster than going through Date for tens of thousands of dates
+    const shifted = days + 719468;
+    const era = Math.floor(shifted / 146097);
+    const dayOfEra = shifted - era * 146097;
+    const yearOfEra = Math.floor((dayOfEra - Math.floor(dayOfEra / 1460) + Math.floor(dayOfEra / 36524)
+                                  - Math.floor(dayOfEra / 146096)) / 365);
+    const dayOfYear = dayOfEra - (365 * yearOfEra + Math.floor(yearOfEra / 4) - Math.floor(yearOfEra / 100));
+    const shiftedMonth = Math.floor((5 * dayOfYear + 2) / 153);
+    const day = dayOfYear - Math.floor((153 * shiftedMonth + 2) / 5) + 1;
+    const month = shiftedMonth < 10 ? shiftedMonth + 3 : shiftedMonth - 9;
+    const year = yearOfEra + era * 400 + (month <= 2 ? 1 : 0);
+    return `${String(year).padStart(4, '0')}-${month < 10 ? '0' : ''}${month}-${day < 10 ? '0' : ''}${day}`;
+}
+
+function decodeTreeSnapshot(packed) {
+    // Back to the shape of /api/family-tree-data: {members: [...], relationships: [...], families: [...]}
+    // (families without their ids, which the tree page does not use)
+    const columns = packed.members;
+    const text = (table, index) => index ? table[index - 1] : null;
+    const day = days => days === null ? null : isoDate(days);
+    const members = new Array(columns.id.length);
+    let id = 0;
+    let name = 0;
+    for (let i = 0; i < members.length; i++) {
+        id += columns.id[i];
+        name += columns.full_name[i];
+        members[i] = {
+            id,
+            full_name: text(packed.strings, name),
+            chinese_name: text(packed.strings, columns.chinese_name[i]),
+            nickname: text(packed.strings, columns.nickname[i]),
+            photo_filename: text(packed.strings, columns.photo[i]),
+            birth_date: day(columns.birth[i]),
+            death_date: day(columns.death[i]),
+            birth_place: text(packed.places, columns.birth_place[i]),
+            death_place: text(packed.places, columns.death_place[i]),
+            gender: text(packed.genders, columns.gender[i]),
+            current_status: columns.alive[i] ? 'Living' : 'Deceased',
+            generation: columns.generation[i]
+        };
+    }
+    const edges = packed.edges;
+    const relationships = new Array(edges.child.length);
+    let child = 0;
+    for (let i = 0; i < relationships.length; i++) {
+        child += edges.child[i];
+        relationships[i] = {
+            parent_id: members[edges.parent[i]].id,
+            child_id: members[child].id,
+            type: text(packed.types, edges.type[i])
+        };
+    }
+    const units = packed.families;
+    const families = units.partner1.map((partner1, i) => ({
+        partners: units.partner2[i] ? [members[partner1].id, members[units.partner2[i] - 1].id] : [members[partner1].id],
+        children: []
+    }));
+    columns.family.forEach((family, i) => {
+        if (family) families[family - 1].children.push(members[i].id);
+    });
+    return {key: packed.key, members, relationships, families};
+}
+
+async function loadTreeSnapshot(url, key) {
+    let db = null;
+    try {
+        db = await openSnapshotDb();
+        const cached = key ? await snapshotRequest(db, 'readonly', store => store.get(key)) : null;
+        if (cached && cached.format === SNAPSHOT_FORMAT) return decodeTreeSnapshot(cached);
+    } catch (error) {
+        // Private browsing and old browsers: download every time
+        console.warn('Tree snapshot cache unavailable:', error);
+    }
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    const packed = await response.json();
+    if (packed.format !== SNAPSHOT_FORMAT) throw new Error(`Unknown snapshot format ${packed.format}`);
+    if (db) storeSnapshot(db, packed).catch(error => console.warn('Could not cache the tree snapshot:', error));
+    return decodeTreeSnapshot(packed);
+}
+
 // Export functions for global use
 window.FamilyTreeApp = {
     validateForm,
@@ -287,5 +410,7 @@ window.FamilyTreeApp = {
     loadFromLocalStorage,
     apiCall,
     debounce,
-    throttle
+    throttle,
+    loadTreeSnapshot,
+    decodeTreeSnapshot
 };
@@ -0,0 +1,97 @@
+from datetime import date
+
+import pytest
+
+from familytree import create_app
+from familytree.extensions import db
+from familytree.families import rebuild_family_units
+from familytree.models import FamilyMember, FamilyRelationship, FamilyTree, User
+from familytree.trees import use_tree
+
+def make_app(path, **config):
+    """An app on a fresh SQLite database in path, holding the public TU SANG tree and admin/admin123."""
+    return create_app(dict({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{path / 'family_tree.db'}",
+        'UPLOAD_FOLDER': str(path / 'uploads'),
+        'BACKUP_FOLDER': str(path / 'backups'),
+        'BACKUP_INTERVAL_HOURS': 0,
+        'ENABLE_MIGRATIONS': False,
+        'COMPRESS_RESPONSES': False,
+    }, **config))
+
+def seed(app):
+    db.create_all()
+    db.session.add(FamilyTree(id=1, name='TU SANG Family', slug='tu-sang', is_public=True))
+    admin = User(username='admin', email='admin@example.com', is_admin=True)
+    admin.set_password('admin123')
+    db.session.add(admin)
+    db.session.commit()
+    use_tree(1)
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        seed(app)
+        yield app
+        db.session.remove()
+
+BENCHMARK_MEMBERS = 20000
+
+@pytest.fixture(scope='module')
+def benchmark_app(tmp_path_factory):
+    """A compressing app whose tree has BENCHMARK_MEMBERS members, the size the README benchmarks use.
+
+    Odd ids are descendants, each born to the couple of an earlier
+    descendant (3 children per couple); even ids are the spouses who
+    married in. Seeded with bulk inserts, so build it once per module.
+    """
+    app = make_app(tmp_path_factory.mktemp('benchmark'), COMPRESS_RESPONSES=True)
+    with app.app_context():
+        seed(app)
+        generation = {}
+        members, relationships = [], []
+        for member_id in range(1, BENCHMARK_MEMBERS + 1):
+            if member_id % 2 == 0:
+                partner_id = member_id - 1
+                generation[member_id] = generation[partner_id]
+                relationships.append({'tree_id': 1, 'parent_id': partner_id, 'child_id': member_id,
+                                      'relationship_type': 'spouse'})
+            elif member_id == 1:
+                generation[member_id] = 0
+            else:
+                father_id = (member_id - 3) // 6 * 2 + 1
+                generation[member_id] = generation[father_id] + 1
+                relationships += [{'tree_id': 1, 'parent_id': parent_id, 'child_id': member_id,
+                                   'relationship_type': 'parent'} for parent_id in (father_id, father_id + 1)]
+            members.append({'id': member_id, 'tree_id': 1, 'full_name': f'Member {member_id} TU SANG',
+                            'gender': 'Female' if member_id % 2 == 0 else 'Male',
+                            'birth_date': date(1700 + generation[member_id] * 25, 1, 1 + member_id % 28),
+                            'generation': generation[member_id]})
+        db.session.execute(db.insert(FamilyMember), members)
+        db.session.execute(db.insert(FamilyRelationship), relationships)
+        rebuild_family_units(db.session.connection(), 1)
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def foreign_keys(app):
+    """Enforce foreign keys on every SQLite connection from here on, as MySQL always does."""
+    def enable(dbapi_connection, connection_record):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
+    db.session.remove()
+    db.event.listen(db.engine, 'connect', enable)
+    db.engine.dispose()
+    yield
+    db.session.remove()
+    db.event.remove(db.engine, 'connect', enable)
+    db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def login(client, username, password):
+    return client.post('/login', data={'username': username, 'password': password})
@@ -0,0 +1,46 @@
+from familytree.extensions import db
+from familytree.models import FamilyMember, FamilyRelationship
+
+def test_link_confirmed_twice_is_made_once(client):
+    father = FamilyMember(full_name='Juan TU SANG', gender='Male')
+    db.session.add(father)
+    db.session.commit()
+    link = {'op': 'create_relationship', 'member_id': 'child', 'related_member_id': father.id,
+            'relationship_type': 'parent'}
+    operations = [{'op': 'create_member', 'temp_id': 'child', 'data': {'full_name': 'Pedro TU SANG', 'gender': 'Male'}},
+                  link, dict(link, related_member_id=str(father.id))]
+
+    response = client.post('/api/batch', json={'operations': operations}).get_json()
+
+    assert response['success'], response
+    assert response['skipped'] == [2]
+    child_id = response['id_map']['child']
+    assert [(edge.parent_id, edge.child_id) for edge in FamilyRelationship.query] == [(father.id, child_id)]
+
+def test_spouse_confirmed_from_both_sides_is_made_once(client):
+    members = [FamilyMember(full_name=name, gender='Male') for name in ('Juan TU SANG', 'Maria TU SANG')]
+    db.session.add_all(members)
+    db.session.commit()
+    a, b = (member.id for member in members)
+    operations = [{'op': 'create_relationship', 'member_id': a, 'related_member_id': b, 'relationship_type': 'spouse'},
+                  {'op': 'create_relationship', 'member_id': b, 'related_member_id': a, 'relationship_type': 'spouse'}]
+
+    response = client.post('/api/batch', json={'operations': operations}).get_json()
+
+    assert response['success'], response
+    assert response['skipped'] == [1]
+    assert FamilyRelationship.query.count() == 2
+
+def test_conflicting_links_still_fail_the_batch(client):
+    members = [FamilyMember(full_name=name, gender='Male') for name in ('Juan TU SANG', 'Pedro TU SANG')]
+    db.session.add_all(members)
+    db.session.commit()
+    a, b = (member.id for member in members)
+    operations = [{'op': 'create_relationship', 'member_id': a, 'related_member_id': b, 'relationship_type': 'parent'},
+                  {'op': 'create_relationship', 'member_id': a, 'related_member_id': b, 'relationship_type': 'spouse'}]
+
+    response = client.post('/api/batch', json={'operations': operations}).get_json()
+
+    assert not response['success']
+    assert response['operation'] == 1
+    assert FamilyRelationship.query.count() == 0
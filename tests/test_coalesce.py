@@ -0,0 +1,95 @@
+import gzip
+import json
+import threading
+
+import pytest
+
+from familytree import coalesce, compress
+from familytree.blueprints import export, members, relationships
+from familytree.extensions import db
+from familytree.models import FamilyMember
+
+from conftest import BENCHMARK_MEMBERS
+
+REQUESTS = 20
+
+# Endpoint -> (module, builder) that coalesced() calls for it
+ENDPOINTS = {
+    '/api/family-tree-data': (relationships, 'build_family_tree_json'),
+    '/api/family-tree-snapshot': (relationships, 'build_family_tree_snapshot_json'),
+    '/api/get-members': (members, 'build_members_json'),
+    '/api/export-gedcom': (export, 'build_gedcom'),
+}
+
+@pytest.fixture
+def builds(benchmark_app, monkeypatch):
+    """Count the real builds and compressions, per endpoint, on the benchmark tree, starting with nothing cached."""
+    monkeypatch.setattr(coalesce, '_flights', {})
+    monkeypatch.setattr(compress, '_versioned_bodies', {})
+    calls = {'compress': []}
+    for url, (module, name) in ENDPOINTS.items():
+        build = getattr(module, name)
+        def counted(build=build, url=url):
+            calls[url].append(threading.get_ident())
+            return build()
+        calls[url] = []
+        monkeypatch.setattr(module, name, counted)
+    compress_body = compress.compress_body
+    def counted_compress(data, encoding):
+        calls['compress'].append(encoding)
+        return compress_body(data, encoding)
+    monkeypatch.setattr(compress, 'compress_body', counted_compress)
+    return calls
+
+def fetch_all(app, urls):
+    """GET every url from its own thread at once; returns the responses as (url, status, headers, body)."""
+    start = threading.Barrier(len(urls))
+    responses = []
+    def fetch(url):
+        client = app.test_client()
+        start.wait()
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        responses.append((url, response.status_code, response.headers, response.get_data()))
+    threads = [threading.Thread(target=fetch, args=(url,)) for url in urls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+def test_concurrent_requests_share_one_build(benchmark_app, builds):
+    responses = fetch_all(benchmark_app, [url for url in ENDPOINTS for _ in range(REQUESTS)])
+
+    assert [status for _, status, _, _ in responses] == [200] * REQUESTS * len(ENDPOINTS)
+    for url in ENDPOINTS:
+        assert len(builds[url]) == 1, url
+        bodies = {body for response_url, _, _, body in responses if response_url == url}
+        assert len(bodies) == 1, url
+    assert builds['compress'] == ['gzip'] * len(ENDPOINTS)
+    assert all(headers['Content-Encoding'] == 'gzip' for _, _, headers, _ in responses)
+    tree = json.loads(gzip.decompress(next(body for url, _, _, body in responses if url == '/api/family-tree-data')))
+    assert len(tree['members']) == BENCHMARK_MEMBERS
+    # Later requests for the same data version reuse the compressed body
+    client = benchmark_app.test_client()
+    for url in ENDPOINTS:
+        body = next(body for response_url, _, _, body in responses if response_url == url)
+        assert client.get(url, headers={'Accept-Encoding': 'gzip'}).get_data() == body
+    assert all(len(builds[url]) == 1 for url in ENDPOINTS)
+    assert len(builds['compress']) == len(ENDPOINTS)
+
+def test_requests_beyond_the_cap_are_shed(benchmark_app, builds, monkeypatch):
+    monkeypatch.setitem(benchmark_app.config, 'COALESCE_MAX_ACTIVE', 5)
+    responses = fetch_all(benchmark_app, ['/api/family-tree-data'] * REQUESTS)
+
+    assert len(builds['/api/family-tree-data']) == 1
+    statuses = sorted(status for _, status, _, _ in responses)
+    assert statuses.count(200) == 5 and statuses.count(503) == REQUESTS - 5
+    assert all(int(headers['Retry-After']) >= 1 for _, status, headers, _ in responses if status == 503)
+
+def test_new_data_version_is_built_again(benchmark_app, builds):
+    client = benchmark_app.test_client()
+    client.get('/api/family-tree-data')
+    db.session.add(FamilyMember(full_name='Maria TU SANG', gender='Female'))
+    db.session.commit()
+    assert b'Maria TU SANG' in client.get('/api/family-tree-data').get_data()
+    assert len(builds['/api/family-tree-data']) == 2
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from familytree.extensions import db
+from familytree.families import family_units, rebuild_family_units
+from familytree.models import FamilyMember, FamilyRelationship, FamilyUnit
+
+def add_members(*names):
+    members = [FamilyMember(full_name=name, gender='Male') for name in names]
+    db.session.add_all(members)
+    db.session.flush()
+    return [member.id for member in members]
+
+def test_units_follow_relationships(app):
+    father, mother, child, other = add_members('Father', 'Mother', 'Child', 'Other')
+    db.session.add_all([
+        FamilyRelationship(parent_id=father, child_id=mother, relationship_type='spouse'),
+        FamilyRelationship(parent_id=father, child_id=child, relationship_type='parent'),
+        FamilyRelationship(parent_id=other, child_id=father, relationship_type='parent'),
+    ])
+    db.session.commit()
+
+    units = [unit[1:] for unit in family_units()]
+    assert sorted(units) == [(father, mother, [child]), (other, None, [father])]
+    # A rebuild inserts the same units again, one row at a time
+    assert rebuild_family_units(db.session.connection(), 1) == 2
+    db.session.commit()
+    assert sorted(unit[1:] for unit in family_units()) == sorted(units)
+
+def test_lone_parent_has_one_unit(app):
+    (parent,) = add_members('Parent')
+    db.session.add(FamilyUnit(tree_id=1, partner1_id=parent))
+    db.session.flush()
+    # partner2_id is NULL for both, which a unique constraint alone would allow
+    db.session.add(FamilyUnit(tree_id=1, partner1_id=parent))
+    with pytest.raises(IntegrityError):
+        db.session.flush()
+
+def test_couple_key_defaults_to_partner2(app):
+    partner1, partner2 = add_members('Partner 1', 'Partner 2')
+    unit = FamilyUnit(tree_id=1, partner1_id=partner1, partner2_id=partner2)
+    db.session.add(unit)
+    db.session.flush()
+    assert unit.partner2_key == partner2
+
+def family_of(member_id):
+    return [unit[1:] for unit in family_units() if member_id in unit[1:3] or member_id in unit[3]]
+
+def test_deleting_a_partner_refiles_their_family(client, foreign_keys):
+    father, mother, child = add_members('Father', 'Mother', 'Child')
+    db.session.add_all([
+        FamilyRelationship(parent_id=father, child_id=mother, relationship_type='spouse'),
+        FamilyRelationship(parent_id=father, child_id=child, relationship_type='parent'),
+        FamilyRelationship(parent_id=mother, child_id=child, relationship_type='parent'),
+    ])
+    db.session.commit()
+
+    response = client.delete(f'/api/delete-member/{father}').get_json()
+    assert response['success'], response
+    assert family_of(child) == [(mother, None, [child])]
+
+    assert client.delete(f'/api/delete-member/{child}').get_json()['success']
+    assert family_units() == []
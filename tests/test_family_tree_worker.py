@@ -0,0 +1,51 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+WORKER = Path(__file__).resolve().parent.parent / 'static' / 'js' / 'family-tree-worker.js'
+CARD = {'width': 150, 'height': 80, 'spacingX': 20, 'spacingY': 60}
+
+def layout(data):
+    """Run the worker's layoutTree under node; returns the layout with typed arrays as lists."""
+    if not shutil.which('node'):
+        pytest.skip('node is not installed')
+    script = f'''
+        const vm = require('vm');
+        const context = {{self: {{}}}};
+        vm.runInNewContext(require('fs').readFileSync({json.dumps(str(WORKER))}, 'utf8'), context);
+        const layout = context.layoutTree({json.dumps(data)}, {json.dumps(CARD)});
+        console.log(JSON.stringify({{x: [...layout.x], y: [...layout.y],
+                                     spouseLines: [...layout.spouseLines], parentLines: [...layout.parentLines]}}));
+    '''
+    return json.loads(subprocess.run(['node', '-e', script], capture_output=True, text=True, check=True).stdout)
+
+def members(*ids):
+    return [{'id': member_id, 'full_name': f'Member {member_id}', 'generation': 0} for member_id in ids]
+
+@pytest.mark.parametrize('parent_id,child_id', [(1, 2), (2, 1)])
+def test_one_way_spouse_link_is_drawn(parent_id, child_id):
+    result = layout({'members': members(1, 2),
+                     'relationships': [{'parent_id': parent_id, 'child_id': child_id, 'type': 'spouse'}]})
+
+    assert len(result['spouseLines']) == 4
+    assert result['y'][0] == result['y'][1]
+
+def test_spouse_link_stored_both_ways_is_drawn_once():
+    result = layout({'members': members(1, 2),
+                     'relationships': [{'parent_id': 1, 'child_id': 2, 'type': 'spouse'},
+                                       {'parent_id': 2, 'child_id': 1, 'type': 'spouse'}]})
+
+    assert len(result['spouseLines']) == 4
+
+def test_married_in_spouse_joins_their_partners_row():
+    # Only the married-in member (3) is stored as the parent_id of the link
+    data = {'members': [{'id': 1, 'generation': 0}, {'id': 2, 'generation': 1}, {'id': 3, 'generation': 0}],
+            'relationships': [{'parent_id': 1, 'child_id': 2, 'type': 'parent'},
+                              {'parent_id': 3, 'child_id': 2, 'type': 'spouse'}]}
+    result = layout(data)
+
+    assert result['y'][2] == result['y'][1]
+    assert len(result['spouseLines']) == 4
@@ -0,0 +1,52 @@
+from familytree.extensions import db
+from familytree.families import family_units
+from familytree.merge import merge_members
+from familytree.models import FamilyMember, FamilyRelationship
+
+from conftest import login
+
+def test_unused_photo_is_listed_in_the_response(client):
+    survivor = FamilyMember(full_name='Juan TU SANG', gender='Male', photo_filename='juan_1a2b3c4d.jpg',
+                            notes='Family patriarch')
+    loser = FamilyMember(full_name='Juan Tu Sang', gender='Male', photo_filename='juan_5e6f7a8b.jpg')
+    db.session.add_all([survivor, loser])
+    db.session.commit()
+    login(client, 'admin', 'admin123')
+
+    response = client.post('/api/merge-members', json={'survivor_id': survivor.id, 'loser_ids': [loser.id]}).get_json()
+
+    assert response['success'], response
+    assert response['unused_photos'] == {str(survivor.id): ['juan_5e6f7a8b.jpg']}
+    assert db.session.get(FamilyMember, loser.id) is None
+    assert survivor.photo_filename == 'juan_1a2b3c4d.jpg'
+    assert survivor.notes == 'Family patriarch'
+
+def test_loser_photo_fills_an_empty_survivor(app):
+    survivor = FamilyMember(full_name='Maria TU SANG', gender='Female')
+    losers = [FamilyMember(full_name='Maria', gender='Female', photo_filename=photo)
+              for photo in ('maria_1.jpg', None, 'maria_1.jpg')]
+    db.session.add_all([survivor, *losers])
+    db.session.commit()
+
+    assert merge_members([(survivor.id, [loser.id for loser in losers])])['unused_photos'] == {}
+    db.session.commit()
+
+    assert survivor.photo_filename == 'maria_1.jpg'
+    assert survivor.notes is None
+
+def test_duplicate_in_a_family_unit_can_be_merged(app, foreign_keys):
+    parent, survivor, loser, spouse = (FamilyMember(full_name=name, gender='Male')
+                                       for name in ('Parent', 'Pedro', 'Pedro (duplicate)', 'Ana'))
+    db.session.add_all([parent, survivor, loser, spouse])
+    db.session.flush()
+    db.session.add_all([
+        FamilyRelationship(parent_id=parent.id, child_id=loser.id, relationship_type='parent'),
+        FamilyRelationship(parent_id=loser.id, child_id=spouse.id, relationship_type='spouse'),
+    ])
+    db.session.commit()
+
+    merge_members([(survivor.id, [loser.id])])
+    db.session.commit()
+
+    assert sorted(unit[1:] for unit in family_units()) == [(parent.id, None, [survivor.id]),
+                                                          (survivor.id, spouse.id, [])]
@@ -0,0 +1,74 @@
+from datetime import date
+
+import pytest
+
+from familytree.extensions import db
+from familytree.models import FamilyMember
+
+from conftest import login
+
+@pytest.fixture
+def admin_client(client):
+    db.session.add_all([FamilyMember(full_name=f'Member {i:03}', gender='Male' if i % 2 else 'Female',
+                                     birth_date=date(1900 + i, 1, 1) if i % 7 else None) for i in range(60)])
+    db.session.commit()
+    login(client, 'admin', 'admin123')
+    return client
+
+@pytest.fixture
+def statements(app):
+    """The SQL statements run while the test uses it, with their parameters."""
+    captured = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+    db.event.listen(db.engine, 'before_cursor_execute', capture)
+    yield captured
+    db.event.remove(db.engine, 'before_cursor_execute', capture)
+
+def query_plan(statement, parameters):
+    return [row[-1] for row in db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+
+@pytest.mark.parametrize('sort,column', [('name', 'full_name'), ('birth_date', 'birth_date'),
+                                         ('updated_at', 'updated_at')])
+@pytest.mark.parametrize('direction', ['asc', 'desc'])
+def test_keyset_page_is_an_index_range_scan(admin_client, statements, sort, column, direction):
+    url = f'/api/search?sort={sort}&direction={direction}&limit=5'
+    cursor = admin_client.get(url).get_json()['next_cursor']
+    statements.clear()
+    assert admin_client.get(f'{url}&after={cursor}').get_json()['success']
+
+    # A page that crosses into the NULLs reads a second range
+    pages = [(statement, parameters) for statement, parameters in statements if 'ORDER BY' in statement]
+    assert pages
+    for statement, parameters in pages:
+        plan = query_plan(statement, parameters)
+        assert any(f'USING INDEX ix_family_member_tree_id_{column}_id (tree_id=? AND {column}' in step
+                   for step in plan), plan
+        assert not any(step.startswith('SCAN family_member') or 'TEMP B-TREE' in step for step in plan), plan
+
+@pytest.mark.parametrize('direction', ['asc', 'desc'])
+def test_pages_cover_every_member_once_in_order(admin_client, direction):
+    # Members without a birth date sort first ascending and last descending
+    expected = [member.id for member in FamilyMember.query.order_by(
+        *((FamilyMember.birth_date.desc(), FamilyMember.id.desc()) if direction == 'desc'
+          else (FamilyMember.birth_date, FamilyMember.id)))]
+    url = f'/api/search?sort=birth_date&direction={direction}&limit=4'
+    ids, cursor = [], None
+    while True:
+        page = admin_client.get(url + (f'&after={cursor}' if cursor else '')).get_json()
+        ids += [member['id'] for member in page['members']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert ids == expected
+
+def test_facets_are_counted_from_indexes(admin_client, statements):
+    assert admin_client.get('/api/search?gender=Male').get_json()['facets']['gender'] == {'Male': 30, 'Female': 30}
+
+    counts = [(statement, parameters) for statement, parameters in statements
+              if 'count(' in statement and 'FROM family_member' in statement]
+    assert counts
+    for statement, parameters in counts:
+        plan = query_plan(statement, parameters)
+        assert 'USING COVERING INDEX ix_family_member_tree_id_' in plan[0], (statement, plan)
+        assert not any(step.startswith('SCAN family_member') for step in plan), (statement, plan)
@@ -0,0 +1,18 @@
+from familytree.blueprints.members import build_family_stats
+from familytree.extensions import db
+from familytree.models import FamilyMember
+
+def test_null_and_blank_values_add_up_as_unknown(app):
+    db.session.add_all([
+        FamilyMember(full_name='A', gender='Male', marital_status='Married'),
+        FamilyMember(full_name='B', gender='', marital_status=None),
+        FamilyMember(full_name='C', gender='', marital_status=''),
+    ])
+    db.session.commit()
+
+    stats = build_family_stats()
+    assert stats['total_members'] == 3
+    # NULL and '' are separate groups in SQL; both must land in 'Unknown'
+    assert stats['marital_status'] == {'Married': 1, 'Unknown': 2}
+    assert stats['gender'] == {'Male': 1, 'Unknown': 2}
+    assert sum(stats['marital_status'].values()) == stats['total_members']
@@ -0,0 +1,56 @@
+import pytest
+
+from familytree.extensions import db
+from familytree.models import FamilyMember, FamilyTree, TreeMembership, User
+from familytree.trees import use_tree
+
+from conftest import login
+
+@pytest.fixture
+def lim(app):
+    tree = FamilyTree(id=2, name='Lim Family', slug='lim')
+    db.session.add(tree)
+    db.session.flush()
+    use_tree(tree.id)
+    db.session.add(FamilyMember(full_name='Lim Secret', gender='Male'))
+    db.session.flush()
+    use_tree(1)
+    for username, role in (('mei', 'member'), ('outsider', None)):
+        user = User(username=username, email=f'{username}@example.com')
+        user.set_password('secret123')
+        db.session.add(user)
+        db.session.flush()
+        if role:
+            db.session.add(TreeMembership(user_id=user.id, tree_id=tree.id, role=role))
+    db.session.commit()
+    return tree
+
+def member_names(client, query=''):
+    return [member['full_name'] for member in client.get(f'/api/get-members{query}').get_json()]
+
+def test_anonymous_user_cannot_open_private_tree(client, lim):
+    response = client.get('/api/get-members?tree=lim')
+    assert response.status_code == 302 and '/login' in response.headers['Location']
+    assert client.post('/api/trees/2/select').status_code == 403
+    assert 'Lim Secret' not in member_names(client)
+    assert [tree['slug'] for tree in client.get('/api/trees').get_json()['trees']] == ['tu-sang']
+
+def test_non_member_is_refused(client, lim):
+    login(client, 'outsider', 'secret123')
+    assert client.get('/api/get-members?tree=lim').status_code == 403
+    assert client.post('/api/trees/2/select').status_code == 403
+    assert 'Lim Secret' not in member_names(client)
+
+def test_member_can_open_their_tree(client, lim):
+    login(client, 'mei', 'secret123')
+    assert member_names(client, '?tree=lim') == ['Lim Secret']
+    assert client.post('/api/trees/1/select').get_json()['success']
+    assert client.post('/api/trees/2/select').get_json()['tree']['role'] == 'member'
+
+def test_session_does_not_outlive_the_role(client, lim):
+    login(client, 'mei', 'secret123')
+    assert member_names(client, '?tree=lim') == ['Lim Secret']
+    TreeMembership.query.filter_by(tree_id=lim.id).delete()
+    db.session.commit()
+    # Back in the public tree instead of the one mei was removed from
+    assert 'Lim Secret' not in member_names(client)